@@ -0,0 +1,41 @@
+import argparse
+import logging
+import pathlib
+import sys
+import tempfile
+
+from .compare import compare, format_comparison, load_report
+from .suite import run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Time each openfield pipeline stage on synthetic inputs, or compare two benchmark reports")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmark suite and write a JSON report")
+    run_parser.add_argument("report", help="Location of the JSON report to write")
+    run_parser.add_argument("--directory", default=str(pathlib.Path(tempfile.gettempdir()) / "openfield" / "benchmarks"), help="Working directory for synthetic inputs and outputs (reused between runs)")
+    run_parser.add_argument("--quick", action="store_true", help="Use the smaller scales")
+    run_parser.add_argument("--repeats", type=int, default=3, help="Number of times each benchmark is run (the fastest is reported)")
+    run_parser.add_argument("--select", help="Only run benchmarks whose name contains this text")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two reports, exiting with an error if any benchmark is slower")
+    compare_parser.add_argument("baseline", help="Report of the reference version")
+    compare_parser.add_argument("candidate", help="Report of the version being checked")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Fractional change in wall time counted as slower or faster")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    if args.command == "run":
+        run(args.directory, quick=args.quick, repeats=args.repeats, select=args.select, report_file=args.report)
+        return 0
+
+    baseline, candidate = load_report(args.baseline), load_report(args.candidate)
+    rows = compare(baseline, candidate, threshold=args.threshold)
+    print(format_comparison(rows, baseline, candidate))
+    return 1 if any(row["status"] == "slower" for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
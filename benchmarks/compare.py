@@ -0,0 +1,51 @@
+import json
+
+
+def load_report(report_file: str):
+    with open(report_file, "r") as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, candidate: dict, threshold: float = 0.1):
+    """
+    Compare the timings of two benchmark reports
+    :param baseline: Report of the reference version (see benchmarks.suite.run)
+    :param candidate: Report of the version being checked
+    :param threshold: Fractional change in wall time above which a benchmark counts as slower or faster
+    :return rows: List of dictionaries of benchmark name, baseline and candidate wall times [s], ratio and status ("slower", "faster", "same", "new" or "removed")
+    """
+
+    rows = []
+    for name in list(dict.fromkeys(list(baseline["results"]) + list(candidate["results"]))):
+        before = baseline["results"].get(name, {}).get("wall_time")
+        after = candidate["results"].get(name, {}).get("wall_time")
+        if before is None or after is None:
+            status, ratio = ("new" if before is None else "removed"), None
+        else:
+            ratio = after / before if before > 0 else float("inf")
+            status = "slower" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else "same"
+        rows.append({"name": name, "baseline": before, "candidate": after, "ratio": ratio, "status": status})
+    return rows
+
+
+def format_comparison(rows: list, baseline: dict = None, candidate: dict = None):
+    """Format compared benchmarks as a text table, noting any difference in the environments the reports were made in"""
+    lines = []
+    if baseline is not None and candidate is not None:
+        for k in ["mode", "repeats"]:
+            if baseline.get(k) != candidate.get(k):
+                lines.append("Warning: reports differ in {} ({} vs {})".format(k, baseline.get(k), candidate.get(k)))
+        for k in ["python", "packages", "platform", "cpu_count"]:
+            if baseline["environment"].get(k) != candidate["environment"].get(k):
+                lines.append("Warning: reports differ in {} ({} vs {})".format(k, baseline["environment"].get(k), candidate["environment"].get(k)))
+
+    width = max([len(row["name"]) for row in rows] + [9])
+    lines.append("{:<{w}}  {:>10}  {:>10}  {:>7}  {}".format("Benchmark", "Baseline", "Candidate", "Ratio", "Status", w=width))
+    for row in rows:
+        lines.append("{:<{w}}  {:>10}  {:>10}  {:>7}  {}".format(
+            row["name"],
+            "-" if row["baseline"] is None else "{:.3f}s".format(row["baseline"]),
+            "-" if row["candidate"] is None else "{:.3f}s".format(row["candidate"]),
+            "-" if row["ratio"] is None else "{:.2f}x".format(row["ratio"]),
+            row["status"], w=width))
+    return "\n".join(lines)
@@ -0,0 +1,330 @@
+import datetime
+import importlib.metadata
+import json
+import logging
+import os
+import pathlib
+import platform
+import shutil
+import statistics
+import subprocess
+import time
+
+import numpy as np
+from ladybug.epw import EPW
+
+from openfield import batch, cache, ground, mitigations, mrt, plot, profiling, radiation, sweep, utci
+from openfield.store import ResultsStore
+from openfield.weather import load_weather
+
+from . import synthetic
+
+logger = logging.getLogger(__name__)
+
+# Sizes of each scaling dimension, in full and quick runs
+SCALES = {
+    "full": {"points": [1, 1000], "scenarios": [4, 400], "sites": [1, 100]},
+    "quick": {"points": [1, 100], "scenarios": [4, 40], "sites": [1, 4]},
+}
+
+# Number of reflectivities, shading options, evaporative cooling effectivenesses and wind settings swept for each number of scenarios
+_SCENARIO_AXES = {4: (2, 2, 1, 1), 40: (5, 2, 2, 2), 400: (10, 2, 5, 4)}
+
+
+class Benchmark(object):
+    def __init__(self, name: str, stage: str, scale: dict, run, setup=None, repeats: int = None):
+        """
+        A timed piece of work
+        :param name: Unique name of the benchmark, used to match results across reports
+        :param stage: Pipeline stage measured, e.g. "ground" or "end_to_end"
+        :param scale: Dictionary of scaling dimension and size, e.g. {"points": 1000}
+        :param run: Function doing the timed work, called with the values returned by setup
+        :param setup: Function preparing each repeat (untimed), returning a tuple of arguments for run
+        :param repeats: Number of times to run, overriding the suite's number of repeats
+        """
+
+        self.name = name
+        self.stage = stage
+        self.scale = scale
+        self.run = run
+        self.setup = setup
+        self.repeats = repeats
+
+    def __repr__(self):
+        return "Benchmark: {}".format(self.name)
+
+    def measure(self, repeats: int = 3):
+        """
+        Run the benchmark, recording the profiling spans of the fastest repeat
+        :param repeats: Number of times to run
+        :return result: Dictionary of wall times [s] and the span summary of the fastest repeat (see openfield.profiling.summary)
+        """
+
+        wall_times = []
+        spans = None
+        for _ in range(self.repeats or repeats):
+            args = self.setup() if self.setup is not None else ()
+            profiling.reset()
+            profiling.enable()
+            start = time.perf_counter()
+            try:
+                self.run(*args)
+            finally:
+                wall_time = time.perf_counter() - start
+                profiling.disable()
+            if not wall_times or wall_time < min(wall_times):
+                spans = profiling.summary()
+            wall_times.append(wall_time)
+        profiling.reset()
+
+        return {
+            "stage": self.stage,
+            "scale": self.scale,
+            "wall_time": min(wall_times),
+            "median_wall_time": statistics.median(wall_times),
+            "wall_times": wall_times,
+            "spans": spans,
+        }
+
+
+class Fixtures(object):
+    def __init__(self, directory: str):
+        """
+        Synthetic inputs for the benchmarks, generated on first use and kept in a working directory so that later runs
+        (and repeats) don't pay for them
+        :param directory: Location of the generated inputs and of the scratch outputs of each benchmark
+        """
+
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def epw(self, seed: int = 0):
+        """Synthetic weather-file, with the latitude varying by seed so that sites differ"""
+        epw_file = self.directory / "weather" / "synthetic_{:03d}.epw".format(seed)
+        if not epw_file.exists():
+            synthetic.synthetic_epw(epw_file, seed=seed, latitude=51.5 - (seed % 40), longitude=-0.1 + seed, mean_temperature=11 + (seed % 40) / 3)
+        return epw_file
+
+    def epws(self, n: int):
+        return [self.epw(seed) for seed in range(n)]
+
+    def idd(self):
+        """IDD of the stand-in EnergyPlus installation"""
+        idd_file = self.directory / "energyplus" / "Energy+.idd"
+        return idd_file if idd_file.exists() else synthetic.stub_energyplus(idd_file.parent)
+
+    def solar(self, seed: int = 0):
+        """Direct and diffuse horizontal radiation of a synthetic weather-file, standing in for the Radiance simulation"""
+        epw = EPW(str(self.epw(seed)))
+        diffuse = np.array(epw.diffuse_horizontal_radiation.values)
+        return np.array(epw.global_horizontal_radiation.values) - diffuse, diffuse
+
+    def ill(self, points: int):
+        """Radiance result files of a grid of points"""
+        result_directory = self.directory / "radiance" / "{}_points".format(points)
+        if not (result_directory / "sun..scene..default.ill").exists():
+            synthetic.synthetic_radiation_results(result_directory, points)
+        return result_directory
+
+    def scratch(self, name: str):
+        """Empty folder for the outputs of a benchmark"""
+        directory = self.directory / "scratch" / name
+        shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir(parents=True)
+        return directory
+
+
+def scenario_axes(scenarios: int):
+    """Sweep axes giving a number of scenarios (4, 40 or 400)"""
+    reflectivities, shades, effectivenesses, winds = _SCENARIO_AXES[scenarios]
+    return {
+        "reflectivity": np.round(np.linspace(0.2, 0.5, reflectivities), 3).tolist(),
+        "is_shaded": [True, False][:shades],
+        "evaporative_cooling_effectiveness": np.round(np.linspace(0, 0.8, effectivenesses), 3).tolist(),
+        "wind": [1, 0, 2, 3][:winds],
+    }
+
+
+def _fresh_cache(fixtures: Fixtures, name: str):
+    """
+    Point the ground surface temperature cache at an empty folder, so EnergyPlus results aren't reused between repeats.
+    The folder is also set in the environment, for worker processes that re-import openfield rather than being forked.
+    """
+    directory = fixtures.scratch(name)
+    cache.default_cache.directory = directory
+    os.environ[cache.CACHE_DIRECTORY_VARIABLE] = str(directory)
+    return ()
+
+
+def benchmarks(fixtures: Fixtures, scales: dict):
+    """
+    Build the benchmarks of each pipeline stage and of the end-to-end mitigation comparison at each scale. EnergyPlus
+    is replaced by a stand-in that writes a canned ESO, and Radiance by synthetic result files, so the timings measure
+    openfield's own work (IDF writing, process handling, result parsing and the comfort calculations) rather than the
+    simulation engines.
+    :param fixtures: Synthetic inputs
+    :param scales: Dictionary of scaling dimension and list of sizes (see SCALES)
+    :return benchmarks: List of Benchmark
+    """
+
+    epw_file = fixtures.epw()
+    weather = load_weather(epw_file)
+    idd_file = fixtures.idd()
+    direct, diffuse = fixtures.solar()
+    surface_temperature = ground.Ground().calculate_surface_temperature(weather, engine="conduction").values
+    longwave_mrt = np.array(surface_temperature) * 0.5
+
+    items = []
+
+    # Ground surface temperature of a single ground, with each engine
+    items.append(Benchmark(
+        "ground.energyplus", "ground", {"grounds": 1},
+        lambda output_directory: ground.Ground().calculate_surface_temperature(epw_file, idd_file, output_directory=output_directory, use_cache=False),
+        setup=lambda: (fixtures.scratch("ground"),)))
+    items.append(Benchmark(
+        "ground.conduction", "ground", {"grounds": 1},
+        lambda: ground.Ground().calculate_surface_temperature(epw_file, engine="conduction")))
+
+    # Loading of Radiance results, MRT and UTCI for grids of points
+    for points in scales["points"]:
+        result_directory = fixtures.ill(points)
+
+        def setup(result_directory=result_directory):
+            # Remove the binary copies of the results so that the text files are parsed each time
+            for npy_file in result_directory.glob("*.npy"):
+                npy_file.unlink()
+            return result_directory,
+
+        items.append(Benchmark("radiation.load_results[points={}]".format(points), "radiation", {"points": points}, radiation.load_results, setup=setup))
+
+        sun, sky = radiation.load_results(result_directory)
+        sun, sky = np.array(sun), np.array(sky)
+        items.append(Benchmark(
+            "mrt.solarcal[points={}]".format(points), "mrt", {"points": points},
+            lambda sun=sun, sky=sky: mrt.solarcal(weather.location, sun, sky, longwave_mrt, floor_reflectance=0.25)))
+
+        mean_radiant_temperature = mrt.solarcal(weather.location, sun, sky, longwave_mrt, floor_reflectance=0.25)
+        items.append(Benchmark(
+            "utci.universal_thermal_climate_index_array[points={}]".format(points), "utci", {"points": points},
+            lambda values=mean_radiant_temperature: utci.universal_thermal_climate_index_array(weather, values, evaporative_cooling=True)))
+
+        store = ResultsStore(fixtures.scratch("store_{}".format(points)))
+        store.write("site", ["a", "b"], np.stack([mean_radiant_temperature, mean_radiant_temperature + 1]))
+        items.append(Benchmark("store.stress_hours[points={}]".format(points), "store", {"points": points}, lambda store=store: store.stress_hours("site")))
+
+    # Scenario sweeps of a single site, with each engine
+    for scenarios in scales["scenarios"]:
+        axes = scenario_axes(scenarios)
+        items.append(Benchmark(
+            "sweep.energyplus[scenarios={}]".format(scenarios), "sweep", {"scenarios": scenarios},
+            lambda axes=axes: sweep.sweep(epw_file, axes, idd_file=idd_file, direct_horizontal_solar=direct, diffuse_horizontal_solar=diffuse),
+            setup=lambda scenarios=scenarios: _fresh_cache(fixtures, "cache_sweep_{}".format(scenarios))))
+        items.append(Benchmark(
+            "sweep.conduction[scenarios={}]".format(scenarios), "sweep", {"scenarios": scenarios},
+            lambda axes=axes: sweep.sweep(epw_file, axes, direct_horizontal_solar=direct, diffuse_horizontal_solar=diffuse, engine="conduction")))
+
+    # Batches of sites, each sweeping the 4 scenarios with the conduction engine. Radiation checkpoints are seeded
+    # from the synthetic weather, standing in for the Radiance stage.
+    for sites in scales["sites"]:
+        epw_files = fixtures.epws(sites)
+        solar = [fixtures.solar(seed) for seed in range(sites)]
+
+        def setup(sites=sites, epw_files=epw_files, solar=solar):
+            output_directory = fixtures.scratch("batch_{}".format(sites))
+            for epw, (sun, sky) in zip(epw_files, solar):
+                site_directory = output_directory / batch.site_name(epw)
+                site_directory.mkdir()
+                np.savez(site_directory / "radiation.npz", sun=sun, diffuse=sky)
+            return output_directory,
+
+        items.append(Benchmark(
+            "batch.conduction[sites={}]".format(sites), "batch", {"sites": sites},
+            lambda output_directory, epw_files=epw_files: batch.run_batch(epw_files, scenario_axes(4), output_directory, engine="conduction"),
+            setup=setup, repeats=1 if sites > 10 else None))
+
+    # Rendering a heatmap of the results
+    items.append(Benchmark(
+        "plot.heatmaps", "plot", {"heatmaps": 1},
+        lambda output_directory, values=longwave_mrt: plot.heatmaps([(values, "Synthetic", output_directory / "heatmap.png")], workers=1),
+        setup=lambda: (fixtures.scratch("plot"),)))
+
+    # The full mitigation comparison of a site, with each engine
+    items.append(Benchmark(
+        "utci_comparison.energyplus", "end_to_end", {"scenarios": 16},
+        lambda: mitigations.utci_comparison(epw_file, idd_file, direct_horizontal_solar=direct, diffuse_horizontal_solar=diffuse),
+        setup=lambda: _fresh_cache(fixtures, "cache_comparison")))
+    items.append(Benchmark(
+        "utci_comparison.conduction", "end_to_end", {"scenarios": 16},
+        lambda: mitigations.utci_comparison(epw_file, direct_horizontal_solar=direct, diffuse_horizontal_solar=diffuse, engine="conduction")))
+
+    return items
+
+
+def environment():
+    """Versions and machine details recorded with a report, so results are only compared like-for-like"""
+    versions = {}
+    for package in ["numpy", "pandas", "matplotlib", "eppy", "ladybug-core", "ladybug-comfort", "lbt-honeybee"]:
+        try:
+            versions[package] = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            versions[package] = None
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, cwd=pathlib.Path(__file__).parent).stdout.decode().strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "packages": versions,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(directory: str, quick: bool = False, repeats: int = 3, select: str = None, report_file: str = None):
+    """
+    Run the benchmark suite
+    :param directory: Working directory for the synthetic inputs and benchmark outputs
+    :param quick: Use the smaller scales, for a fast check
+    :param repeats: Number of times each benchmark is run (the fastest is reported)
+    :param select: Only run benchmarks whose name contains this text
+    :param report_file: Location of the JSON report to write
+    :return report: Dictionary of environment and benchmark results
+    """
+
+    mode = "quick" if quick else "full"
+    fixtures = Fixtures(directory)
+    default_cache_directory = cache.default_cache.directory
+    default_cache_variable = os.environ.get(cache.CACHE_DIRECTORY_VARIABLE)
+
+    results = {}
+    try:
+        for benchmark in benchmarks(fixtures, SCALES[mode]):
+            if select is not None and select not in benchmark.name:
+                continue
+            logger.info("Running {}".format(benchmark.name))
+            results[benchmark.name] = benchmark.measure(repeats)
+            logger.info("{} took {:.3f}s".format(benchmark.name, results[benchmark.name]["wall_time"]))
+    finally:
+        cache.default_cache.directory = default_cache_directory
+        if default_cache_variable is None:
+            os.environ.pop(cache.CACHE_DIRECTORY_VARIABLE, None)
+        else:
+            os.environ[cache.CACHE_DIRECTORY_VARIABLE] = default_cache_variable
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "mode": mode,
+        "repeats": repeats,
+        "environment": environment(),
+        "results": results,
+    }
+
+    if report_file is not None:
+        with open(report_file, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return report
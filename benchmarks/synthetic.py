@@ -0,0 +1,196 @@
+import pathlib
+import stat
+import sys
+
+import numpy as np
+from ladybug.epw import EPW
+from ladybug.location import Location
+from ladybug.analysisperiod import AnalysisPeriod
+from ladybug.datacollection import MonthlyCollection
+from ladybug.header import Header
+from ladybug.datatype.temperature import GroundTemperature
+from ladybug.sunpath import Sunpath
+
+# Start hour of each month in a non-leap year
+_MONTH_START_HOURS = np.cumsum([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30]) * 24
+
+
+def synthetic_epw(file_path: str, seed: int = 0, latitude: float = 51.5, longitude: float = -0.1, time_zone: float = 0, mean_temperature: float = 11, annual_swing: float = 7, daily_swing: float = 4):
+    """
+    Write a synthetic but physically plausible weather-file, with seasonal and daily temperature cycles, clear-sky
+    radiation scaled by random cloudiness, and monthly ground temperatures, so benchmarks need no downloaded weather
+    :param file_path: Location of the EPW file to write
+    :param seed: Seed of the random weather
+    :param latitude: Latitude of the site [degrees]
+    :param longitude: Longitude of the site [degrees]
+    :param time_zone: Time zone of the site [hours]
+    :param mean_temperature: Annual mean dry-bulb temperature [C]
+    :param annual_swing: Amplitude of the seasonal dry-bulb temperature cycle [C]
+    :param daily_swing: Amplitude of the daily dry-bulb temperature cycle [C]
+    :return file_path:
+    """
+
+    rng = np.random.default_rng(seed)
+    hours = np.arange(8760)
+    day = hours / 24
+    hour = hours % 24
+
+    location = Location("Synthetic {}".format(seed), "-", "Synthetic", latitude, longitude, time_zone, 0, "000000")
+    sunpath = Sunpath.from_location(location)
+    altitude = np.array([sunpath.calculate_sun_from_hoy(hoy).altitude for hoy in AnalysisPeriod().hoys])
+
+    # Temperature, with the coldest day in mid-January and the warmest time of day mid-afternoon
+    season = -np.cos(2 * np.pi * (day - 15) / 365)
+    dry_bulb = mean_temperature + annual_swing * season - daily_swing * np.cos(2 * np.pi * (hour - 3) / 24) + rng.normal(0, 1.5, 8760)
+    relative_humidity = np.clip(75 - 20 * season - 10 * np.sin(2 * np.pi * (hour - 9) / 24) + rng.normal(0, 5, 8760), 15, 100)
+    dew_point = dry_bulb - (100 - relative_humidity) / 5
+    pressure = 101325 + rng.normal(0, 500, 8760)
+    wind_speed = np.clip(rng.gamma(2, 1.8, 8760), 0, 20)
+
+    # Radiation from a clear sky, reduced by a daily cloudiness
+    cloudiness = np.repeat(rng.uniform(0, 0.8, 365), 24)
+    sin_altitude = np.clip(np.sin(np.radians(altitude)), 0, None)
+    direct_normal = np.where(altitude > 0, 900 * np.exp(-0.2 / np.maximum(sin_altitude, 0.05)) * (1 - cloudiness), 0)
+    diffuse_horizontal = np.where(altitude > 0, (100 + 200 * cloudiness) * sin_altitude, 0)
+    global_horizontal = direct_normal * sin_altitude + diffuse_horizontal
+    sky_emissivity = (0.787 + 0.764 * np.log((dew_point + 273.15) / 273.15)) * (1 + 0.0224 * cloudiness * 10 - 0.0035 * (cloudiness * 10) ** 2)
+    horizontal_infrared = sky_emissivity * 5.670374419E-8 * (dry_bulb + 273.15) ** 4
+
+    epw = EPW.from_missing_values()
+    epw.location = location
+    for name, values in [
+        ("dry_bulb_temperature", dry_bulb), ("dew_point_temperature", dew_point), ("relative_humidity", relative_humidity),
+        ("atmospheric_station_pressure", pressure), ("wind_speed", wind_speed), ("wind_direction", rng.uniform(0, 360, 8760)),
+        ("global_horizontal_radiation", global_horizontal), ("direct_normal_radiation", direct_normal),
+        ("diffuse_horizontal_radiation", diffuse_horizontal), ("horizontal_infrared_radiation_intensity", horizontal_infrared),
+        ("total_sky_cover", cloudiness * 10), ("opaque_sky_cover", cloudiness * 10),
+    ]:
+        collection = getattr(epw, name)
+        collection.values = [round(float(i), 1) for i in values]
+
+    # Ground temperatures lag and damp the monthly air temperature with depth
+    monthly_air = np.array([dry_bulb[start:start + 24 * 28].mean() for start in _MONTH_START_HOURS])
+    ground_temperatures = {}
+    for depth, damping, lag in [(0.5, 0.8, 1), (2, 0.5, 2), (4, 0.3, 3)]:
+        values = mean_temperature + (np.roll(monthly_air, lag) - mean_temperature) * damping
+        header = Header(GroundTemperature(), "C", AnalysisPeriod(), metadata={"soil conductivity": "", "soil density": "", "soil specific heat": ""})
+        ground_temperatures[depth] = MonthlyCollection(header, [round(float(i), 2) for i in values], list(range(1, 13)))
+    epw.monthly_ground_temperature = ground_temperatures
+
+    pathlib.Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+    epw.save(str(file_path))
+
+    # Ladybug dates the 24th hour of each day as the following day, so the date fields are rewritten as in a standard EPW
+    with open(file_path, "r") as f:
+        lines = f.readlines()
+    months = np.repeat(np.arange(1, 13), np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]) * 24)
+    days = np.concatenate([np.repeat(np.arange(1, n + 1), 24) for n in [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]])
+    for n in range(8760):
+        fields = lines[8 + n].split(",", 5)
+        lines[8 + n] = ",".join([fields[0], str(months[n]), str(days[n]), str(hour[n] + 1), fields[4], fields[5]])
+    with open(file_path, "w") as f:
+        f.writelines(lines)
+
+    return file_path
+
+
+def synthetic_ill(file_path: str, points: int, seed: int = 0, hours: int = 8760):
+    """
+    Write a Radiance result matrix of random irradiance values, as written by rmtxop for an annual grid-based recipe
+    :param file_path: Location of the .ill file to write
+    :param points: Number of points (rows)
+    :param seed: Seed of the random values
+    :param hours: Number of hours (columns)
+    :return file_path:
+    """
+
+    rng = np.random.default_rng(seed)
+    daylight = (np.arange(hours) % 24 >= 6) & (np.arange(hours) % 24 < 18)
+    values = rng.uniform(0, 179 * 800, (points, hours)) * daylight
+    with open(file_path, "w") as f:
+        f.write("#?RADIANCE\nrmtxop\nNROWS={}\nNCOLS={}\nNCOMP=1\nFORMAT=ascii\n\n".format(points, hours))
+        np.savetxt(f, values, fmt="%.2f", delimiter="\t")
+    return file_path
+
+
+def synthetic_radiation_results(result_directory: str, points: int, seed: int = 0):
+    """
+    Write the total, direct-sky and sun result matrices of an annual grid-based recipe, for openfield.radiation.load_results
+    :param result_directory: Location of the result files
+    :param points: Number of points
+    :param seed: Seed of the random values
+    :return result_directory:
+    """
+
+    result_directory = pathlib.Path(result_directory)
+    result_directory.mkdir(parents=True, exist_ok=True)
+    for n, name in enumerate(["total", "direct", "sun"]):
+        synthetic_ill(result_directory / "{}..scene..default.ill".format(name), points, seed + n)
+    return result_directory
+
+
+# Stand-in for the EnergyPlus executable, writing an ESO of a plausible ground surface temperature for the weather-file
+_ENERGYPLUS_STUB = '''#!{python}
+import argparse
+import math
+import pathlib
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-a", action="store_true")
+parser.add_argument("-w")
+parser.add_argument("-d")
+parser.add_argument("idf")
+args = parser.parse_args()
+
+with open(args.w, "r") as f:
+    rows = [line.split(",") for line in f.readlines()[8:]]
+
+# Without -a, only the days of the input file's run period are simulated
+start = 0
+if not args.a:
+    with open(args.idf, "r") as f:
+        lines = f.read().split("RUNPERIOD,", 1)[1].splitlines()[2:6]
+    begin_month, begin_day, end_month, end_day = [int(line.split("!-")[0].strip(" ,;")) for line in lines]
+    start = [n for n, row in enumerate(rows) if (int(row[1]), int(row[2])) == (begin_month, begin_day)][0]
+    end = [n for n, row in enumerate(rows) if (int(row[1]), int(row[2])) == (end_month, end_day)][-1] + 1
+    rows = rows[start:end]
+
+output = pathlib.Path(args.d)
+output.mkdir(parents=True, exist_ok=True)
+with open(output / "eplusout.eso", "w") as f:
+    f.write("Program Version,EnergyPlus (openfield benchmark stand-in)\\n")
+    f.write("1,5,Environment Title[],Latitude[deg],Longitude[deg],Time Zone[],Elevation[m]\\n")
+    f.write("2,8,Day of Simulation[],Month[],Day of Month[],DST Indicator[1=yes 0=no],Hour[],StartMinute[],EndMinute[],DayType\\n")
+    f.write("7,1,GROUND_SURFACE_0,Surface Outside Face Temperature [C] !Hourly\\n")
+    f.write("End of Data Dictionary\\n")
+    f.write("1,RUN PERIOD 1,51.5,-0.1,0.0,0.0\\n")
+    for n, row in enumerate(rows):
+        dry_bulb, radiation = float(row[6]), float(row[13])
+        f.write("2,{{}},{{}},{{}},0,{{}},0.00,60.00,Monday\\n".format(n // 24 + 1, row[1], row[2], row[3]))
+        f.write("7,{{:.4f}}\\n".format(dry_bulb + 0.02 * radiation + math.sin((start + n) / 24.0)))
+    f.write("End of Data\\n")
+(output / "eplusout.err").write_text("Program Version,EnergyPlus (openfield benchmark stand-in)\\n")
+'''
+
+
+def stub_energyplus(directory: str):
+    """
+    Create a stand-in EnergyPlus installation: an IDD (from eppy's bundled IDD files, for writing the IDF) and an
+    "energyplus" executable that writes a canned ESO instead of simulating
+    :param directory: Location of the stand-in installation
+    :return idd_file: Location of the IDD file, to pass to openfield as the EnergyPlus IDD
+    """
+
+    import eppy
+
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    idd_file = directory / "Energy+.idd"
+    source = pathlib.Path(eppy.__file__).parent / "resources" / "iddfiles" / "Energy+V8_9_0.idd"
+    idd_file.write_text(source.read_text())
+
+    for name in ["energyplus", "energyplus.exe"]:
+        executable = directory / name
+        executable.write_text(_ENERGYPLUS_STUB.format(python=sys.executable))
+        executable.chmod(executable.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return idd_file
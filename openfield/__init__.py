@@ -1 +1,18 @@
-from openfield import ground, radiation, mrt, utci, plot, mitigations
+import importlib
+
+# Submodules are imported on first access (e.g. openfield.utci), so that importing the package - in each worker of a
+# process pool, or for the command line - doesn't pull in EnergyPlus, Radiance and plotting dependencies it won't use
+__all__ = [
+    "batch", "cache", "conduction", "daylight", "eso", "ground", "mitigations", "mrt", "period", "pipeline", "plot",
+    "profiling", "psychrometrics", "radiation", "store", "sweep", "utci", "weather",
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
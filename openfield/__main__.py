@@ -0,0 +1,201 @@
+import argparse
+import json
+import logging
+import pathlib
+import sys
+
+import numpy as np
+
+logger = logging.getLogger("openfield")
+
+# Pipeline stages in the order they run, and the stages whose results each one needs
+STAGES = {
+    "radiation": [],
+    "ground": [],
+    "mrt": ["radiation", "ground"],
+    "utci": ["mrt"],
+    "heatmap": ["utci"],
+    "mitigations": [],
+    "sweep": [],
+    "batch": [],
+}
+
+
+def load_config(config_file: str):
+    """
+    Load a pipeline configuration, e.g.
+        {
+            "epw_file": "weather.epw",
+            "idd_file": "EnergyPlus/Energy+.idd",
+            "output_directory": "results",
+            "engine": "energyplus",
+            "analysis_period": {"st_month": 6, "end_month": 8},
+            "stages": {"ground": {"material": {"reflectivity": 0.4}}, "utci": {"wind": 1}, "heatmap": {"plot_type": "comfort"}}
+        }
+    Each stage's options are passed to its runner - e.g. "radiation" takes a "result_directory" of earlier Radiance
+    results to load rather than simulating, and "sweep" and "batch" take the "axes" to sweep.
+    Relative paths are taken from the folder of the configuration file. Stages needed by those listed are added with
+    their default options.
+    :param config_file: JSON configuration file
+    :return config:
+    """
+
+    config_file = pathlib.Path(config_file)
+    with open(config_file, "r") as f:
+        config = json.load(f)
+
+    for k in ["epw_file", "idd_file", "output_directory"]:
+        if config.get(k) is not None:
+            config[k] = str(config_file.parent / config[k])
+    for stage, k in [("radiation", "result_directory"), ("batch", "source")]:
+        if isinstance(config.get("stages", {}).get(stage, {}).get(k), str):
+            config["stages"][stage][k] = str(config_file.parent / config["stages"][stage][k])
+    config.setdefault("output_directory", str(config_file.parent / "openfield_results"))
+    config.setdefault("engine", "energyplus")
+
+    stages = dict(config.get("stages", {}))
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise ValueError("Unknown pipeline stages {} - use {}".format(unknown, list(STAGES)))
+    for stage in reversed(list(STAGES)):
+        if stage in stages:
+            for required in STAGES[stage]:
+                stages.setdefault(required, {})
+    config["stages"] = {stage: stages[stage] for stage in STAGES if stage in stages}
+    return config
+
+
+def run(config: dict):
+    """
+    Run the stages of a pipeline configuration (see load_config), importing only the openfield modules they use.
+    Comfort results are written to the results store in the "store" folder of the output directory.
+    :param config: Pipeline configuration
+    :return results: Dictionary of stage name and its result
+    """
+
+    output_directory = pathlib.Path(config["output_directory"])
+    output_directory.mkdir(parents=True, exist_ok=True)
+    if config.get("analysis_period") is not None:
+        from ladybug.analysisperiod import AnalysisPeriod
+        config = dict(config, analysis_period=AnalysisPeriod(**config["analysis_period"]))
+
+    results = {}
+    for stage, options in config["stages"].items():
+        logger.info("Running %s", stage)
+        results[stage] = _RUNNERS[stage](config, results, **options)
+    return results
+
+
+def _site(config: dict):
+    from .batch import site_name
+    return config.get("site") or site_name(config["epw_file"])
+
+
+def _hours(config: dict):
+    from .period import analysis_hours
+    return analysis_hours(config.get("analysis_period")).tolist()
+
+
+def _solar(results: dict):
+    return results.get("radiation", (None, None))
+
+
+def _radiation(config: dict, results: dict, case_name: str = None, result_directory: str = None):
+    from . import radiation
+    if result_directory is None:
+        return radiation.run(config["epw_file"], case_name=case_name, output_directory=config["output_directory"], analysis_period=config.get("analysis_period"))
+
+    return radiation.load_test_point(result_directory, analysis_period=config.get("analysis_period"))
+
+
+def _ground(config: dict, results: dict, material: dict = None, is_shaded: bool = False, shade_height: float = 4, shade_transmittance: float = 0, timeout: float = None):
+    from .ground import Ground
+    ground = Ground(**(material or {}))
+    direct, diffuse = _solar(results)
+    ground.calculate_surface_temperature(
+        config["epw_file"], config.get("idd_file"), output_directory=config["output_directory"], is_shaded=is_shaded,
+        shade_height=shade_height, shade_transmittance=shade_transmittance, timeout=timeout, engine=config["engine"],
+        direct_horizontal_solar=direct, diffuse_horizontal_solar=diffuse, analysis_period=config.get("analysis_period"))
+    return ground
+
+
+def _mrt(config: dict, results: dict):
+    from . import mrt
+    direct, diffuse = _solar(results)
+    ground = results["ground"]
+    return mrt.mean_radiant_temperature(config["epw_file"], direct, diffuse, ground=ground, is_shaded=ground.is_shaded)
+
+
+def _utci(config: dict, results: dict, wind: int = 1, evaporative_cooling: bool = False, evaporative_cooling_effectiveness: float = 0.7):
+    from . import utci
+    from .store import ResultsStore
+    collection = utci.universal_thermal_climate_index(config["epw_file"], results["mrt"], wind=wind, evaporative_cooling=evaporative_cooling, evaporative_cooling_effectiveness=evaporative_cooling_effectiveness)
+    ResultsStore(pathlib.Path(config["output_directory"]) / "store").write(_site(config), ["utci"], np.array([collection.values]), hours=_hours(config))
+    return collection
+
+
+def _heatmap(config: dict, results: dict, plot_type: str = "comfort", location_string: str = None, save_path: str = None):
+    from . import plot
+    from .weather import load_weather
+    location = load_weather(config["epw_file"]).location
+    location_string = "{} - {} - {}".format(location.country, location.city, location.station_id) if location_string is None else location_string
+    save_path = pathlib.Path(config["output_directory"]) / "{}_{}.png".format(_site(config), plot_type) if save_path is None else save_path
+    plot.HeatmapRenderer(plot_type).render(results["utci"].values, location_string=location_string, save_path=save_path, analysis_period=config.get("analysis_period"))
+    return str(save_path)
+
+
+def _mitigations(config: dict, results: dict, workers: int = None, timeout: float = None):
+    from . import mitigations
+    from .store import ResultsStore
+    direct, diffuse = _solar(results)
+    values = mitigations.utci_comparison(config["epw_file"], config.get("idd_file"), direct, diffuse, workers=workers, timeout=timeout, engine=config["engine"], analysis_period=config.get("analysis_period"))
+    ResultsStore(pathlib.Path(config["output_directory"]) / "store").write(_site(config), list(values), np.stack(list(values.values())), variable="mitigations", hours=_hours(config))
+    return values
+
+
+def _sweep(config: dict, results: dict, axes: dict, workers: int = None, timeout: float = None):
+    from . import sweep
+    from .store import ResultsStore
+    direct, diffuse = _solar(results)
+    result = sweep.sweep(config["epw_file"], axes, idd_file=config.get("idd_file"), direct_horizontal_solar=direct, diffuse_horizontal_solar=diffuse, engine=config["engine"], workers=workers, timeout=timeout, analysis_period=config.get("analysis_period"))
+    ResultsStore(pathlib.Path(config["output_directory"]) / "store").write_sweep(_site(config), result, variable="sweep")
+    return result
+
+
+def _batch(config: dict, results: dict, axes: dict, source=None, workers: int = None, timeout: float = None):
+    from . import batch
+    source = config["epw_file"] if source is None else source
+    return batch.run_batch([source] if str(source).lower().endswith(".epw") else source, axes, config["output_directory"], idd_file=config.get("idd_file"), engine=config["engine"], workers=workers, timeout=timeout)
+
+
+_RUNNERS = {
+    "radiation": _radiation,
+    "ground": _ground,
+    "mrt": _mrt,
+    "utci": _utci,
+    "heatmap": _heatmap,
+    "mitigations": _mitigations,
+    "sweep": _sweep,
+    "batch": _batch,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m openfield", description="Run an openfield pipeline from a JSON configuration file")
+    parser.add_argument("config", help="JSON configuration file (see openfield.__main__.load_config)")
+    parser.add_argument("--trace", help="Location to write a Chrome trace of the time spent in each stage (see openfield.profiling)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    config = load_config(args.config)
+    if args.trace:
+        from . import profiling
+        profiling.enable()
+    run(config)
+    if args.trace:
+        profiling.write_trace(args.trace)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
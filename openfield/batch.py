@@ -0,0 +1,221 @@
+import logging
+import os
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+from ladybug.datatype.energyflux import DirectHorizontalIrradiance, DiffuseHorizontalIrradiance
+
+from .cache import file_hash, hash_key
+from .ground import Ground, calculate_surface_temperatures
+from . import period, profiling, radiation, sweep
+from .store import ResultsStore
+from .weather import load_weather
+
+logger = logging.getLogger(__name__)
+
+
+def weather_files(source):
+    """
+    List the weather-files to run in a batch
+    :param source: Directory of EPW files, manifest file listing one EPW file per line (relative paths are relative to the manifest, and lines starting with # are ignored), or list of EPW files
+    :return weather_files: List of weather-file paths
+    """
+
+    if isinstance(source, (list, tuple)):
+        return [pathlib.Path(i) for i in source]
+
+    source = pathlib.Path(source)
+    if source.is_dir():
+        return sorted(source.glob("*.epw"))
+
+    files = []
+    with open(source, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                path = pathlib.Path(line)
+                files.append(path if path.is_absolute() else source.parent / path)
+    return files
+
+
+def site_name(epw_file: str):
+    """Name of the results folder for a weather-file, unique to its contents"""
+    return "{}_{}".format(pathlib.Path(epw_file).stem, file_hash(epw_file)[:8])
+
+
+def run_batch(source, axes: dict, output_directory: str, idd_file: str = None, engine: str = "energyplus", workers: int = None, timeout: float = None):
+    """
+    Run a scenario sweep for many weather-files across a pool of processes. Each completed stage (radiation, each ground
+    surface temperature and the comfort calculation) is checkpointed to the site's folder in the output directory, so
+    rerunning an interrupted batch only runs the stages that hadn't completed.
+    :param source: Directory of EPW files, manifest file listing EPW files, or list of EPW files (see weather_files)
+    :param axes: Dictionary of parameter name and list of values to sweep (see openfield.sweep.sweep)
+    :param output_directory: Location of checkpoints, and of the results store (in its "store" folder - see openfield.store.ResultsStore)
+    :param idd_file: Location of EnergyPlus IDD file (to enable reference of IDF objects and simulation). Not needed by the "conduction" engine
+    :param engine: Ground surface temperature engine - "energyplus", or "conduction" to solve each site's grounds at once in-process
+    :param workers: Number of processes running stages concurrently. Defaults to the number of CPUs
+    :param timeout: Maximum time in seconds to allow each EnergyPlus simulation to run
+    :return results: Dictionary of weather-file and the name of its site in the results store, for the sites that completed
+    """
+
+    output_directory = pathlib.Path(output_directory)
+    output_directory.mkdir(parents=True, exist_ok=True)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    _, ground_keys, _ = sweep.plan(axes)
+
+    # Work out the stages still to run for each site
+    sites = {}
+    for epw_file in weather_files(source):
+        site_directory = output_directory / site_name(epw_file)
+        site_directory.mkdir(exist_ok=True)
+        ground_files = [site_directory / "ground_{}.npy".format(hash_key(key, engine)[:16]) for key in ground_keys]
+        sites[str(epw_file)] = {
+            "directory": site_directory,
+            "ground_files": ground_files,
+            "pending": {"radiation"} | {str(n) for n, f in enumerate(ground_files)} if engine != "conduction" else {"radiation", "ground"},
+        }
+        if (site_directory / "radiation.npz").exists():
+            sites[str(epw_file)]["pending"].discard("radiation")
+        for n, f in enumerate(ground_files):
+            if f.exists():
+                sites[str(epw_file)]["pending"].discard(str(n))
+        if all(f.exists() for f in ground_files):
+            sites[str(epw_file)]["pending"].discard("ground")
+
+    # Sites are complete once their comfort results exist for these axes
+    store = ResultsStore(output_directory / "store")
+    axes_key = hash_key(axes, engine)
+    remaining = [epw_file for epw_file, site in sites.items() if _result_key(store, site["directory"].name) != axes_key]
+    total = sum(len(sites[epw_file]["pending"]) + 1 for epw_file in remaining)
+    logger.info("Batch of {} sites: {} already complete, {} stages to run".format(len(sites), len(sites) - len(remaining), total))
+
+    start = time.time()
+    completed = 0
+    failed = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+
+        def submit_comfort(epw_file):
+            site = sites[epw_file]
+            futures[profiling.submit(executor, _comfort_stage, epw_file, axes, axes_key, site["directory"], site["ground_files"], store)] = (epw_file, "comfort")
+
+        def submit_conduction(epw_file):
+            site = sites[epw_file]
+            futures[profiling.submit(executor, _conduction_stage, epw_file, ground_keys, site["directory"], site["ground_files"])] = (epw_file, "ground")
+
+        # Queue the simulation stages of every site, and the comfort stage of any site whose simulations have all
+        # completed. The conduction solver uses the site's radiation, so it is queued once that has completed.
+        for epw_file in remaining:
+            site = sites[epw_file]
+            for stage in sorted(site["pending"]):
+                if stage == "radiation":
+                    futures[profiling.submit(executor, _radiation_stage, epw_file, site["directory"])] = (epw_file, stage)
+                elif stage == "ground":
+                    if "radiation" not in site["pending"]:
+                        submit_conduction(epw_file)
+                else:
+                    n = int(stage)
+                    futures[profiling.submit(executor, _energyplus_stage, epw_file, ground_keys[n], idd_file, site["directory"], site["ground_files"][n], timeout)] = (epw_file, stage)
+            if not site["pending"]:
+                submit_comfort(epw_file)
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                epw_file, stage = futures.pop(future)
+                completed += 1
+                try:
+                    future.result()
+                except Exception as e:
+                    # Carry on with the other sites - this one can be resumed from its last checkpoint once the problem is fixed
+                    failed[epw_file] = e
+                    logger.error("{} {} failed: {}".format(pathlib.Path(epw_file).name, stage, e))
+                    continue
+                if stage != "comfort":
+                    sites[epw_file]["pending"].discard(stage)
+                    if stage == "radiation" and "ground" in sites[epw_file]["pending"]:
+                        submit_conduction(epw_file)
+                    if not sites[epw_file]["pending"] and epw_file not in failed:
+                        submit_comfort(epw_file)
+
+                elapsed = time.time() - start
+                rate = completed / elapsed
+                logger.info("[{}/{}] {} {} completed ({:.2f} stages/min, about {:.0f}s remaining)".format(completed, total, pathlib.Path(epw_file).name, stage, rate * 60, (total - completed) / rate))
+
+    logger.info("Batch completed in {:.0f}s{}".format(time.time() - start, ", with {} sites failed".format(len(failed)) if failed else ""))
+
+    return {epw_file: site["directory"].name for epw_file, site in sites.items() if epw_file not in failed}
+
+
+def load_result(output_directory: str, site: str, mmap_mode: str = "r"):
+    """
+    Load the UTCI sweep result of a site from a batch
+    :param output_directory: Location of the batch outputs
+    :param site: Name of the site (see run_batch)
+    :param mmap_mode: Memory-map mode used to open the values, or None to load them into memory
+    :return utci: openfield.sweep.SweepResult of UTCI values
+    """
+
+    store = ResultsStore(pathlib.Path(output_directory) / "store")
+    metadata = store.metadata(site)
+    values = store.read(site, mmap_mode=mmap_mode)
+    shape = [len(metadata["coords"][dim]) for dim in metadata["dims"]] + [values.shape[-1]]
+    return sweep.SweepResult(metadata["dims"] + ["hour"], dict(metadata["coords"], hour=metadata.get("hours", list(range(values.shape[-1])))), values.reshape(shape))
+
+
+def _result_key(store: ResultsStore, site: str):
+    """Key of the axes and engine of the completed results of a site, or None if it has no results"""
+    try:
+        return store.metadata(site)["key"]
+    except (FileNotFoundError, KeyError, ValueError):
+        return None
+
+
+def _save(file_path: pathlib.Path, values):
+    """Save an array so that it only appears at its location once completely written"""
+    temporary_path = file_path.with_name(file_path.name + ".tmp")
+    with open(temporary_path, "wb") as f:
+        np.save(f, values)
+    os.replace(temporary_path, file_path)
+
+
+@profiling.profiled("batch.radiation")
+def _radiation_stage(epw_file: str, site_directory: pathlib.Path):
+    """Simulate the open-field solar radiation of a site"""
+    sun, diffuse = radiation.run(epw_file, case_name="radiation", output_directory=site_directory)
+    temporary_path = site_directory / "radiation.npz.tmp"
+    with open(temporary_path, "wb") as f:
+        np.savez(f, sun=np.array(sun.values), diffuse=np.array(diffuse.values))
+    os.replace(temporary_path, site_directory / "radiation.npz")
+
+
+@profiling.profiled("batch.energyplus")
+def _energyplus_stage(epw_file: str, ground_key: tuple, idd_file: str, site_directory: pathlib.Path, ground_file: pathlib.Path, timeout: float = None):
+    """Simulate the surface temperature of one ground of a site in EnergyPlus"""
+    material, (is_shaded, shade_height, shade_transmittance) = ground_key
+    ground = Ground(*material)
+    ground.calculate_surface_temperature(epw_file, idd_file, case_name="ground", output_directory=site_directory, is_shaded=is_shaded, shade_height=shade_height, shade_transmittance=shade_transmittance, timeout=timeout)
+    _save(ground_file, np.array(ground.surface_temperature.values))
+
+
+@profiling.profiled("batch.conduction")
+def _conduction_stage(epw_file: str, ground_keys: list, site_directory: pathlib.Path, ground_files: list):
+    """Calculate the surface temperature of every ground of a site at once with the conduction solver, from its checkpointed radiation"""
+    with np.load(site_directory / "radiation.npz") as f:
+        sun = period.hourly_collection(DirectHorizontalIrradiance(), "W/m2", f["sun"])
+        diffuse = period.hourly_collection(DiffuseHorizontalIrradiance(), "W/m2", f["diffuse"])
+    grounds = calculate_surface_temperatures([Ground(*material) for material, _ in ground_keys], epw_file, is_shaded=[shade[0] for _, shade in ground_keys], shade_transmittance=[shade[2] or 0 for _, shade in ground_keys], direct_horizontal_solar=sun, diffuse_horizontal_solar=diffuse)
+    for ground, ground_file in zip(grounds, ground_files):
+        _save(ground_file, np.array(ground.surface_temperature.values))
+
+
+@profiling.profiled("batch.comfort")
+def _comfort_stage(epw_file: str, axes: dict, axes_key: str, site_directory: pathlib.Path, ground_files: list, store: ResultsStore):
+    """Calculate MRT and UTCI for every case of a site from its checkpointed radiation and ground surface temperatures"""
+    with np.load(site_directory / "radiation.npz") as f:
+        sun, diffuse = f["sun"], f["diffuse"]
+    result = sweep.combine(load_weather(epw_file), axes, [np.load(f) for f in ground_files], sun, diffuse)
+
+    store.write_sweep(site_directory.name, result, epw=str(epw_file), key=axes_key)
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Most recently used file hashes, by path, size and modification time, and the number kept
+_FILE_HASHES = OrderedDict()
+_FILE_HASHES_SIZE = 1024
+_FILE_HASHES_LOCK = threading.Lock()
+
+# Environment variable overriding the location of the default result cache. Being read when each process imports this
+# module, it also applies to worker processes, however they are started.
+CACHE_DIRECTORY_VARIABLE = "OPENFIELD_CACHE_DIRECTORY"
+
+
+def file_hash(file_path: str):
+    """
+    Hash the contents of a file, memoized against its path, size and modification time for recently hashed files
+    :param file_path: File to be hashed
+    :return hash: SHA-256 hex digest of the file contents
+    """
+
+    file_path = pathlib.Path(file_path).absolute()
+    stat = file_path.stat()
+    memo_key = (str(file_path), stat.st_size, stat.st_mtime_ns)
+
+    with _FILE_HASHES_LOCK:
+        if memo_key in _FILE_HASHES:
+            _FILE_HASHES.move_to_end(memo_key)
+            return _FILE_HASHES[memo_key]
+
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+
+    with _FILE_HASHES_LOCK:
+        _FILE_HASHES[memo_key] = h.hexdigest()
+        while len(_FILE_HASHES) > _FILE_HASHES_SIZE:
+            _FILE_HASHES.popitem(last=False)
+    return h.hexdigest()
+
+
+def hash_key(*parts):
+    """
+    Create a content-addressed key from a set of JSON-serialisable parts
+    :param parts: Values identifying a result (parameters, file hashes, versions, geometry)
+    :return key: SHA-256 hex digest of the parts
+    """
+
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def array_hash(values):
+    """
+    Hash the contents of an array, including its shape and type
+    :param values: Array-like set of values
+    :return hash: SHA-256 hex digest of the array
+    """
+
+    values = np.ascontiguousarray(values)
+    h = hashlib.sha256("{}{}".format(values.dtype.str, values.shape).encode("utf-8"))
+    h.update(values.tobytes())
+    return h.hexdigest()
+
+
+class ResultCache(object):
+    def __init__(self, directory: str = None, max_size: int = 512 * 1024 ** 2):
+        """
+        On-disk store of simulation results, addressed by the hash of their inputs
+        :param directory: Location of cached results. Defaults to the OPENFIELD_CACHE_DIRECTORY environment variable, if set, otherwise a folder in the system temporary directory
+        :param max_size: Maximum size of the cache in bytes, above which least-recently-used entries are evicted
+        """
+
+        if directory is None:
+            directory = os.environ.get(CACHE_DIRECTORY_VARIABLE) or pathlib.Path(tempfile.gettempdir()) / "openfield" / "cache"
+        self.directory = pathlib.Path(directory)
+        self.max_size = max_size
+
+    def __repr__(self):
+        return "ResultCache: {} ({} entries, {} bytes)".format(self.directory, len(self._entries()), self.size)
+
+    def __contains__(self, key):
+        return self._path(key).exists()
+
+    def _path(self, key):
+        return self.directory / "{}.npy".format(key)
+
+    def _entries(self):
+        if not self.directory.exists():
+            return []
+        return list(self.directory.glob("*.npy"))
+
+    @property
+    def size(self):
+        return sum(i.stat().st_size for i in self._entries())
+
+    def get(self, key: str):
+        """
+        Load a cached result
+        :param key: Key of the result
+        :return values: Array of cached values, or None if the key isn't in the cache
+        """
+
+        path = self._path(key)
+        try:
+            values = np.load(path)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+        # Mark as recently used so that eviction removes older results first. A concurrent eviction may already have
+        # removed the file, which doesn't affect the values loaded.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return values
+
+    def put(self, key: str, values):
+        """
+        Store a result in the cache, evicting old entries if the cache grows beyond its maximum size
+        :param key: Key of the result
+        :param values: Array-like set of values to be stored
+        :return path: Location of the cached result
+        """
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+
+        # Write to a temporary file first so that concurrent readers never see a partial result
+        temp_path = self.directory / "{}.{}.tmp".format(key, os.getpid())
+        with open(temp_path, "wb") as f:
+            np.save(f, np.asarray(values))
+        os.replace(temp_path, path)
+
+        self.evict()
+
+        return path
+
+    def invalidate(self, key: str = None):
+        """
+        Remove a result from the cache
+        :param key: Key of the result to be removed. If None, all cached results are removed
+        :return:
+        """
+
+        paths = self._entries() if key is None else [self._path(key)]
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """
+        Remove least-recently-used results until the cache is within its maximum size
+        :return:
+        """
+
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(i[1] for i in entries)
+        for _, size, path in sorted(entries, key=lambda x: x[0]):
+            if total <= self.max_size:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+default_cache = ResultCache()
@@ -0,0 +1,133 @@
+from typing import Union
+
+import numpy as np
+from ladybug.analysisperiod import AnalysisPeriod
+
+from . import period, profiling
+from .weather import Weather, load_weather
+
+# Stefan-Boltzmann constant [W/m2K4]
+_SIGMA = 5.670374419E-8
+
+# Start hour of each month in a non-leap year, used to apply monthly ground temperatures hourly
+_MONTH_START_HOURS = np.cumsum([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30]) * 24
+
+
+@profiling.profiled("conduction.surface_temperature")
+def surface_temperature(epw_file: Union[str, Weather], thickness=0.2, reflectivity=0.35, emissivity=0.9, conductivity=1.1, density=2250, specific_heat=1000, is_shaded=False, shade_transmittance=0, solar_radiation=None, nodes: int = 20, timesteps_per_hour: int = 6, inside_film_resistance: float = 0.15, warmup_days: tuple = (6, 25), warmup_tolerance: float = 0.1, analysis_period: AnalysisPeriod = None):
+    """
+    Calculate the hourly surface temperature of one or more ground slabs using a 1D implicit finite-difference heat
+    balance, as a fast in-process alternative to simulating each slab in EnergyPlus. The top face exchanges absorbed
+    solar, long-wave radiation with the sky and convection with the outdoor air; the bottom face is coupled to the
+    weather-file's 0.5m monthly ground temperature through an inside film resistance (standing in for the enclosed zone
+    beneath the ground in the EnergyPlus model). As in EnergyPlus, the first day is repeated until the slab reaches a
+    periodic state before the year is run, and shading scales the solar radiation by the shade's transmittance but
+    leaves exchange with the sky unchanged. For an analysis period, only the days from a week before it to its end are
+    run (see openfield.period.simulation_window), with the warm-up repeating the first of those days.
+    Material properties and shading broadcast against each other, so arrays of length n solve n slabs at once.
+    :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+    :param thickness: Thickness of ground material [m]
+    :param reflectivity: Solar reflectivity of ground surface [0-1]
+    :param emissivity: Thermal emissivity of ground surface [0-1]
+    :param conductivity: Conductivity of ground material [W/mK]
+    :param density: Density of ground material [kg/m3]
+    :param specific_heat: Specific heat capacity of ground material [J/kgK]
+    :param is_shaded: Whether the ground is shaded from the sun and sky
+    :param shade_transmittance: Solar transmittance of the shade [0-1]
+    :param solar_radiation: Hourly global horizontal radiation reaching the ground [W/m2], of shape (8760,) or (n, 8760), or with the hours of the analysis period in place of 8760 (the weather-file global horizontal radiation is used for the hours ahead of the period). Defaults to the weather-file global horizontal radiation
+    :param nodes: Number of nodes through the thickness of each slab
+    :param timesteps_per_hour: Number of solver timesteps per hour
+    :param inside_film_resistance: Thermal resistance between the bottom face of the slab and the ground temperature [m2K/W]
+    :param warmup_days: Minimum and maximum number of repetitions of the first day before the year is run
+    :param warmup_tolerance: Largest change in any hourly surface temperature between warm-up days at which the slab is considered periodic [C]
+    :param analysis_period: Ladybug AnalysisPeriod of the hours to calculate. If None, the whole year
+    :return surface_temperature: Array of hourly surface temperature [C], of shape (hours,) for a single slab or (n, hours)
+    """
+
+    weather = load_weather(epw_file)
+    hours = period.analysis_hours(analysis_period)
+    start, end = period.simulation_window(analysis_period)
+    solar_radiation = weather.global_horizontal_radiation if solar_radiation is None else np.asarray(solar_radiation, dtype=float)
+    if solar_radiation.shape[-1] != len(weather.global_horizontal_radiation):
+        # Radiation given for the analysis period only is filled out to the year with the weather-file radiation
+        radiation = np.array(np.broadcast_to(weather.global_horizontal_radiation, solar_radiation.shape[:-1] + weather.global_horizontal_radiation.shape))
+        radiation[..., hours] = solar_radiation
+        solar_radiation = radiation
+    single = all(np.ndim(i) == 0 for i in [thickness, reflectivity, emissivity, conductivity, density, specific_heat, is_shaded, shade_transmittance]) and np.ndim(solar_radiation) == 1
+    thickness, reflectivity, emissivity, conductivity, density, specific_heat, is_shaded, shade_transmittance = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(i, dtype=float)) for i in [thickness, reflectivity, emissivity, conductivity, density, specific_heat, is_shaded, shade_transmittance]]
+    )
+    n_slabs = len(thickness)
+
+    # Hourly boundary conditions, of shape (slabs, hours) where they vary between slabs
+    air_temperature = weather.dry_bulb_temperature + 273.15
+    sky_temperature = (weather.horizontal_infrared_radiation_intensity / _SIGMA) ** 0.25
+    convection = 5.7 + 3.8 * weather.wind_speed
+    transmitted = np.where(is_shaded > 0, shade_transmittance, 1)[:, None]
+    absorbed_solar = transmitted * (1 - reflectivity[:, None]) * np.broadcast_to(solar_radiation, (n_slabs, len(air_temperature)))
+    ground_temperature = weather.monthly_ground_temperature[0.5][np.searchsorted(_MONTH_START_HOURS, np.arange(len(air_temperature)), side="right") - 1] + 273.15
+
+    # Node spacing and heat capacity (the end nodes hold half a cell)
+    dx = thickness / (nodes - 1)
+    dt = 3600 / timesteps_per_hour
+    capacity = np.repeat((density * specific_heat * dx / dt)[:, None], nodes, axis=1)
+    capacity[:, [0, -1]] /= 2
+    link = (conductivity / dx)[:, None]
+    inside = 1 / inside_film_resistance
+
+    # Implicit scheme matrix, excluding the surface heat-transfer coefficient which changes every timestep and is
+    # applied by the Sherman-Morrison formula, so the constant part is only inverted once
+    matrix = np.zeros((n_slabs, nodes, nodes))
+    i = np.arange(nodes)
+    matrix[:, i, i] = capacity
+    matrix[:, i[:-1], i[:-1]] += link
+    matrix[:, i[1:], i[1:]] += link
+    matrix[:, i[:-1], i[1:]] -= link
+    matrix[:, i[1:], i[:-1]] -= link
+    matrix[:, -1, -1] += inside
+    inverse = np.linalg.inv(matrix)
+    surface_response = inverse[:, :, 0]
+
+    def run_hours(hours, temperature, previous_hours=None):
+        """Step the slab temperatures through the given hours, returning the hourly mean surface temperature"""
+        result = np.empty((n_slabs, len(hours)))
+        previous_hours = np.roll(hours, 1) if previous_hours is None else previous_hours
+        for n, (previous, hour) in enumerate(zip(previous_hours, hours)):
+            mean = 0
+            for step in range(1, timesteps_per_hour + 1):
+                # Weather is interpolated between hourly values, as EnergyPlus does
+                f = step / timesteps_per_hour
+                t_air = (1 - f) * air_temperature[previous] + f * air_temperature[hour]
+                t_sky = (1 - f) * sky_temperature[previous] + f * sky_temperature[hour]
+                h_conv = (1 - f) * convection[previous] + f * convection[hour]
+                q_solar = (1 - f) * absorbed_solar[:, previous] + f * absorbed_solar[:, hour]
+
+                # Long-wave exchange with the sky, linearised about the current surface temperature
+                t_surface = temperature[:, 0]
+                h_rad = emissivity * _SIGMA * (t_sky ** 2 + t_surface ** 2) * (t_sky + t_surface)
+                h_surface = h_conv + h_rad
+
+                rhs = capacity * temperature
+                rhs[:, 0] += q_solar + h_conv * t_air + h_rad * t_sky
+                rhs[:, -1] += inside * ground_temperature[hour]
+                y = np.einsum("mij,mj->mi", inverse, rhs)
+                temperature = y - (h_surface * y[:, 0] / (1 + h_surface * surface_response[:, 0]))[:, None] * surface_response
+                mean = mean + temperature[:, 0]
+            result[:, n] = mean / timesteps_per_hour
+        return result, temperature
+
+    # Start from a linear profile between the air and ground temperatures, then repeat the first day until periodic
+    temperature = np.linspace(air_temperature[start], ground_temperature[start], nodes)[None, :].repeat(n_slabs, axis=0)
+    first_day = np.arange(start, start + 24)
+    previous_day = None
+    for day in range(warmup_days[1]):
+        day_temperature, temperature = run_hours(first_day, temperature)
+        converged = previous_day is not None and np.abs(day_temperature - previous_day).max() < warmup_tolerance
+        if day + 1 >= warmup_days[0] and converged:
+            break
+        previous_day = day_temperature
+
+    window = np.arange(start, end)
+    result, _ = run_hours(window, temperature, (window - 1) % len(air_temperature))
+    result = result[:, hours - start] - 273.15
+    return result[0] if single else result
@@ -0,0 +1,203 @@
+import pathlib
+import tempfile
+from typing import Union
+
+import numpy as np
+from ladybug.analysisperiod import AnalysisPeriod
+
+from . import period, profiling
+from .cache import hash_key
+from .weather import Weather, load_weather
+
+# Weighting of Radiance RGB results to a single irradiance value [W/m2] (as rmtxop -c 47.4 119.9 11.6, divided by 179)
+_RGB_WEIGHTS = np.array([47.4, 119.9, 11.6]) / 179
+
+
+class DaylightCoefficients(object):
+    def __init__(self, sky, sky_direct, sun, sun_up_hours, sky_density: int = 1, north: float = 0):
+        """
+        Daylight-coefficient matrices relating the radiance of each sky patch and sun position to the irradiance at a grid
+        of points. These depend only on the scene, grid and location, so can be reused with any weather for that location.
+        :param sky: Coefficients for each sky patch with the scene reflecting, of shape (points, patches, 3)
+        :param sky_direct: Coefficients for each sky patch with the scene blacked out, of shape (points, patches, 3)
+        :param sun: Coefficients for each sun position with the scene blacked out, of shape (points, suns, 3)
+        :param sun_up_hours: Hour of the year of each sun position
+        :param sky_density: Sky subdivision used to create the sky patches
+        :param north: Angle of north used for the sky and sun positions [degrees]
+        """
+
+        self.sky = np.asarray(sky, dtype=np.float32)
+        self.sky_direct = np.asarray(sky_direct, dtype=np.float32)
+        self.sun = np.asarray(sun, dtype=np.float32)
+        self.sun_up_hours = np.asarray(sun_up_hours, dtype=float)
+        self.sky_density = sky_density
+        self.north = north
+
+    def __repr__(self):
+        return "DaylightCoefficients: {} points, {} sky patches, {} sun positions".format(self.sky.shape[0], self.sky.shape[1], self.sun.shape[1])
+
+    @classmethod
+    def from_project(cls, project_directory: str, sky_density: int = 1, north: float = 0):
+        """
+        Load the daylight-coefficient matrices written by a Radiance annual (daylight-coefficient) recipe
+        :param project_directory: Folder of the recipe (containing the "result" and "sky" folders)
+        :param sky_density: Sky subdivision used by the recipe
+        :param north: Angle of north used by the recipe [degrees]
+        :return daylight_coefficients:
+        """
+
+        project_directory = pathlib.Path(project_directory)
+        matrix_directory = project_directory / "result" / "matrix"
+        sky = read_matrix(next(matrix_directory.glob("normal_*..default.dc")))
+        sky_direct = read_matrix(next(matrix_directory.glob("black_*..default.dc")))
+        sun = read_matrix(next(matrix_directory.glob("sun_*..default.dc")))
+
+        # Sun positions are named after their minute of the year, in the order of the sun coefficients
+        with open(project_directory / "sky" / "analemma.mod", "r") as f:
+            sun_up_hours = [int(line.strip().split("_")[-1]) / 60 for line in f if line.strip()]
+
+        return cls(sky, sky_direct, sun, sun_up_hours, sky_density, north)
+
+    @classmethod
+    def load(cls, file_path: str):
+        """
+        Load daylight-coefficient matrices saved with DaylightCoefficients.save
+        :param file_path: Location of saved matrices
+        :return daylight_coefficients:
+        """
+
+        with np.load(file_path) as f:
+            return cls(f["sky"], f["sky_direct"], f["sun"], f["sun_up_hours"], int(f["sky_density"]), float(f["north"]))
+
+    def save(self, file_path: str):
+        """
+        Save the daylight-coefficient matrices for reuse
+        :param file_path: Location of saved matrices
+        :return file_path:
+        """
+
+        file_path = pathlib.Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(file_path, "wb") as f:
+            np.savez(f, sky=self.sky, sky_direct=self.sky_direct, sun=self.sun, sun_up_hours=self.sun_up_hours, sky_density=self.sky_density, north=self.north)
+        return file_path
+
+    @profiling.profiled("daylight.irradiance")
+    def irradiance(self, epw_file: Union[str, Weather], working_directory: str = None, analysis_period: AnalysisPeriod = None):
+        """
+        Calculate the direct-from-sun and diffuse-from-sky irradiance at each point for a weather-file, by multiplying
+        these matrices by its sky and sun matrices. Only the sky matrix generation (gendaymtx) is run by Radiance.
+        :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+        :param working_directory: Location of generated sky matrices
+        :param analysis_period: Ladybug AnalysisPeriod of the hours to calculate (only these hours are put in the sky matrices). If None, the whole year
+        :return sun, diffuse: Arrays of direct and diffuse horizontal irradiance [W/m2], of shape (points, hours)
+        """
+
+        weather = load_weather(epw_file)
+        working_directory = pathlib.Path(tempfile.mkdtemp(prefix="openfield_sky_")) if working_directory is None else pathlib.Path(working_directory)
+        working_directory.mkdir(parents=True, exist_ok=True)
+
+        # Generate the total and direct-only solar sky matrices for this weather
+        from honeybee.radiance.sky.skymatrix import SkyMatrix
+        from honeybee.radiance.sky.sunmatrix import SunMatrix
+
+        hoys = period.sky_hours(analysis_period)
+        smx = SkyMatrix.from_epw_file(weather.path, sky_density=self.sky_density, north=self.north, hoys=hoys)
+        smx.sky_type = 1
+        smx.mode = 0
+        with profiling.span("daylight.gendaymtx"):
+            sky = read_matrix(_generate_sky_matrix(smx, working_directory))
+            smx.mode = 1
+            sky_direct = read_matrix(_generate_sky_matrix(smx, working_directory))
+
+        # Diffuse is the sky contribution with the scene reflecting, less the direct sky contribution with it blacked out
+        diffuse = _weighted_product(self.sky, sky) - _weighted_product(self.sky_direct, sky_direct)
+
+        # Each sun position only contributes to its own hour, so the sun matrix is applied column by column
+        smx.mode = 0
+        sun_matrix = SunMatrix.from_wea(smx.wea, self.north, smx.hoys, 1)
+        sun_index = {_minute_of_year(hoy): n for n, hoy in enumerate(self.sun_up_hours)}
+        hour_index = {hoy: n for n, hoy in enumerate(smx.hoys)}
+        sun_coefficients = self.sun @ _RGB_WEIGHTS.astype(np.float32)
+        sun = np.zeros_like(diffuse)
+        for hoy, solar_value in zip(sun_matrix.sun_up_hours, sun_matrix.solar_values):
+            if _minute_of_year(hoy) not in sun_index:
+                raise ValueError("Sun position at hour {} isn't in these daylight coefficients - they were created for a different location".format(hoy))
+            sun[:, hour_index[hoy]] = sun_coefficients[:, sun_index[_minute_of_year(hoy)]] * solar_value
+
+        return sun, diffuse
+
+
+def coefficients_file(location, points: list, vectors: list = None, sky_density: int = 1, north: float = 0, directory: str = None, hoys: list = None):
+    """
+    Get the location of stored daylight-coefficient matrices for a grid and location
+    :param location: Ladybug Location
+    :param points: List of [x, y, z] sensor point locations
+    :param vectors: List of [x, y, z] sensor directions
+    :param sky_density: Sky subdivision
+    :param north: Angle of north [degrees]
+    :param directory: Location of stored matrices
+    :param hoys: Hours of the year whose sun positions the matrices cover. If None, the whole year
+    :return file_path:
+    """
+
+    directory = pathlib.Path(tempfile.gettempdir()) / "openfield" / "daylight" if directory is None else pathlib.Path(directory)
+    key = hash_key(
+        "daylight_coefficients",
+        np.asarray(points, dtype=float).tolist(),
+        None if vectors is None else np.asarray(vectors, dtype=float).tolist(),
+        [location.latitude, location.longitude, location.time_zone],
+        sky_density,
+        north,
+        *([] if hoys is None else [list(hoys)]),
+    )
+    return directory / "{}.npz".format(key)
+
+
+def read_matrix(matrix_file: str):
+    """
+    Read a Radiance ASCII matrix
+    :param matrix_file: Radiance matrix file
+    :return values: Array of shape (rows, columns, components)
+    """
+
+    with open(matrix_file, "r") as f:
+        header = {}
+        if f.readline().startswith("#?RADIANCE"):
+            for line in f:
+                line = line.strip()
+                if not line:
+                    break
+                k, _, v = line.partition("=")
+                header[k] = v
+        else:
+            f.seek(0)
+
+        n_components = int(header.get("NCOMP", 3))
+        if "NROWS" in header and "NCOLS" in header:
+            values = np.array(f.read().split(), dtype=np.float32)
+            return values.reshape(int(header["NROWS"]), int(header["NCOLS"]), n_components)
+
+        rows = [np.array(line.split(), dtype=np.float32) for line in f if line.strip()]
+        return np.stack(rows).reshape(len(rows), -1, n_components)
+
+
+def _minute_of_year(hoy: float):
+    """Minute of the year of a sun position, wrapping hours before the start of the year round to its end"""
+    return round(hoy * 60) % (8760 * 60)
+
+
+def _generate_sky_matrix(smx, working_directory: pathlib.Path):
+    """Run gendaymtx for the hours of a honeybee SkyMatrix (SkyMatrix.execute always writes the weather for the whole year)"""
+    from honeybee.radiance.command.gendaymtx import Gendaymtx
+
+    wea_file = smx.write_wea(str(working_directory))
+    gendaymtx = Gendaymtx(wea_file=wea_file, output_name=str(working_directory / "{}.smx".format(smx.name)))
+    gendaymtx.gendaymtx_parameters = smx.sky_matrix_parameters
+    gendaymtx.gendaymtx_parameters.output_type = smx.sky_type
+    return gendaymtx.execute()
+
+
+def _weighted_product(coefficients, sky):
+    """Multiply (points, patches, 3) coefficients by a (patches, hours, 3) sky, weighting the channels to irradiance"""
+    return sum(_RGB_WEIGHTS[c].astype(np.float32) * (coefficients[:, :, c] @ sky[:, :, c]) for c in range(3))
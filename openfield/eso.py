@@ -0,0 +1,91 @@
+from array import array
+
+import numpy as np
+
+from . import profiling
+
+# Report codes reserved by EnergyPlus for environment and time-stamp records
+_RESERVED_CODES = {"1", "2", "3", "4", "5", "6"}
+
+
+def read_data_dictionary(eso_file: str):
+    """
+    Read the data dictionary at the head of an EnergyPlus ESO file
+    :param eso_file: EnergyPlus ESO output file
+    :return variables: Dictionary of report code and (key, variable, units, frequency) for each output variable
+    """
+
+    variables = {}
+    with open(eso_file, "r") as f:
+        next(f)  # Program version
+        for line in f:
+            line = line.rstrip("\n")
+            if line == "End of Data Dictionary":
+                break
+            code, _, description = line.split(",", 2)
+            if code in _RESERVED_CODES:
+                continue
+            variables[code] = _parse_description(description)
+    return variables
+
+
+@profiling.profiled("eso.read_eso")
+def read_eso(eso_file: str, variables: list = None, keys: list = None, frequency: str = None):
+    """
+    Read output variables from an EnergyPlus ESO file in a single streamed pass
+    :param eso_file: EnergyPlus ESO output file
+    :param variables: Names of variables to read (e.g. "Surface Outside Face Temperature"). If None, all variables are read
+    :param keys: Keys of variables to read (e.g. "ground_surface_0"). If None, all keys are read
+    :param frequency: Reporting frequency of variables to read (e.g. "Hourly"). If None, all frequencies are read
+    :return values: Dictionary of (key, variable) and array of values, from the last environment simulated
+    """
+
+    variables = None if variables is None else {i.lower() for i in variables}
+    keys = None if keys is None else {i.lower() for i in keys}
+    frequency = None if frequency is None else frequency.lower()
+
+    with open(eso_file, "r") as f:
+        next(f)  # Program version
+
+        # Select the requested variables from the data dictionary
+        selected = {}
+        for line in f:
+            line = line.rstrip("\n")
+            if line == "End of Data Dictionary":
+                break
+            code, _, description = line.split(",", 2)
+            if code in _RESERVED_CODES:
+                continue
+            key, variable, units, freq = _parse_description(description)
+            if variables is not None and variable.lower() not in variables:
+                continue
+            if keys is not None and (key or "").lower() not in keys:
+                continue
+            if frequency is not None and freq.lower() != frequency:
+                continue
+            selected[code] = (key, variable)
+
+        # Stream the data records, collecting values into compact arrays
+        data = {code: array("d") for code in selected}
+        for line in f:
+            code, _, value = line.partition(",")
+            if code in data:
+                data[code].append(float(value.split(",", 1)[0]))
+            elif code == "1":
+                # A new environment has started - only the last one (the weather-file run period) is retained
+                for code in data:
+                    data[code] = array("d")
+            elif code.startswith("End of Data"):
+                break
+
+    return {selected[code]: np.frombuffer(values, dtype=float) for code, values in data.items()}
+
+
+def _parse_description(description: str):
+    """Split a data dictionary description into key, variable, units and reporting frequency"""
+    description, _, freq = description.partition("!")
+    freq = freq.split()[0] if freq.strip() else None
+    parts = description.strip().split(",")
+    key, name = (parts[0], parts[1]) if len(parts) > 1 else (None, parts[0])
+    variable, _, units = name.partition("[")
+    return key, variable.strip(), units.rstrip("]").strip(), freq
@@ -1,16 +1,24 @@
-from eppy.modeleditor import IDF
-import pandas as pd
+import calendar
+import logging
+import os
 import tempfile
 import pathlib
 from io import StringIO
 import subprocess
+from typing import Union
 
-from ladybug.epw import EPW
+import numpy as np
 from ladybug.datacollection import HourlyContinuousCollection
 from ladybug.analysisperiod import AnalysisPeriod
-from ladybug.header import Header
 from ladybug.datatype.temperature import Temperature
 
+from . import conduction, period, profiling
+from .cache import ResultCache, default_cache, hash_key
+from .eso import read_eso
+from .weather import Weather, load_weather
+
+logger = logging.getLogger(__name__)
+
 
 class Ground(object):
     def __init__(self, thickness=0.2, reflectivity=0.35, emissivity=0.9, conductivity=1.1, density=2250, specific_heat=1000):
@@ -23,6 +31,8 @@ class Ground(object):
 
         self.surface_temperature = None
         self.is_shaded = None
+        self.shade_height = None
+        self.shade_transmittance = None
         self.epw = None
 
     def __repr__(self):
@@ -31,191 +41,358 @@ class Ground(object):
             return_string += "- {}: {}\n".format(k, v)
         return return_string
 
-    def calculate_surface_temperature(self, epw_file: str, idd_file: str, case_name: str = None, output_directory: str = None, is_shaded: bool = False):
+    def cache_key(self, epw_file: Union[str, Weather], idd_file: str, is_shaded: bool = False, shade_height: float = 4, shade_transmittance: float = 0, analysis_period: AnalysisPeriod = None):
+        """
+        Create the key identifying a surface temperature simulation of this ground typology
+        :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+        :param idd_file: Location of EnergyPlus IDD file (used to identify the EnergyPlus version)
+        :param is_shaded: Whether the ground is shaded
+        :param shade_height: Height of the shade [m]
+        :param shade_transmittance: Solar transmittance of the shade [0-1]
+        :param analysis_period: Analysis period simulated (only its simulation window matters, see openfield.period.simulation_window)
+        :return key:
+        """
+
+        return hash_key(
+            "ground_surface_temperature",
+            [self.thickness, self.reflectivity, self.emissivity, self.conductivity, self.density, self.specific_heat],
+            load_weather(epw_file).file_hash,
+            _ground_vertex_groups(),
+            [_shade_vertex_groups(shade_height), shade_transmittance] if is_shaded else None,
+            energyplus_version(idd_file),
+            None if period.simulation_window(analysis_period) == (0, 8760) else period.simulation_window(analysis_period),
+        )
+
+    @profiling.profiled("ground.calculate_surface_temperature")
+    def calculate_surface_temperature(self, epw_file: Union[str, Weather], idd_file: str = None, case_name: str = None, output_directory: str = None, is_shaded: bool = False, shade_height: float = 4, shade_transmittance: float = 0, cache: ResultCache = None, use_cache: bool = True, timeout: float = None, engine: str = "energyplus", direct_horizontal_solar: HourlyContinuousCollection = None, diffuse_horizontal_solar: HourlyContinuousCollection = None, analysis_period: AnalysisPeriod = None):
         """
-        Calculate the surface temperature of the ground typology using EnergyPlus
-        :param epw_file: Weather-file with location and climatic conditions for simulation
-        :param idd_file: Location of EnergyPlus IDD file (to enable reference of IDF objects and simulation)
+        Calculate the surface temperature of the ground typology using EnergyPlus, or the in-process conduction solver.
+        For an analysis period, EnergyPlus only runs from a week before it to its end (with its warm-up days repeating
+        the first of these), so the ground carries the thermal history leading into the period.
+        :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+        :param idd_file: Location of EnergyPlus IDD file (to enable reference of IDF objects and simulation). Not needed by the "conduction" engine
         :param case_name: Name of case being simulated
         :param output_directory: Location of generated outputs
         :param is_shaded:
+        :param shade_height: Height of the shade enclosing the ground when shaded [m]
+        :param shade_transmittance: Solar transmittance of the shade [0-1]
+        :param cache: Cache of previously simulated surface temperatures (defaults to openfield.cache.default_cache)
+        :param use_cache: Set to False to force the simulation to run and overwrite any cached result
+        :param timeout: Maximum time in seconds to allow the EnergyPlus simulation to run
+        :param engine: "energyplus" to simulate the ground in EnergyPlus, or "conduction" to use openfield.conduction
+        :param direct_horizontal_solar: Radiation from the sun (a collection or array), used by the "conduction" engine in place of the weather-file global horizontal radiation
+        :param diffuse_horizontal_solar: Radiation from the sky (a collection or array), used by the "conduction" engine in place of the weather-file global horizontal radiation
+        :param analysis_period: Ladybug AnalysisPeriod of the hours to calculate. If None, the whole year
         :return ground_surface_temperature:
         """
 
         # Assign to object and locate outputs
-        self.epw = epw_file
+        weather = load_weather(epw_file)
+        self.epw = weather.path
         self.is_shaded = is_shaded
+        self.shade_height = shade_height if is_shaded else None
+        self.shade_transmittance = shade_transmittance if is_shaded else None
+        cache = default_cache if cache is None else cache
+        hours = period.analysis_hours(analysis_period)
+        start, end = period.simulation_window(analysis_period)
+
+        # The conduction solver runs in-process in a couple of seconds, so its results aren't cached
+        if engine == "conduction":
+            solar_radiation = None
+            if (direct_horizontal_solar is not None) and (diffuse_horizontal_solar is not None):
+                solar_radiation = np.asarray(getattr(direct_horizontal_solar, "values", direct_horizontal_solar), dtype=float) + np.asarray(getattr(diffuse_horizontal_solar, "values", diffuse_horizontal_solar), dtype=float)
+            surface_temperature = conduction.surface_temperature(weather, self.thickness, self.reflectivity, self.emissivity, self.conductivity, self.density, self.specific_heat, is_shaded=is_shaded, shade_transmittance=shade_transmittance, solar_radiation=solar_radiation, analysis_period=analysis_period)
+            self.surface_temperature = period.hourly_collection(Temperature(), "C", surface_temperature, analysis_period)
+            logger.info("Ground surface temperature calculation completed")
+            return self.surface_temperature
+        if engine != "energyplus":
+            raise ValueError("Unknown ground surface temperature engine \"{}\" - use \"energyplus\" or \"conduction\"".format(engine))
+        if idd_file is None:
+            raise ValueError("An EnergyPlus IDD file is needed to simulate the ground surface temperature with EnergyPlus")
+
+        # Return the stored result if this ground, weather-file, shading and EnergyPlus version have been simulated before
+        key = self.cache_key(weather, idd_file, is_shaded, shade_height, shade_transmittance, analysis_period)
+        if use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                self.surface_temperature = period.hourly_collection(Temperature(), "C", cached[hours - start], analysis_period)
+                logger.info("Ground surface temperature loaded from cache")
+                return self.surface_temperature
+
         case_name = "openfield" if case_name is None else case_name
         output_directory = pathlib.Path(tempfile.gettempdir()) if output_directory is None else output_directory
 
         # Load monthly ground temperature from weather-file
-        monthly_ground_temperatures = EPW(epw_file).monthly_ground_temperature[0.5].values
+        monthly_ground_temperatures = weather.monthly_ground_temperature[0.5]
 
         # Reference Eplus program
         idd_file = pathlib.Path(idd_file)
-        eplus = idd_file.parent / "energyplus.exe"
+        eplus = idd_file.parent / ("energyplus.exe" if os.name == "nt" else "energyplus")
+        from eppy.modeleditor import IDF  # Deferred, so the conduction engine doesn't need eppy
         IDF.setiddname(str(idd_file))
 
-        # Construct folder structure for eplus case
-        eplus_output_path = pathlib.Path(output_directory) / case_name / "ground_surface_temperature"
+        # Construct folder structure for eplus case - each distinct simulation gets its own run directory so that cases can run concurrently
+        eplus_output_path = pathlib.Path(output_directory) / case_name / "ground_surface_temperature" / key[:16]
         eplus_output_path.mkdir(parents=True, exist_ok=True)
         idf_file = eplus_output_path / "in.idf"
         eso_file = eplus_output_path / "eplusout.eso"
+        annual = (start, end) == (0, 8760)
 
         # Construct case for simulation
-        idf = IDF(StringIO(""))
-
-        # Define base building object
-        building = idf.newidfobject("BUILDING")
-        building.Name = "ground"
-        building.North_Axis = 0
-        building.Terrain = "City"
-        building.Solar_Distribution = "FullExterior"
-        building.Maximum_Number_of_Warmup_Days = 25
-        building.Minimum_Number_of_Warmup_Days = 6
-
-        # Set shadow calculation to once per hour
-        shadowcalculation = idf.newidfobject("SHADOWCALCULATION")
-        shadowcalculation.Calculation_Method = "TimestepFrequency"
-        shadowcalculation.Calculation_Frequency = 1
-        shadowcalculation.Maximum_Figures_in_Shadow_Overlap_Calculations = 3000
-
-        # Define ground material
-
-        material = idf.newidfobject("MATERIAL")
-        material.Name = "ground_material"
-        material.Roughness = "MediumRough"
-        material.Thickness = self.thickness
-        material.Conductivity = self.conductivity
-        material.Density = self.density
-        material.Specific_Heat = self.specific_heat
-        material.Thermal_Absorptance = self.emissivity
-        material.Solar_Absorptance = 1 - self.reflectivity
-        material.Visible_Absorptance = 1 - self.reflectivity
-
-        # Define ground construction
-        construction = idf.newidfobject("CONSTRUCTION")
-        construction.Name = "ground_construction"
-        construction.Outside_Layer = "ground_material"
-
-        # Set global geometry rules
-        globalgeometryrules = idf.newidfobject("GLOBALGEOMETRYRULES")
-        globalgeometryrules.Starting_Vertex_Position = "UpperLeftCorner"
-        globalgeometryrules.Vertex_Entry_Direction = "Counterclockwise"
-        globalgeometryrules.Coordinate_System = "Relative"
-
-        # Define ground zone
-        zone = idf.newidfobject("ZONE")
-        zone.Name = "ground_zone"
-
-        # Add ground surfaces (as a closed zone)
-        ground_x, ground_y, ground_z = 200, 200, 1
-        vertex_groups = [
-            [[-ground_x / 2, ground_y / 2, 0], [-ground_x / 2, -ground_y / 2, 0], [ground_x / 2, -ground_y / 2, 0],
-             [ground_x / 2, ground_y / 2, 0]],
-            [[ground_x / 2, -ground_y / 2, -ground_z], [-ground_x / 2, -ground_y / 2, -ground_z],
-             [-ground_x / 2, ground_y / 2, -ground_z], [ground_x / 2, ground_y / 2, -ground_z]],
-            [[-ground_x / 2, ground_y / 2, 0], [-ground_x / 2, ground_y / 2, -ground_z],
-             [-ground_x / 2, -ground_y / 2, -ground_z], [-ground_x / 2, -ground_y / 2, 0]],
-            [[ground_x / 2, -ground_y / 2, 0], [ground_x / 2, -ground_y / 2, -ground_z],
-             [ground_x / 2, ground_y / 2, -ground_z], [ground_x / 2, ground_y / 2, 0]],
-            [[ground_x / 2, ground_y / 2, 0], [ground_x / 2, ground_y / 2, -ground_z],
-             [-ground_x / 2, ground_y / 2, -ground_z], [-ground_x / 2, ground_y / 2, 0]],
-            [[-ground_x / 2, -ground_y / 2, 0], [-ground_x / 2, -ground_y / 2, -ground_z],
-             [ground_x / 2, -ground_y / 2, -ground_z], [ground_x / 2, -ground_y / 2, 0]]
-        ]
-
-        for n, vg in enumerate(vertex_groups):
-            gnd = idf.newidfobject("BUILDINGSURFACE:DETAILED")
-            gnd.Name = "ground_surface_{}".format(n)
-            gnd.Surface_Type = "Roof" if n == 0 else "Floor" if n == 1 else "Wall"
-            gnd.Construction_Name = "ground_construction"
-            gnd.Zone_Name = "ground_zone"
-            gnd.Outside_Boundary_Condition = "Outdoors" if n == 0 else "Ground"
-            gnd.Sun_Exposure = "SunExposed" if n == 0 else "Nosun"
-            gnd.Wind_Exposure = "WindExposed" if n == 0 else "Nowind"
-            for nnn, vgx in enumerate(vg):
-                setattr(gnd, "Vertex_{}_Xcoordinate".format(nnn + 1), vgx[0])
-                setattr(gnd, "Vertex_{}_Ycoordinate".format(nnn + 1), vgx[1])
-                setattr(gnd, "Vertex_{}_Zcoordinate".format(nnn + 1), vgx[2])
-
-        # Set ground temperatures using EPW monthly values
-        groundtemperature = idf.newidfobject("SITE:GROUNDTEMPERATURE:BUILDINGSURFACE")
-        for i, j in list(zip(*[pd.date_range("2018", "2019", freq="1M").strftime("%B"), monthly_ground_temperatures])):
-            setattr(groundtemperature, "{}_Ground_Temperature".format(i), j)
-
-        # Add shading if the case is shaded
-        if is_shaded:
-            shd_schedule_limits = idf.newidfobject("SCHEDULETYPELIMITS")
-            shd_schedule_limits.Name = "shade_schedule_type_limit"
-            shd_schedule_limits.Lower_Limit_Value = 0
-            shd_schedule_limits.Upper_Limit_Value = 1
-            shd_schedule_limits.Numeric_Type = "Continuous"
-
-            shd_schedule_constant = idf.newidfobject("SCHEDULE:CONSTANT")
-            shd_schedule_constant.Name = "shade_schedule_constant"
-            shd_schedule_constant.Schedule_Type_Limits_Name = "shade_schedule_type_limit"
-            shd_schedule_constant.Hourly_Value = 0
-
-            shade_x = 200
-            shade_y = 200
-            shade_z = 4
-            shade_vertex_groups = [
-                [[-shade_x / 2, -shade_y / 2, shade_z], [-shade_x / 2, -shade_y / 2, 0], [shade_x / 2, -shade_y / 2, 0],
-                 [shade_x / 2, -shade_y / 2, shade_z]],
-                [[shade_x / 2, -shade_y / 2, shade_z], [shade_x / 2, -shade_y / 2, 0], [shade_x / 2, shade_y / 2, 0],
-                 [shade_x / 2, shade_y / 2, shade_z]],
-                [[shade_x / 2, shade_y / 2, shade_z], [shade_x / 2, shade_y / 2, 0], [-shade_x / 2, shade_y / 2, 0],
-                 [-shade_x / 2, shade_y / 2, shade_z]],
-                [[-shade_x / 2, shade_y / 2, shade_z], [-shade_x / 2, shade_y / 2, 0], [-shade_x / 2, -shade_y / 2, 0],
-                 [-shade_x / 2, -shade_y / 2, shade_z]],
-                [[shade_x / 2, shade_y / 2, shade_z], [-shade_x / 2, -shade_y / 2, shade_z],
-                 [shade_x / 2, -shade_y / 2, shade_z], [shade_x / 2, shade_y / 2, shade_z]]
-            ]
-            for n, vg in enumerate(shade_vertex_groups):
-                shd = idf.newidfobject("SHADING:BUILDING:DETAILED")
-                shd.Name = "shade_surface_{}".format(n)
-                shd.Transmittance_Schedule_Name = "shade_schedule_constant"
+        with profiling.span("ground.write_idf"):
+            idf = IDF(StringIO(""))
+
+            # Define base building object
+            building = idf.newidfobject("BUILDING")
+            building.Name = "ground"
+            building.North_Axis = 0
+            building.Terrain = "City"
+            building.Solar_Distribution = "FullExterior"
+            building.Maximum_Number_of_Warmup_Days = 25
+            building.Minimum_Number_of_Warmup_Days = 6
+
+            # Set shadow calculation to once per hour
+            shadowcalculation = idf.newidfobject("SHADOWCALCULATION")
+            shadowcalculation.Calculation_Method = "TimestepFrequency"
+            shadowcalculation.Calculation_Frequency = 1
+            shadowcalculation.Maximum_Figures_in_Shadow_Overlap_Calculations = 3000
+
+            # Define ground material
+
+            material = idf.newidfobject("MATERIAL")
+            material.Name = "ground_material"
+            material.Roughness = "MediumRough"
+            material.Thickness = self.thickness
+            material.Conductivity = self.conductivity
+            material.Density = self.density
+            material.Specific_Heat = self.specific_heat
+            material.Thermal_Absorptance = self.emissivity
+            material.Solar_Absorptance = 1 - self.reflectivity
+            material.Visible_Absorptance = 1 - self.reflectivity
+
+            # Define ground construction
+            construction = idf.newidfobject("CONSTRUCTION")
+            construction.Name = "ground_construction"
+            construction.Outside_Layer = "ground_material"
+
+            # Set global geometry rules
+            globalgeometryrules = idf.newidfobject("GLOBALGEOMETRYRULES")
+            globalgeometryrules.Starting_Vertex_Position = "UpperLeftCorner"
+            globalgeometryrules.Vertex_Entry_Direction = "Counterclockwise"
+            globalgeometryrules.Coordinate_System = "Relative"
+
+            # Define ground zone
+            zone = idf.newidfobject("ZONE")
+            zone.Name = "ground_zone"
+
+            # Add ground surfaces (as a closed zone)
+            vertex_groups = _ground_vertex_groups()
+
+            for n, vg in enumerate(vertex_groups):
+                gnd = idf.newidfobject("BUILDINGSURFACE:DETAILED")
+                gnd.Name = "ground_surface_{}".format(n)
+                gnd.Surface_Type = "Roof" if n == 0 else "Floor" if n == 1 else "Wall"
+                gnd.Construction_Name = "ground_construction"
+                gnd.Zone_Name = "ground_zone"
+                gnd.Outside_Boundary_Condition = "Outdoors" if n == 0 else "Ground"
+                gnd.Sun_Exposure = "SunExposed" if n == 0 else "Nosun"
+                gnd.Wind_Exposure = "WindExposed" if n == 0 else "Nowind"
                 for nnn, vgx in enumerate(vg):
-                    setattr(shd, "Vertex_{}_Xcoordinate".format(nnn + 1), vgx[0])
-                    setattr(shd, "Vertex_{}_Ycoordinate".format(nnn + 1), vgx[1])
-                    setattr(shd, "Vertex_{}_Zcoordinate".format(nnn + 1), vgx[2])
-
-        # Set output variables for Eplus run - only top surface of ground considered here
-        outputvariable = idf.newidfobject("OUTPUT:VARIABLE")
-        outputvariable.Key_Value = "ground_surface_0"
-        outputvariable.Variable_Name = "Surface Outside Face Temperature"
-        outputvariable.Reporting_Frequency = "hourly"
-
-        # Write Eplus file
-        idf.saveas(idf_file)
+                    setattr(gnd, "Vertex_{}_Xcoordinate".format(nnn + 1), vgx[0])
+                    setattr(gnd, "Vertex_{}_Ycoordinate".format(nnn + 1), vgx[1])
+                    setattr(gnd, "Vertex_{}_Zcoordinate".format(nnn + 1), vgx[2])
+
+            # Set ground temperatures using EPW monthly values
+            groundtemperature = idf.newidfobject("SITE:GROUNDTEMPERATURE:BUILDINGSURFACE")
+            for i, j in zip(calendar.month_name[1:], monthly_ground_temperatures):
+                setattr(groundtemperature, "{}_Ground_Temperature".format(i), j)
+
+            # Add shading if the case is shaded
+            if is_shaded:
+                shd_schedule_limits = idf.newidfobject("SCHEDULETYPELIMITS")
+                shd_schedule_limits.Name = "shade_schedule_type_limit"
+                shd_schedule_limits.Lower_Limit_Value = 0
+                shd_schedule_limits.Upper_Limit_Value = 1
+                shd_schedule_limits.Numeric_Type = "Continuous"
+
+                shd_schedule_constant = idf.newidfobject("SCHEDULE:CONSTANT")
+                shd_schedule_constant.Name = "shade_schedule_constant"
+                shd_schedule_constant.Schedule_Type_Limits_Name = "shade_schedule_type_limit"
+                shd_schedule_constant.Hourly_Value = shade_transmittance
+
+                shade_vertex_groups = _shade_vertex_groups(shade_height)
+                for n, vg in enumerate(shade_vertex_groups):
+                    shd = idf.newidfobject("SHADING:BUILDING:DETAILED")
+                    shd.Name = "shade_surface_{}".format(n)
+                    shd.Transmittance_Schedule_Name = "shade_schedule_constant"
+                    for nnn, vgx in enumerate(vg):
+                        setattr(shd, "Vertex_{}_Xcoordinate".format(nnn + 1), vgx[0])
+                        setattr(shd, "Vertex_{}_Ycoordinate".format(nnn + 1), vgx[1])
+                        setattr(shd, "Vertex_{}_Zcoordinate".format(nnn + 1), vgx[2])
+
+            # Set output variables for Eplus run - only top surface of ground considered here
+            outputvariable = idf.newidfobject("OUTPUT:VARIABLE")
+            outputvariable.Key_Value = "ground_surface_0"
+            outputvariable.Variable_Name = "Surface Outside Face Temperature"
+            outputvariable.Reporting_Frequency = "hourly"
+
+            # Limit the simulation to the days needed by the analysis period, if it doesn't need the whole year
+            if not annual:
+                runperiod = idf.newidfobject("RUNPERIOD")
+                runperiod.Name = "analysis_period"
+                runperiod.Begin_Month, runperiod.Begin_Day_of_Month, runperiod.End_Month, runperiod.End_Day_of_Month = period.run_period(analysis_period)
+
+            # Write Eplus file
+            idf.saveas(idf_file)
 
         # Run Eplus simulation
-        cmd = '"{0:}" -a -w "{1:}" -d "{2:}" "{3:}"'.format(eplus.absolute(), epw_file, eplus_output_path, idf_file)
-        subprocess.call(cmd, shell=True)
-
-        # Read surface temperature results
-        with open(eso_file, "r") as f:
-            data = f.read().split("\n")
+        run_energyplus(eplus, weather.path, eplus_output_path, idf_file, timeout=timeout, annual=annual)
 
-            # Find key
-            for n, i in enumerate(data):
-                if i == "End of Data Dictionary":
-                    split_part = n
+        # Read surface temperature results, for every hour simulated
+        surface_temperature = read_eso(eso_file, variables=["Surface Outside Face Temperature"], keys=["ground_surface_0"])
+        surface_temperature = list(surface_temperature.values())[0]
+        if len(surface_temperature) != end - start:
+            raise RuntimeError("EnergyPlus simulation of {} reported {} hours, but {} were expected".format(idf_file, len(surface_temperature), end - start))
 
-            _vars = [j.split(",")[-1].replace(" !Hourly", "") for j in data[7:split_part]]
+        self.surface_temperature = period.hourly_collection(Temperature(), "C", surface_temperature[hours - start], analysis_period)
+        cache.put(key, surface_temperature)
 
-            surface_temperature = [float(item) for sublist in
-                     [[k.split(",")[1:][0] for k in j[1:]] for j in chunk(data[split_part + 2:-3], n=len(_vars) + 1)]
-                     for
-                     item in sublist]
-
-        self.surface_temperature = HourlyContinuousCollection(header=Header(Temperature(), unit="C", analysis_period=AnalysisPeriod()), values=surface_temperature)
-
-        print("Ground surface temperature simulation completed")
+        logger.info("Ground surface temperature simulation completed")
 
         return self.surface_temperature
 
 
-def chunk(enumerable, n=1):
-    return [list(enumerable[i:i + n]) for i in range(0, len(enumerable), n)]
+@profiling.profiled("ground.calculate_surface_temperatures")
+def calculate_surface_temperatures(grounds: list, epw_file: Union[str, Weather], is_shaded: bool = False, shade_transmittance: float = 0, direct_horizontal_solar: HourlyContinuousCollection = None, diffuse_horizontal_solar: HourlyContinuousCollection = None, analysis_period: AnalysisPeriod = None):
+    """
+    Calculate the surface temperature of several ground typologies at once using the in-process conduction solver
+    :param grounds: List of Ground objects
+    :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+    :param is_shaded: Whether the grounds are shaded (or a list with a value for each ground)
+    :param shade_transmittance: Solar transmittance of the shade (or a list with a value for each ground) [0-1]
+    :param direct_horizontal_solar: Radiation from the sun (a collection or array), in place of the weather-file global horizontal radiation
+    :param diffuse_horizontal_solar: Radiation from the sky (a collection or array), in place of the weather-file global horizontal radiation
+    :param analysis_period: Ladybug AnalysisPeriod of the hours to calculate. If None, the whole year
+    :return grounds: The grounds, with surface temperatures assigned
+    """
+
+    weather = load_weather(epw_file)
+    is_shaded = np.broadcast_to(is_shaded, len(grounds))
+    shade_transmittance = np.broadcast_to(shade_transmittance, len(grounds))
+    solar_radiation = None
+    if (direct_horizontal_solar is not None) and (diffuse_horizontal_solar is not None):
+        solar_radiation = np.asarray(getattr(direct_horizontal_solar, "values", direct_horizontal_solar), dtype=float) + np.asarray(getattr(diffuse_horizontal_solar, "values", diffuse_horizontal_solar), dtype=float)
+
+    properties = np.array([[g.thickness, g.reflectivity, g.emissivity, g.conductivity, g.density, g.specific_heat] for g in grounds], dtype=float).T
+    surface_temperatures = conduction.surface_temperature(weather, *properties, is_shaded=is_shaded, shade_transmittance=shade_transmittance, solar_radiation=solar_radiation, analysis_period=analysis_period)
+
+    for ground, shaded, transmittance, surface_temperature in zip(grounds, is_shaded, shade_transmittance, surface_temperatures):
+        ground.epw = weather.path
+        ground.is_shaded = bool(shaded)
+        ground.shade_transmittance = float(transmittance) if shaded else None
+        ground.surface_temperature = period.hourly_collection(Temperature(), "C", surface_temperature, analysis_period)
+
+    return grounds
+
+
+def validate_conduction(ground: Ground, epw_file: Union[str, Weather], idd_file: str, is_shaded: bool = False, analysis_period: AnalysisPeriod = None, **kwargs):
+    """
+    Compare the surface temperature from the conduction solver with that simulated by EnergyPlus for a ground typology
+    :param ground: Ground object
+    :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+    :param idd_file: Location of EnergyPlus IDD file (to enable reference of IDF objects and simulation)
+    :param is_shaded: Whether the ground is shaded
+    :param analysis_period: Ladybug AnalysisPeriod of the hours to compare. If None, the whole year
+    :param kwargs: Further arguments passed to Ground.calculate_surface_temperature for the EnergyPlus simulation
+    :return errors: Dictionary of mean bias, root-mean-square and maximum absolute error of the conduction solver [C]
+    """
+
+    energyplus = np.array(ground.calculate_surface_temperature(epw_file, idd_file, is_shaded=is_shaded, analysis_period=analysis_period, **kwargs).values)
+    solver = np.array(ground.calculate_surface_temperature(epw_file, is_shaded=is_shaded, engine="conduction", analysis_period=analysis_period).values)
+    difference = solver - energyplus
+
+    return {
+        "mean_bias_error": float(difference.mean()),
+        "root_mean_square_error": float(np.sqrt((difference ** 2).mean())),
+        "maximum_absolute_error": float(np.abs(difference).max()),
+    }
+
+
+def energyplus_version(idd_file: str):
+    """
+    Get the version of EnergyPlus from the header of its IDD file
+    :param idd_file: Location of EnergyPlus IDD file
+    :return version:
+    """
+
+    with open(idd_file, "r") as f:
+        for line in f:
+            if line.startswith("!IDD_Version"):
+                return line.split()[-1]
+    return None
+
+
+@profiling.profiled("ground.run_energyplus")
+def run_energyplus(eplus, epw_file: str, output_directory: str, idf_file: str, timeout: float = None, annual: bool = True):
+    """
+    Run an EnergyPlus simulation, raising an error if it fails or exceeds the time allowed
+    :param eplus: Location of EnergyPlus executable
+    :param epw_file: Weather-file with location and climatic conditions for simulation
+    :param output_directory: Location of generated outputs
+    :param idf_file: EnergyPlus input file
+    :param timeout: Maximum time in seconds to allow the simulation to run
+    :param annual: Simulate the whole weather-file, rather than the run periods in the input file
+    :return:
+    """
+
+    cmd = [str(pathlib.Path(eplus).absolute())] + (["-a"] if annual else []) + ["-w", str(epw_file), "-d", str(output_directory), str(idf_file)]
+    try:
+        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError("EnergyPlus simulation of {} did not complete within {} seconds".format(idf_file, timeout))
+
+    if process.returncode != 0:
+        err_file = pathlib.Path(output_directory) / "eplusout.err"
+        details = err_file.read_text(errors="replace") if err_file.exists() else process.stdout.decode(errors="replace")
+        raise RuntimeError("EnergyPlus simulation of {} failed with exit code {}:\n{}".format(idf_file, process.returncode, details[-2000:]))
+
+
+def _ground_vertex_groups():
+    """Vertices of the closed zone representing the ground"""
+    ground_x, ground_y, ground_z = 200, 200, 1
+    vertex_groups = [
+        [[-ground_x / 2, ground_y / 2, 0], [-ground_x / 2, -ground_y / 2, 0], [ground_x / 2, -ground_y / 2, 0],
+         [ground_x / 2, ground_y / 2, 0]],
+        [[ground_x / 2, -ground_y / 2, -ground_z], [-ground_x / 2, -ground_y / 2, -ground_z],
+         [-ground_x / 2, ground_y / 2, -ground_z], [ground_x / 2, ground_y / 2, -ground_z]],
+        [[-ground_x / 2, ground_y / 2, 0], [-ground_x / 2, ground_y / 2, -ground_z],
+         [-ground_x / 2, -ground_y / 2, -ground_z], [-ground_x / 2, -ground_y / 2, 0]],
+        [[ground_x / 2, -ground_y / 2, 0], [ground_x / 2, -ground_y / 2, -ground_z],
+         [ground_x / 2, ground_y / 2, -ground_z], [ground_x / 2, ground_y / 2, 0]],
+        [[ground_x / 2, ground_y / 2, 0], [ground_x / 2, ground_y / 2, -ground_z],
+         [-ground_x / 2, ground_y / 2, -ground_z], [-ground_x / 2, ground_y / 2, 0]],
+        [[-ground_x / 2, -ground_y / 2, 0], [-ground_x / 2, -ground_y / 2, -ground_z],
+         [ground_x / 2, -ground_y / 2, -ground_z], [ground_x / 2, -ground_y / 2, 0]]
+    ]
+    return vertex_groups
+
+
+def _shade_vertex_groups(shade_height: float = 4):
+    """Vertices of the shade enclosing the ground when the case is shaded"""
+    shade_x = 200
+    shade_y = 200
+    shade_z = shade_height
+    shade_vertex_groups = [
+        [[-shade_x / 2, -shade_y / 2, shade_z], [-shade_x / 2, -shade_y / 2, 0], [shade_x / 2, -shade_y / 2, 0],
+         [shade_x / 2, -shade_y / 2, shade_z]],
+        [[shade_x / 2, -shade_y / 2, shade_z], [shade_x / 2, -shade_y / 2, 0], [shade_x / 2, shade_y / 2, 0],
+         [shade_x / 2, shade_y / 2, shade_z]],
+        [[shade_x / 2, shade_y / 2, shade_z], [shade_x / 2, shade_y / 2, 0], [-shade_x / 2, shade_y / 2, 0],
+         [-shade_x / 2, shade_y / 2, shade_z]],
+        [[-shade_x / 2, shade_y / 2, shade_z], [-shade_x / 2, shade_y / 2, 0], [-shade_x / 2, -shade_y / 2, 0],
+         [-shade_x / 2, -shade_y / 2, shade_z]],
+        [[shade_x / 2, shade_y / 2, shade_z], [-shade_x / 2, -shade_y / 2, shade_z],
+         [shade_x / 2, -shade_y / 2, shade_z], [shade_x / 2, shade_y / 2, shade_z]]
+    ]
+    return shade_vertex_groups
+
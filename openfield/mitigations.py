@@ -1,47 +1,42 @@
-import pandas as pd
+from typing import Union
+
+import numpy as np
+from ladybug.analysisperiod import AnalysisPeriod
 from ladybug.datacollection import HourlyContinuousCollection
 
-from .ground import Ground
-from . import utci, mrt
+from .sweep import sweep
+from .weather import Weather
 
 
-def utci_comparison(epw_file: str, idd_file: str, direct_horizontal_solar: HourlyContinuousCollection = None, diffuse_horizontal_solar: HourlyContinuousCollection = None):
+def utci_comparison(epw_file: Union[str, Weather], idd_file: str = None, direct_horizontal_solar: HourlyContinuousCollection = None, diffuse_horizontal_solar: HourlyContinuousCollection = None, workers: int = None, timeout: float = None, engine: str = "energyplus", analysis_period: AnalysisPeriod = None):
     """
     Generate sets of UTCI values under various mitigation conditions.
-    :param epw_file: Weather-file with location and climatic conditions for simulation
-    :param idd_file: Location of EnergyPlus IDD file (to enable reference of IDF objects and simulation)
-    :param direct_horizontal_solar: Radiation from the sun
-    :param diffuse_horizontal_solar: Radiation from the sky
-    :return: Dictionary of mitigations and UTCI values associated with these
+    :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+    :param idd_file: Location of EnergyPlus IDD file (to enable reference of IDF objects and simulation). Not needed by the "conduction" engine
+    :param direct_horizontal_solar: Radiation from the sun. If not given, this is simulated alongside the ground cases
+    :param diffuse_horizontal_solar: Radiation from the sky. If not given, this is simulated alongside the ground cases
+    :param workers: Number of processes running simulations concurrently. Defaults to one per simulation (limited to the number of CPUs); 1 runs them sequentially
+    :param timeout: Maximum time in seconds to allow each EnergyPlus simulation to run
+    :param engine: Ground surface temperature engine - "energyplus", or "conduction" to solve all grounds at once in-process
+    :param analysis_period: Ladybug AnalysisPeriod of the hours to calculate (radiation given must be for these hours). If None, the whole year
+    :return: Dictionary of mitigations and float32 arrays of UTCI values associated with these
     """
 
-    d = {}
-    for ground_reflectivity in [0.25, 0.40]:
-        # Define the ground
-        gnd = Ground(reflectivity=ground_reflectivity)
-
-        for shaded in [True, False]:
-            # Calculate surface temperature
-            gnd.calculate_surface_temperature(epw_file, idd_file, is_shaded=shaded)
-
-            # Calculate ground surface temperature
-            mean_radiant_temperature = mrt.mean_radiant_temperature(epw_file, direct_horizontal_solar,
-                                                                    diffuse_horizontal_solar, ground=gnd,
-                                                                    is_shaded=shaded)
+    axes = {
+        "reflectivity": [0.25, 0.40],
+        "is_shaded": [True, False],
+        "evaporative_cooling_effectiveness": [0.7, 0],
+        "wind": [0, 2],
+    }
+    result = sweep(epw_file, axes, idd_file=idd_file, direct_horizontal_solar=direct_horizontal_solar, diffuse_horizontal_solar=diffuse_horizontal_solar, engine=engine, workers=workers, timeout=timeout, analysis_period=analysis_period)
 
-            for evap_cool in [True, False]:
-                for wind in [0, 2]:
-
-                    case_id = "Baseline"
-                    case_id += "_Shaded" if shaded else ""
-                    case_id += "_CoolPavement" if ground_reflectivity == 0.40 else ""
-                    case_id += "_EvaporativeCooling" if evap_cool else ""
-                    case_id += "_Wind" if wind == 2 else "_NoWind"
-                    print("Calculating UTCI for {}".format(case_id))
-
-                    # Calculate universal thermal climate index
-                    universal_thermal_climate_index = utci.universal_thermal_climate_index(epw_file, mean_radiant_temperature, wind=wind, evaporative_cooling=evap_cool)
-
-                    d[case_id] = universal_thermal_climate_index.values
+    d = {}
+    for case, values in result.cases():
+        case_id = "Baseline"
+        case_id += "_Shaded" if case["is_shaded"] else ""
+        case_id += "_CoolPavement" if case["reflectivity"] == 0.40 else ""
+        case_id += "_EvaporativeCooling" if case["evaporative_cooling_effectiveness"] > 0 else ""
+        case_id += "_Wind" if case["wind"] == 2 else "_NoWind"
+        d[case_id] = values.astype(np.float32)
 
     return d
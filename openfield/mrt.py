@@ -1,18 +1,34 @@
-from ladybug.epw import EPW
-from ladybug_comfort.collection.solarcal import HorizontalSolarCal
+import logging
+from typing import Union
+
+import numpy as np
+from ladybug.analysisperiod import AnalysisPeriod
 from ladybug.datacollection import HourlyContinuousCollection
+from ladybug.datatype.temperature import MeanRadiantTemperature
+from . import period, profiling
 from .ground import Ground
+from .weather import Weather, load_weather
+
+logger = logging.getLogger(__name__)
+
+_SUN_GEOMETRY = {}
+
+# Fraction of the view of a person standing in an open field taken up by the ground
+GROUND_VIEW_FACTOR = 0.5
+
 
-def mean_radiant_temperature(epw_file: str, direct_horizontal_solar: HourlyContinuousCollection = None,
+@profiling.profiled("mrt.mean_radiant_temperature")
+def mean_radiant_temperature(epw_file: Union[str, Weather], direct_horizontal_solar: HourlyContinuousCollection = None,
                              diffuse_horizontal_solar: HourlyContinuousCollection = None, ground: Ground = None,
-                             is_shaded: bool = False):
+                             is_shaded: bool = False, ground_view_factor: float = GROUND_VIEW_FACTOR):
     """
     Calculate the Mean Radiant Temperature from solar and ground radiation components
-    :param epw_file: Weather-file with location and climatic conditions for simulation
+    :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
     :param direct_horizontal_solar: Radiation from the sun
     :param diffuse_horizontal_solar: Radiation from the sky
     :param ground: Ground object
     :param is_shaded: Calculate MRT under shaded or unshaded conditions
+    :param ground_view_factor: Fraction of the view taken up by the ground, by which its surface temperature is factored [0-1]
     :return mean_radiant_temperature: Mean Radiant Temperature
     """
 
@@ -20,11 +36,126 @@ def mean_radiant_temperature(epw_file: str, direct_horizontal_solar: HourlyConti
     if (ground is not None) & (ground.is_shaded != is_shaded):
         raise ValueError("Ground surface temperature calculation {} shaded but this calculation {}. These should match!".format("is" if ground.is_shaded else "isn't", "is" if is_shaded else "isn't"))
 
-    # Factor the visible surface temperature based on exposure to ground (50% in open field)
-    ground.surface_temperature.values = [i * 0.5 for i in ground.surface_temperature.values]
+    # The radiation and ground surface temperature must cover the same hours, which are those calculated here
+    analysis_period = direct_horizontal_solar.header.analysis_period
+    for collection in [diffuse_horizontal_solar, ground.surface_temperature]:
+        if collection.header.analysis_period.hoys != analysis_period.hoys:
+            raise ValueError("{} is for {}, but the direct radiation is for {}. These should match!".format(collection.header.data_type, collection.header.analysis_period, analysis_period))
+
+    # Factor the visible surface temperature based on exposure to ground (50% in open field), leaving the ground unchanged
+    longwave_mrt = np.array(ground.surface_temperature.values) * ground_view_factor
 
-    mrt = HorizontalSolarCal(location=EPW(epw_file).location, direct_horizontal_solar=direct_horizontal_solar, diffuse_horizontal_solar=diffuse_horizontal_solar, longwave_mrt=ground.surface_temperature, fraction_body_exposed=0 if is_shaded else 1, floor_reflectance=ground.reflectivity).mean_radiant_temperature
+    values = solarcal(load_weather(epw_file).location, direct_horizontal_solar.values, diffuse_horizontal_solar.values, longwave_mrt, fraction_body_exposed=(ground.shade_transmittance or 0) if is_shaded else 1, floor_reflectance=ground.reflectivity, analysis_period=analysis_period)
+    mrt = period.hourly_collection(MeanRadiantTemperature(), "C", values, analysis_period)
 
-    print("Mean radiant temperature calculation completed")
+    logger.info("Mean radiant temperature calculation completed")
 
     return mrt
+
+
+def mean_radiant_temperature_array(epw_file: Union[str, Weather], direct_horizontal_solar, diffuse_horizontal_solar,
+                                   ground: Ground, is_shaded: bool = False, analysis_period: AnalysisPeriod = None, ground_view_factor: float = GROUND_VIEW_FACTOR):
+    """
+    Calculate the Mean Radiant Temperature from solar and ground radiation components for arrays of radiation, such as a grid of points
+    :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+    :param direct_horizontal_solar: Array of radiation from the sun, of shape (hours,) or (points, hours)
+    :param diffuse_horizontal_solar: Array of radiation from the sky, of shape (hours,) or (points, hours)
+    :param ground: Ground object
+    :param is_shaded: Calculate MRT under shaded or unshaded conditions
+    :param analysis_period: Ladybug AnalysisPeriod of the hours of the radiation and ground surface temperature. If None, the whole year
+    :param ground_view_factor: Fraction of the view taken up by the ground, by which its surface temperature is factored [0-1]
+    :return mean_radiant_temperature: Array of Mean Radiant Temperatures, of shape (hours,) or (points, hours)
+    """
+
+    # Check that the ground is shaded/unshaded in the same way for both the surface temperature calculation and this calculation
+    if ground.is_shaded != is_shaded:
+        raise ValueError("Ground surface temperature calculation {} shaded but this calculation {}. These should match!".format("is" if ground.is_shaded else "isn't", "is" if is_shaded else "isn't"))
+
+    # Factor the visible surface temperature based on exposure to ground (50% in open field)
+    longwave_mrt = np.array(ground.surface_temperature.values) * ground_view_factor
+
+    return solarcal(load_weather(epw_file).location, direct_horizontal_solar, diffuse_horizontal_solar, longwave_mrt, fraction_body_exposed=(ground.shade_transmittance or 0) if is_shaded else 1, floor_reflectance=ground.reflectivity, analysis_period=analysis_period)
+
+
+@profiling.profiled("mrt.mean_radiant_temperature_batch")
+def mean_radiant_temperature_batch(epw_file: Union[str, Weather], direct_horizontal_solar, diffuse_horizontal_solar,
+                                   floor_reflectance, fraction_body_exposed, longwave_mrt, analysis_period: AnalysisPeriod = None):
+    """
+    Calculate the Mean Radiant Temperature for a batch of ground and shading configurations sharing the same solar inputs, in one vectorised pass
+    :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+    :param direct_horizontal_solar: Radiation from the sun (a collection or array of shape (hours,))
+    :param diffuse_horizontal_solar: Radiation from the sky (a collection or array of shape (hours,))
+    :param floor_reflectance: Reflectance of the floor for each configuration, of shape (configurations,)
+    :param fraction_body_exposed: Fraction of the body exposed to direct sun for each configuration, of shape (configurations,)
+    :param longwave_mrt: Long-wave mean radiant temperature for each configuration [C], of shape (configurations,) or (configurations, hours)
+    :param analysis_period: Ladybug AnalysisPeriod of the hours of the inputs. If None, the whole year
+    :return mean_radiant_temperature: Array of Mean Radiant Temperatures, of shape (configurations, hours)
+    """
+
+    direct = np.asarray(getattr(direct_horizontal_solar, "values", direct_horizontal_solar), dtype=float)
+    diffuse = np.asarray(getattr(diffuse_horizontal_solar, "values", diffuse_horizontal_solar), dtype=float)
+    floor_reflectance = np.asarray(floor_reflectance, dtype=float).reshape(-1, 1)
+    fraction_body_exposed = np.asarray(fraction_body_exposed, dtype=float).reshape(-1, 1)
+    longwave_mrt = np.asarray(longwave_mrt, dtype=float)
+    longwave_mrt = longwave_mrt.reshape(-1, 1) if longwave_mrt.ndim < 2 else longwave_mrt
+
+    return solarcal(load_weather(epw_file).location, direct, diffuse, longwave_mrt, fraction_body_exposed=fraction_body_exposed, floor_reflectance=floor_reflectance, analysis_period=analysis_period)
+
+
+def solarcal(location, direct_horizontal_solar, diffuse_horizontal_solar, longwave_mrt, fraction_body_exposed=1, floor_reflectance=0.25, analysis_period: AnalysisPeriod = None):
+    """
+    Calculate Mean Radiant Temperature with the SolarCal horizontal model for arrays of hourly inputs in a single
+    vectorised pass. Inputs are broadcast against each other. The body is a standing person with the ladybug_comfort
+    default SolarCal parameters (SHARP 135, absorptivity 0.7, emissivity 0.95), matching HorizontalSolarCal.
+    :param location: Ladybug Location
+    :param direct_horizontal_solar: Direct horizontal irradiance [W/m2]
+    :param diffuse_horizontal_solar: Diffuse horizontal irradiance [W/m2]
+    :param longwave_mrt: Long-wave mean radiant temperature [C]
+    :param fraction_body_exposed: Fraction of the body exposed to direct sun
+    :param floor_reflectance: Reflectance of the floor
+    :param analysis_period: Ladybug AnalysisPeriod of the hours of the inputs. If None, the whole year
+    :return mean_radiant_temperature: Array of Mean Radiant Temperatures [C]
+    """
+
+    altitude, projection_factor = _sun_geometry(location)
+    if analysis_period is not None:
+        hours = period.analysis_hours(analysis_period)
+        altitude, projection_factor = altitude[hours], projection_factor[hours]
+    direct = np.asarray(direct_horizontal_solar, dtype=float)
+    diffuse = np.asarray(diffuse_horizontal_solar, dtype=float)
+    fract_efficiency = 0.725
+
+    # Solar flux on the body from the direct, diffuse and ground-reflected components, while the sun is above the horizon
+    sun_up = altitude >= 0
+    direct_normal = direct / np.where(altitude > 0, np.sin(np.radians(altitude)), 1)
+    solar_flux = projection_factor * np.asarray(fraction_body_exposed) * direct_normal + \
+        0.5 * fract_efficiency * diffuse + \
+        0.5 * fract_efficiency * (diffuse + direct) * np.asarray(floor_reflectance)
+
+    # Effective radiant field and resulting MRT delta
+    effective_radiant_field = solar_flux * (0.7 / 0.95)
+    mrt_delta = np.where(sun_up, effective_radiant_field / (fract_efficiency * 6.012), 0)
+
+    return np.asarray(longwave_mrt, dtype=float) + mrt_delta
+
+
+def _sun_geometry(location):
+    """Hourly solar altitude and body projection factor for a year at a location, memoized as they only depend on the location"""
+    key = (location.latitude, location.longitude, location.time_zone, location.elevation)
+    if key not in _SUN_GEOMETRY:
+        from ladybug.sunpath import Sunpath
+        from ladybug_comfort.solarcal import get_projection_factor, get_projection_factor_simple
+
+        sunpath = Sunpath.from_location(location)
+        altitude = np.array([sunpath.calculate_sun_from_hoy(hoy).altitude for hoy in AnalysisPeriod().hoys])
+        projection_factor = np.zeros_like(altitude)
+        for n, alt in enumerate(altitude):
+            if alt >= 0:
+                try:
+                    projection_factor[n] = get_projection_factor(alt, 135, "standing")
+                except KeyError:
+                    projection_factor[n] = get_projection_factor_simple(alt, 135, "standing")
+        altitude.flags.writeable = False
+        projection_factor.flags.writeable = False
+        _SUN_GEOMETRY[key] = altitude, projection_factor
+    return _SUN_GEOMETRY[key]
@@ -0,0 +1,85 @@
+import numpy as np
+from ladybug.analysisperiod import AnalysisPeriod
+from ladybug.datacollection import HourlyContinuousCollection, HourlyDiscontinuousCollection
+from ladybug.dt import DateTime
+from ladybug.header import Header
+
+# Days simulated ahead of an analysis period, so that the ground's thermal history leading into it is represented
+LEAD_DAYS = 7
+
+
+def analysis_hours(analysis_period: AnalysisPeriod = None):
+    """
+    Get the hours of the year covered by an analysis period, in the order of its values
+    :param analysis_period: Ladybug AnalysisPeriod of hourly values in a non-leap year. If None, the whole year
+    :return hours: Array of hour of the year indices
+    """
+
+    if analysis_period is None:
+        return np.arange(8760)
+    if analysis_period.timestep != 1 or analysis_period.is_leap_year:
+        raise ValueError("Analysis periods must be hourly and in a non-leap year, to match the weather-file - got {}".format(analysis_period))
+    return np.array(analysis_period.hoys, dtype=int)
+
+
+def sky_hours(analysis_period: AnalysisPeriod = None):
+    """
+    Get the hours of the year at which Radiance sky and sun matrices are generated for an analysis period. These are
+    at the middle of each hour (hour - 0.5), as in honeybee's whole-year default, so that the sun positions of a period
+    are a subset of those of the whole year.
+    :param analysis_period: Ladybug AnalysisPeriod. If None, the whole year
+    :return hoys: List of hours of the year, or None for honeybee's whole-year default
+    """
+
+    if analysis_period is None:
+        return None
+    return [h - 0.5 for h in analysis_hours(analysis_period).tolist()]
+
+
+def simulation_window(analysis_period: AnalysisPeriod = None, lead_days: int = LEAD_DAYS):
+    """
+    Get the continuous run of whole days to simulate for an analysis period: from lead_days before its first day (but
+    not before the 1st of January) to the end of its last day. Periods wrapping around the end of the year, and no
+    period, need the whole year.
+    :param analysis_period: Ladybug AnalysisPeriod. If None, the whole year
+    :param lead_days: Days simulated ahead of the analysis period
+    :return start, end: Hour of the year at which the window starts, and at which it ends (exclusive)
+    """
+
+    hours = analysis_hours(analysis_period)
+    if analysis_period is None or analysis_period.is_reversed:
+        return 0, 8760
+    first_day, last_day = hours.min() // 24, hours.max() // 24
+    return int(max(first_day - lead_days, 0) * 24), int((last_day + 1) * 24)
+
+
+def run_period(analysis_period: AnalysisPeriod = None, lead_days: int = LEAD_DAYS):
+    """
+    Get the start and end dates of the simulation window of an analysis period (see simulation_window)
+    :param analysis_period: Ladybug AnalysisPeriod. If None, the whole year
+    :param lead_days: Days simulated ahead of the analysis period
+    :return begin_month, begin_day, end_month, end_day:
+    """
+
+    start, end = simulation_window(analysis_period, lead_days)
+    begin, finish = DateTime.from_hoy(start), DateTime.from_hoy(end - 1)
+    return begin.month, begin.day, finish.month, finish.day
+
+
+def hourly_collection(data_type, unit: str, values, analysis_period: AnalysisPeriod = None):
+    """
+    Wrap hourly values for an analysis period as a Ladybug data collection - continuous if the period covers whole days,
+    otherwise discontinuous (e.g. for daytime hours only)
+    :param data_type: Ladybug data type, e.g. Temperature()
+    :param unit: Unit of the values
+    :param values: Value for each hour of the analysis period
+    :param analysis_period: Ladybug AnalysisPeriod of the values. If None, the whole year
+    :return collection: HourlyContinuousCollection or HourlyDiscontinuousCollection
+    """
+
+    analysis_period = AnalysisPeriod() if analysis_period is None else analysis_period
+    header = Header(data_type, unit=unit, analysis_period=analysis_period)
+    values = np.asarray(values, dtype=float).tolist()
+    if analysis_period.st_hour == 0 and analysis_period.end_hour == 23:
+        return HourlyContinuousCollection(header=header, values=values)
+    return HourlyDiscontinuousCollection(header, values, analysis_period.datetimes)
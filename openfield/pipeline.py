@@ -0,0 +1,216 @@
+import logging
+import pathlib
+import tempfile
+from typing import Union
+
+import numpy as np
+from ladybug.analysisperiod import AnalysisPeriod
+from ladybug.datatype.energyflux import DirectHorizontalIrradiance, DiffuseHorizontalIrradiance
+from ladybug.datatype.temperature import MeanRadiantTemperature, Temperature, UniversalThermalClimateIndex
+
+from . import period
+from .cache import ResultCache, array_hash, file_hash, hash_key
+from .mrt import GROUND_VIEW_FACTOR
+from .sweep import GROUND_PARAMETERS, SHADE_PARAMETERS
+from .weather import Weather, load_weather
+
+logger = logging.getLogger(__name__)
+
+# Parameters of the pipeline, and their default values
+PARAMETERS = dict(
+    {"radiation_results": None},
+    **GROUND_PARAMETERS,
+    **SHADE_PARAMETERS,
+    ground_view_factor=GROUND_VIEW_FACTOR,
+    wind=1,
+    evaporative_cooling=False,
+    evaporative_cooling_effectiveness=0.7,
+)
+
+# Stages in the order they run, with the stages whose outputs each one uses and the parameters it depends on
+STAGES = {
+    "radiation": {"inputs": [], "parameters": ["radiation_results"]},
+    "ground": {"inputs": ["radiation"], "parameters": list(GROUND_PARAMETERS) + list(SHADE_PARAMETERS)},
+    "mrt": {"inputs": ["radiation", "ground"], "parameters": ["reflectivity", "is_shaded", "shade_transmittance", "ground_view_factor"]},
+    "utci": {"inputs": ["mrt"], "parameters": ["wind", "evaporative_cooling", "evaporative_cooling_effectiveness"]},
+}
+
+
+class Pipeline(object):
+    def __init__(self, epw_file: Union[str, Weather], idd_file: str = None, engine: str = "energyplus", output_directory: str = None, analysis_period: AnalysisPeriod = None, cache: ResultCache = None, **parameters):
+        """
+        Radiation, ground surface temperature, MRT and UTCI calculation for a single open-field case, which only
+        recomputes the stages affected by a change. Each stage's result is fingerprinted by the parameters it depends
+        on and the fingerprints of the results it uses, so after changing (for example) the wind setting only UTCI is
+        recalculated, and after changing the ground view factor only MRT and UTCI. Results are kept in memory, and in
+        an on-disk cache so they're also reused by later sessions.
+        :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+        :param idd_file: Location of EnergyPlus IDD file (to enable reference of IDF objects and simulation). Not needed by the "conduction" engine
+        :param engine: Ground surface temperature engine - "energyplus", or "conduction" to use openfield.conduction
+        :param output_directory: Location of generated simulation outputs
+        :param analysis_period: Ladybug AnalysisPeriod of the hours to calculate. If None, the whole year
+        :param cache: Cache of stage results (defaults to the "openfield/pipeline" folder in the temporary directory)
+        :param parameters: Values for any of the pipeline PARAMETERS: radiation_results (a folder of earlier Radiance
+            results to load rather than simulating radiation), the Ground material fields, the shade, ground_view_factor
+            and the UTCI wind and evaporative cooling settings
+        """
+
+        self.weather = load_weather(epw_file)
+        self.idd_file = idd_file
+        self.engine = engine
+        self.output_directory = output_directory
+        self.analysis_period = analysis_period
+        self.cache = ResultCache(pathlib.Path(tempfile.gettempdir()) / "openfield" / "pipeline") if cache is None else cache
+        self.parameters = dict(PARAMETERS)
+        self.update(**parameters)
+
+        self.sources = {}
+        self._results = {}
+        self._period_key = None if analysis_period is None else period.analysis_hours(analysis_period).tolist()
+
+    def __repr__(self):
+        return "Pipeline: {} ({})".format(self.weather.path, ", ".join("{}={}".format(k, v) for k, v in self.parameters.items() if v != PARAMETERS[k]) or "defaults")
+
+    def update(self, **parameters):
+        """
+        Change parameters of the pipeline, without running it
+        :param parameters: Values for any of the pipeline PARAMETERS
+        :return:
+        """
+
+        unknown = set(parameters) - set(PARAMETERS)
+        if unknown:
+            raise ValueError("{} aren't pipeline parameters - parameters are {}".format(sorted(unknown), sorted(PARAMETERS)))
+        self.parameters.update(parameters)
+
+    def run(self, stage: str = "utci", **parameters):
+        """
+        Bring a stage up to date, recomputing it and the stages it uses only where their inputs have changed
+        :param stage: "radiation", "ground", "mrt" or "utci"
+        :param parameters: Values for any of the pipeline PARAMETERS to change before running
+        :return collection: Ladybug hourly collection of the stage result (see collection)
+        """
+
+        if stage not in STAGES:
+            raise ValueError("Unknown pipeline stage \"{}\" - use {}".format(stage, list(STAGES)))
+        self.update(**parameters)
+
+        self.sources = {}
+        self._run(stage)
+        logger.info("Pipeline {}".format(", ".join("{} {}".format(k, v) for k, v in self.sources.items())))
+
+        return self.collection(stage)
+
+    def fingerprint(self, stage: str):
+        """
+        Get the fingerprint of a stage's current result, which changes whenever the values of that result change
+        :param stage: Name of the stage
+        :return fingerprint: Hash of the result values, or None if the stage hasn't been run
+        """
+
+        return self._results[stage][2] if stage in self._results else None
+
+    def values(self, stage: str):
+        """
+        Get the values of a stage's current result
+        :param stage: Name of the stage
+        :return values: Read-only array of hourly values - of shape (2, hours) of direct and diffuse radiation for the "radiation" stage, otherwise (hours,)
+        """
+
+        if stage not in self._results:
+            raise ValueError("The \"{}\" stage hasn't been run".format(stage))
+        return self._results[stage][1]
+
+    def collection(self, stage: str):
+        """
+        Get a stage's current result as Ladybug hourly collections
+        :param stage: Name of the stage
+        :return collection: DirectHorizontalIrradiance and DiffuseHorizontalIrradiance collections for the "radiation" stage, otherwise a Temperature, MeanRadiantTemperature or UniversalThermalClimateIndex collection
+        """
+
+        values = self.values(stage)
+        if stage == "radiation":
+            return (period.hourly_collection(DirectHorizontalIrradiance(), "W/m2", values[0], self.analysis_period),
+                    period.hourly_collection(DiffuseHorizontalIrradiance(), "W/m2", values[1], self.analysis_period))
+        data_type = {"ground": Temperature(), "mrt": MeanRadiantTemperature(), "utci": UniversalThermalClimateIndex()}[stage]
+        return period.hourly_collection(data_type, "C", values, self.analysis_period)
+
+    def _inputs(self, stage: str):
+        """Stages whose results a stage uses (the ground only uses the simulated radiation in the conduction engine)"""
+        if stage == "ground" and self.engine != "conduction":
+            return []
+        return STAGES[stage]["inputs"]
+
+    def _key(self, stage: str):
+        """Key of a stage's result, from its parameters, the fingerprints of the results it uses and the weather and hours"""
+        parameters = {k: self.parameters[k] for k in STAGES[stage]["parameters"]}
+        if stage == "radiation" and parameters["radiation_results"] is not None:
+            parameters["radiation_results"] = [file_hash(i) for i in sorted(pathlib.Path(parameters["radiation_results"]).glob("*..scene..default.ill"))]
+        if stage == "ground":
+            from .ground import energyplus_version
+            parameters["engine"] = [self.engine, energyplus_version(self.idd_file) if self.engine == "energyplus" else None]
+
+        return hash_key(
+            "pipeline",
+            stage,
+            parameters,
+            [self._run(i) for i in self._inputs(stage)],
+            self.weather.file_hash,
+            self._period_key,
+        )
+
+    def _run(self, stage: str):
+        """Bring a stage's result up to date, from memory, the on-disk cache or by calculating it, returning its fingerprint"""
+        if stage in self.sources:
+            return self.fingerprint(stage)
+
+        key = self._key(stage)
+        if stage in self._results and self._results[stage][0] == key:
+            self.sources[stage] = "reused"
+            return self.fingerprint(stage)
+
+        values = self.cache.get(key)
+        self.sources[stage] = "loaded from cache"
+        if values is None:
+            values = np.asarray(getattr(self, "_calculate_{}".format(stage))(), dtype=float)
+            self.cache.put(key, values)
+            self.sources[stage] = "calculated"
+
+        values.flags.writeable = False
+        self._results[stage] = (key, values, array_hash(values))
+        return self.fingerprint(stage)
+
+    def _calculate_radiation(self):
+        from . import radiation
+        if self.parameters["radiation_results"] is None:
+            direct, diffuse = radiation.run(self.weather, output_directory=self.output_directory, analysis_period=self.analysis_period)
+        else:
+            direct, diffuse = radiation.load_test_point(self.parameters["radiation_results"], analysis_period=self.analysis_period)
+        return [direct.values, diffuse.values]
+
+    def _calculate_ground(self):
+        from .ground import Ground
+        ground = Ground(**{k: self.parameters[k] for k in GROUND_PARAMETERS})
+        direct, diffuse = self.collection("radiation") if self.engine == "conduction" else (None, None)
+        surface_temperature = ground.calculate_surface_temperature(
+            self.weather, self.idd_file, output_directory=self.output_directory, is_shaded=self.parameters["is_shaded"],
+            shade_height=self.parameters["shade_height"], shade_transmittance=self.parameters["shade_transmittance"],
+            engine=self.engine, direct_horizontal_solar=direct, diffuse_horizontal_solar=diffuse, analysis_period=self.analysis_period)
+        return surface_temperature.values
+
+    def _calculate_mrt(self):
+        from . import mrt
+        direct, diffuse = self.values("radiation")
+        return mrt.mean_radiant_temperature_batch(
+            self.weather, direct, diffuse,
+            floor_reflectance=[self.parameters["reflectivity"]],
+            fraction_body_exposed=[self.parameters["shade_transmittance"] if self.parameters["is_shaded"] else 1],
+            longwave_mrt=[self.values("ground") * self.parameters["ground_view_factor"]],
+            analysis_period=self.analysis_period,
+        )[0]
+
+    def _calculate_utci(self):
+        from . import utci
+        return utci.universal_thermal_climate_index_array(
+            self.weather, self.values("mrt"), wind=self.parameters["wind"], evaporative_cooling=self.parameters["evaporative_cooling"],
+            evaporative_cooling_effectiveness=self.parameters["evaporative_cooling_effectiveness"], analysis_period=self.analysis_period)
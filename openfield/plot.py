@@ -1,97 +1,263 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib import colormaps, dates
+from matplotlib.artist import getp, setp
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.colors import ListedColormap
-from matplotlib import dates, cm
-from pandas.plotting import register_matplotlib_converters
-register_matplotlib_converters()
+from matplotlib.figure import Figure
+
+from . import period, profiling
+
+# Extent of the heatmap x-axis (the days of the year) and y-axis (a single day, shown as the hour of the day)
+_X_EXTENT = [dates.date2num(datetime(2018, 1, 1)), dates.date2num(datetime(2018, 12, 31, 23))]
+_Y_EXTENT = [726449, 726450]
 
-def heatmap(hourly_utci_values, plot_type="utci", location_string=None, tone_color="#555555", save_path=None, cb_orientation="horizontal"):
+# UTCI values bounding each heat stress category
+_COMFORT_BINS = [-40, -27, -13, 0, 9, 26, 32, 38, 46]
 
-    idx = pd.date_range(start="2018-01-01 00:00:00", end="2019-01-01 00:00:00", freq="60T", closed="left")
 
-    # Data preparation
+def _style(plot_type: str):
+    """Title, colormap, colour limits and colorbar ticks and label for a type of plot"""
     if plot_type == "comfort":
-        bins = [-1000, -40, -27, -13, 0, 9, 26, 32, 38, 46, 1000]
-        bins_replacement = [-5, -4, -3, -2, -1, 0, 1, 2, 3, 4]
-        series = pd.Series(
-            pd.cut(pd.Series(np.array(hourly_utci_values)), bins, labels=bins_replacement).astype(int).values,
-            name="Universal Thermal Climate Index", index=idx)
-        cmap = ListedColormap(colors=['#0D104B', '#262972', '#3452A4', '#3C65AF', '#37BCED', '#2EB349',
-                                      '#F38322', '#C31F25', '#7F1416', '#580002'])
-        cb_lims = [-5.5, 4.5]
-        bounds = np.arange(-5, 6, 1)
-        cb_ticks = bounds
-        cb_tick_labels = ["Extreme\nheat stress", "Very strong\nheat stress", "Strong\nheat stress",
-                          "Moderate\nheat stress", "No\nthermal stress", "Slight\ncold stress",
-                          "Moderate\ncold stress", "Strong\ncold stress", "Very strong\ncold stress",
-                          "Extreme\ncold stress"][::-1]
-        cb_label = "UTCI heat stress category"
+        return {
+            "name": "Universal Thermal Climate Index",
+            "cmap": ListedColormap(colors=['#0D104B', '#262972', '#3452A4', '#3C65AF', '#37BCED', '#2EB349',
+                                           '#F38322', '#C31F25', '#7F1416', '#580002']),
+            "cb_lims": [-5.5, 4.5],
+            "bounds": np.arange(-5, 6, 1),
+            "cb_ticks": np.arange(-5, 5, 1),
+            "cb_tick_labels": ["Extreme\nheat stress", "Very strong\nheat stress", "Strong\nheat stress",
+                               "Moderate\nheat stress", "No\nthermal stress", "Slight\ncold stress",
+                               "Moderate\ncold stress", "Strong\ncold stress", "Very strong\ncold stress",
+                               "Extreme\ncold stress"][::-1],
+            "cb_label": "UTCI heat stress category",
+        }
     elif plot_type == "utci":
-        series = pd.Series(hourly_utci_values, name="Universal Thermal Climate Index", index=idx)
-        cmap = cm.get_cmap("magma")
-        cb_lims = [-40, 46]
-        bounds = np.arange(-40, 47, 1)
-        cb_ticks = np.arange(cb_lims[0], cb_lims[-1] + 1, 5)
-        cb_tick_labels = cb_ticks
-        cb_label = "UTCI °C"
+        return {
+            "name": "Universal Thermal Climate Index",
+            "cmap": colormaps["magma"],
+            "cb_lims": [-40, 46],
+            "bounds": np.arange(-40, 47, 1),
+            "cb_ticks": np.arange(-40, 47, 5),
+            "cb_tick_labels": np.arange(-40, 47, 5),
+            "cb_label": "UTCI °C",
+        }
     elif plot_type == "diff":
-        series = pd.Series(hourly_utci_values, name="Universal Thermal Climate Index Comparison", index=idx)
-        cmap = cm.get_cmap("RdBu_r")
-        cb_lims = [-5, 5]
-        bounds = np.arange(-5, 6, 1)
-        cb_ticks = np.arange(cb_lims[0], cb_lims[-1] + 1, 1)
-        cb_tick_labels = cb_ticks
-        cb_label = "UTCI difference °C"
+        return {
+            "name": "Universal Thermal Climate Index Comparison",
+            "cmap": colormaps["RdBu_r"],
+            "cb_lims": [-5, 5],
+            "bounds": np.arange(-5, 6, 1),
+            "cb_ticks": np.arange(-5, 6, 1),
+            "cb_tick_labels": np.arange(-5, 6, 1),
+            "cb_label": "UTCI difference °C",
+        }
+    raise ValueError("Unknown plot type \"{}\" - use \"utci\", \"comfort\" or \"diff\"".format(plot_type))
 
-    df = series.to_frame()
-    title = "{} - {}".format(location_string, series.name) if location_string else "{}".format(series.name)
 
-    # Data plotting
-    fig, ax = plt.subplots(1, 1, figsize=(15, 5))
-    heatmap = ax.imshow(
-        pd.pivot_table(df, index=df.index.time, columns=df.index.date, values=series.name).values[::-1],
-        extent=[dates.date2num(df.index.min()), dates.date2num(df.index.max()), 726449, 726450],
-        aspect='auto', cmap=cmap, interpolation='none', vmin=bounds.min(), vmax=bounds.max())
+def _day_hour_array(hourly_values, plot_type: str, analysis_period=None):
+    """
+    Arrange hourly values as a (24, 365) array of hour of the day by day of the year, binned to heat stress categories
+    for comfort plots. Hours outside the analysis period are left blank (NaN).
+    """
+    values = np.full(8760, np.nan)
+    values[period.analysis_hours(analysis_period)] = np.asarray(hourly_values, dtype=float)
+    if plot_type == "comfort":
+        values = np.where(np.isnan(values), np.nan, np.digitize(values, _COMFORT_BINS, right=True) - 5)
+    return values.reshape(365, 24).T
+
 
-    # Axes formatting
+def _format_axes(ax, tone_color: str):
+    """Date axes, ticks and spines of a heatmap"""
     ax.xaxis_date()
     ax.xaxis.set_major_formatter(dates.DateFormatter('%b'))
     ax.yaxis_date()
     ax.yaxis.set_major_formatter(dates.DateFormatter('%H:%M'))
     ax.invert_yaxis()
 
-    # Ticks, labels and spines formatting
     ax.tick_params(labelleft=True, labelbottom=True)
-    plt.setp(ax.get_xticklabels(), ha='left', color=tone_color)
-    plt.setp(ax.get_yticklabels(), color=tone_color)
+    setp(ax.get_xticklabels(), ha='left', color=tone_color)
+    setp(ax.get_yticklabels(), color=tone_color)
     [ax.spines[spine].set_visible(False) for spine in ['top', 'bottom', 'left', 'right']]
-    ax.grid(b=True, which='major', color='white', linestyle='--', alpha=0.9)
+    ax.grid(True, which='major', color='white', linestyle='--', alpha=0.9)
     [tick.set_color(tone_color) for tick in ax.get_yticklines()]
     [tick.set_color(tone_color) for tick in ax.get_xticklines()]
 
-    # Colorbar
-    heatmap.set_clim(cb_lims[0], cb_lims[-1])
+
+def _colorbar(fig, image, style: dict, tone_color: str, cb_orientation: str, ax=None):
+    """Colorbar of a heatmap"""
     if cb_orientation == "horizontal":
-        cb = fig.colorbar(heatmap, cmap=cmap, orientation='horizontal', drawedges=False, ticks=cb_ticks, fraction=0.05, aspect=100, pad=0.125)  #
-        plt.setp(plt.getp(cb.ax.axes, 'xticklabels'), color=tone_color)
+        cb = fig.colorbar(image, ax=ax, orientation='horizontal', drawedges=False, ticks=style["cb_ticks"], fraction=0.05, aspect=100, pad=0.125)
+        setp(getp(cb.ax.axes, 'xticklabels'), color=tone_color)
         [tick.set_color(tone_color) for tick in cb.ax.axes.get_xticklines()]
-        cb.ax.axes.set_xticklabels(cb_tick_labels, fontsize="medium")
-        cb.ax.set_xlabel(cb_label, fontsize="medium", color=tone_color)
+        cb.ax.axes.set_xticklabels(style["cb_tick_labels"], fontsize="medium")
+        cb.ax.set_xlabel(style["cb_label"], fontsize="medium", color=tone_color)
         cb.ax.xaxis.set_label_position('top')
     elif cb_orientation == "vertical":
-        cb = fig.colorbar(heatmap, cmap=cmap, orientation='vertical', drawedges=False, ticks=cb_ticks, fraction=0.05, aspect=20, pad=0.075)  # , fraction=0.05, aspect=20, pad=0.075
+        cb = fig.colorbar(image, ax=ax, orientation='vertical', drawedges=False, ticks=style["cb_ticks"], fraction=0.05, aspect=20, pad=0.075)
         cb.ax.yaxis.set_ticks_position('left')
-        plt.setp(plt.getp(cb.ax.axes, 'yticklabels'), color=tone_color)
+        setp(getp(cb.ax.axes, 'yticklabels'), color=tone_color)
         [tick.set_color(tone_color) for tick in cb.ax.axes.get_yticklines()]
-        cb.ax.axes.set_yticklabels(cb_tick_labels, fontsize="small")
+        cb.ax.axes.set_yticklabels(style["cb_tick_labels"], fontsize="small")
     cb.outline.set_visible(False)
+    return cb
+
+
+class HeatmapRenderer(object):
+    def __init__(self, plot_type: str = "utci", tone_color: str = "#555555", cb_orientation: str = "horizontal"):
+        """
+        Heatmap figure that is built once and re-used for each set of hourly values rendered, only updating the image
+        data and title. The figure is drawn with the Agg backend directly, so it can be used in worker processes.
+        :param plot_type: "utci", "comfort" or "diff"
+        :param tone_color: Colour of text, ticks and labels
+        :param cb_orientation: "horizontal" or "vertical" colorbar
+        """
+
+        self.plot_type = plot_type
+        self.style = _style(plot_type)
+        self.fig = Figure(figsize=(15, 5))
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(1, 1, 1)
+        self.image = self.ax.imshow(
+            np.zeros((24, 365)), extent=_X_EXTENT + _Y_EXTENT, aspect='auto', cmap=self.style["cmap"],
+            interpolation='none', vmin=self.style["bounds"].min(), vmax=self.style["bounds"].max())
+        _format_axes(self.ax, tone_color)
+        self.image.set_clim(self.style["cb_lims"][0], self.style["cb_lims"][-1])
+        _colorbar(self.fig, self.image, self.style, tone_color, cb_orientation, ax=self.ax)
+        self.title = self.ax.set_title("", color=tone_color, ha="left", va="bottom", x=0)
+        self.fig.tight_layout()
+
+    def render(self, hourly_utci_values, location_string: str = None, save_path: str = None, dpi: int = 300, analysis_period=None):
+        """
+        Update the heatmap with a set of hourly values
+        :param hourly_utci_values: 8760 hourly values, or a value for each hour of the analysis period
+        :param location_string: Text preceding the title
+        :param save_path: Location to save the figure. If None, the figure is only updated
+        :param dpi: Resolution of the saved figure (rasterising at 300dpi takes most of the rendering time)
+        :param analysis_period: Ladybug AnalysisPeriod of the values. If None, the whole year
+        :return fig:
+        """
+
+        self.image.set_data(_day_hour_array(hourly_utci_values, self.plot_type, analysis_period)[::-1])
+        self.title.set_text("{} - {}".format(location_string, self.style["name"]) if location_string else self.style["name"])
+        if save_path:
+            self.fig.savefig(save_path, bbox_inches="tight", dpi=dpi, transparent=False)
+        return self.fig
+
+
+def heatmap(hourly_utci_values, plot_type="utci", location_string=None, tone_color="#555555", save_path=None, cb_orientation="horizontal", analysis_period=None):
+    """
+    Plot hourly values as a heatmap of hour of the day by day of the year
+    :param hourly_utci_values: 8760 hourly values, or a value for each hour of the analysis period
+    :param plot_type: "utci", "comfort" or "diff"
+    :param location_string: Text preceding the title
+    :param tone_color: Colour of text, ticks and labels
+    :param save_path: Location to save the figure
+    :param cb_orientation: "horizontal" or "vertical" colorbar
+    :param analysis_period: Ladybug AnalysisPeriod of the values, with the hours outside it left blank. If None, the whole year
+    :return fig:
+    """
+
+    style = _style(plot_type)
+    title = "{} - {}".format(location_string, style["name"]) if location_string else "{}".format(style["name"])
+
+    # Pyplot (and its choice of GUI backend) is only loaded for interactive figures
+    import matplotlib.pyplot as plt
+
+    # Data plotting
+    fig, ax = plt.subplots(1, 1, figsize=(15, 5))
+    image = ax.imshow(
+        _day_hour_array(hourly_utci_values, plot_type, analysis_period)[::-1],
+        extent=_X_EXTENT + _Y_EXTENT,
+        aspect='auto', cmap=style["cmap"], interpolation='none', vmin=style["bounds"].min(), vmax=style["bounds"].max())
+    _format_axes(ax, tone_color)
+
+    # Colorbar
+    image.set_clim(style["cb_lims"][0], style["cb_lims"][-1])
+    _colorbar(fig, image, style, tone_color, cb_orientation, ax=ax)
 
     # Title
     ax.set_title(title, color=tone_color, ha="left", va="bottom", x=0)
 
     # Tidy up
-    plt.tight_layout()
+    fig.tight_layout()
 
     if save_path:
         fig.savefig(save_path, bbox_inches="tight", dpi=300, transparent=False)
+
+    return fig
+
+
+def small_multiples(hourly_values: dict, plot_type: str = "utci", columns: int = 4, location_string: str = None, tone_color: str = "#555555", save_path: str = None, analysis_period=None):
+    """
+    Plot several sets of hourly values as a grid of heatmaps sharing one colorbar
+    :param hourly_values: Dictionary of title and 8760 hourly values (or a value for each hour of the analysis period) for each heatmap
+    :param plot_type: "utci", "comfort" or "diff"
+    :param columns: Number of heatmaps in each row
+    :param location_string: Text preceding the overall title
+    :param tone_color: Colour of text, ticks and labels
+    :param save_path: Location to save the figure
+    :param analysis_period: Ladybug AnalysisPeriod of the values. If None, the whole year
+    :return fig:
+    """
+
+    style = _style(plot_type)
+    rows = int(np.ceil(len(hourly_values) / columns))
+    fig = Figure(figsize=(5 * columns, 2.5 * rows + 1))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(rows, columns, squeeze=False)
+
+    image = None
+    for ax, (name, values) in zip(axes.flat, hourly_values.items()):
+        image = ax.imshow(
+            _day_hour_array(values, plot_type, analysis_period)[::-1], extent=_X_EXTENT + _Y_EXTENT, aspect='auto',
+            cmap=style["cmap"], interpolation='none', vmin=style["cb_lims"][0], vmax=style["cb_lims"][-1])
+        _format_axes(ax, tone_color)
+        ax.set_title(name, color=tone_color, ha="left", va="bottom", x=0, fontsize="small")
+    for ax in axes.flat[len(hourly_values):]:
+        ax.set_visible(False)
+
+    _colorbar(fig, image, style, tone_color, "horizontal", ax=axes.ravel().tolist())
+    fig.suptitle("{} - {}".format(location_string, style["name"]) if location_string else style["name"], color=tone_color, x=0, ha="left")
+
+    if save_path:
+        fig.savefig(save_path, bbox_inches="tight", dpi=150, transparent=False)
+
+    return fig
+
+
+def _render_heatmaps(jobs: list, plot_type: str, tone_color: str, cb_orientation: str, dpi: int, analysis_period=None):
+    """Render a list of (hourly values, location string, save path) with a single re-used figure"""
+    renderer = HeatmapRenderer(plot_type, tone_color=tone_color, cb_orientation=cb_orientation)
+    for hourly_values, location_string, save_path in jobs:
+        renderer.render(hourly_values, location_string=location_string, save_path=save_path, dpi=dpi, analysis_period=analysis_period)
+    return len(jobs)
+
+
+def heatmaps(jobs: list, plot_type: str = "utci", tone_color: str = "#555555", cb_orientation: str = "horizontal", dpi: int = 300, workers: int = None, analysis_period=None):
+    """
+    Render many heatmaps to file, split across a pool of processes that each re-use a single figure
+    :param jobs: List of (hourly values, location string, save path) for each heatmap, with 8760 values or one for each hour of the analysis period
+    :param plot_type: "utci", "comfort" or "diff"
+    :param tone_color: Colour of text, ticks and labels
+    :param cb_orientation: "horizontal" or "vertical" colorbar
+    :param dpi: Resolution of the saved heatmaps
+    :param workers: Number of processes rendering concurrently. Defaults to the number of CPUs; 1 renders in this process
+    :param analysis_period: Ladybug AnalysisPeriod of the values of every heatmap. If None, the whole year
+    :return save_paths: Locations of the saved heatmaps
+    """
+
+    jobs = [(np.asarray(values, dtype=np.float32), location_string, str(save_path)) for values, location_string, save_path in jobs]
+    workers = min(len(jobs), os.cpu_count() or 1) if workers is None else workers
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for future in [profiling.submit(executor, _render_heatmaps, jobs[n::workers], plot_type, tone_color, cb_orientation, dpi, analysis_period) for n in range(workers)]:
+                future.result()
+    elif jobs:
+        _render_heatmaps(jobs, plot_type, tone_color, cb_orientation, dpi, analysis_period)
+
+    return [save_path for _, _, save_path in jobs]
@@ -0,0 +1,232 @@
+import functools
+import json
+from concurrent.futures import Future
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+_STATE = {"enabled": False, "memory": False, "origin": 0.0}
+_EVENTS = []
+_LOCAL = threading.local()
+
+
+class _Span(object):
+    __slots__ = ("name", "args", "parent", "start", "cpu", "children_cpu", "peak_python_memory")
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+        if _STATE["memory"]:
+            # Carry the peak so far up to the enclosing span, then measure this span's peak from here
+            if self.parent is not None:
+                self.parent.peak_python_memory = max(self.parent.peak_python_memory, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self.peak_python_memory = 0
+        times = os.times()
+        self.children_cpu = times.children_user + times.children_system
+        self.cpu = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        cpu = time.process_time() - self.cpu
+        times = os.times()
+        children_cpu = times.children_user + times.children_system - self.children_cpu
+        _stack().pop()
+
+        args = dict(self.args, cpu_time=cpu, subprocess_cpu_time=children_cpu)
+        if _STATE["memory"]:
+            self.peak_python_memory = max(self.peak_python_memory, tracemalloc.get_traced_memory()[1])
+            if self.parent is not None:
+                self.parent.peak_python_memory = max(self.parent.peak_python_memory, self.peak_python_memory)
+            tracemalloc.reset_peak()
+            args["peak_python_memory"] = self.peak_python_memory
+        if exc_type is not None:
+            args["error"] = repr(exc_value)
+
+        _EVENTS.append({
+            "name": self.name,
+            "ph": "X",
+            "ts": (self.start - _STATE["origin"]) * 1E6,
+            "dur": (end - self.start) * 1E6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        })
+        logger.debug("%s took %.3fs (%.3fs CPU, %.3fs subprocess CPU)", self.name, end - self.start, cpu, children_cpu)
+        return False
+
+
+class _NullSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _stack():
+    if not hasattr(_LOCAL, "stack"):
+        _LOCAL.stack = []
+    return _LOCAL.stack
+
+
+def span(name: str, **args):
+    """
+    Time a block of code as a named span, nested within any span already open in the same thread. When profiling is
+    disabled this returns a shared do-nothing context manager, so instrumented code costs a function call.
+    :param name: Name of the span, e.g. "ground.energyplus"
+    :param args: Further values to record with the span
+    :return span: Context manager
+    """
+
+    return _Span(name, args) if _STATE["enabled"] else _NULL_SPAN
+
+
+def profiled(name: str):
+    """
+    Decorator timing each call of a function as a span
+    :param name: Name of the span
+    :return decorator:
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _STATE["enabled"]:
+                return function(*args, **kwargs)
+            with _Span(name, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable(memory: bool = False):
+    """
+    Start recording spans
+    :param memory: Also record the peak Python heap memory allocated within each span, as traced by tracemalloc (which slows allocation-heavy code). This excludes memory allocated outside Python's allocator, so it is not the peak memory of the process
+    :return:
+    """
+
+    _STATE["enabled"] = True
+    _STATE["memory"] = memory
+    if not _STATE["origin"]:
+        _STATE["origin"] = time.perf_counter()
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Stop recording spans (those already recorded are kept)"""
+    _STATE["enabled"] = False
+    if _STATE["memory"] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _STATE["memory"] = False
+
+
+def is_enabled():
+    return _STATE["enabled"]
+
+
+def reset():
+    """Discard the recorded spans"""
+    del _EVENTS[:]
+
+
+def spans():
+    """
+    Get the recorded spans
+    :return spans: List of dictionaries of span name, start and duration (in microseconds) and recorded values
+    """
+
+    return [dict(event) for event in _EVENTS]
+
+
+def summary():
+    """
+    Total the recorded spans by name
+    :return summary: Dictionary of span name and its count, wall time, CPU time and subprocess CPU time [s] and largest peak Python heap memory [bytes]
+    """
+
+    totals = {}
+    for event in _EVENTS:
+        total = totals.setdefault(event["name"], {"count": 0, "wall_time": 0.0, "cpu_time": 0.0, "subprocess_cpu_time": 0.0, "peak_python_memory": None})
+        total["count"] += 1
+        total["wall_time"] += event["dur"] / 1E6
+        total["cpu_time"] += event["args"]["cpu_time"]
+        total["subprocess_cpu_time"] += event["args"]["subprocess_cpu_time"]
+        if "peak_python_memory" in event["args"]:
+            total["peak_python_memory"] = max(total["peak_python_memory"] or 0, event["args"]["peak_python_memory"])
+    return totals
+
+
+def submit(executor, function, *args, **kwargs):
+    """
+    Submit a call to a process pool, recording its spans in the worker process while profiling is enabled. The spans
+    are returned with the result and added to those of this process once the call completes, so worker stages appear
+    in the summary and trace (each under its own process).
+    :param executor: concurrent.futures executor
+    :param function: Function to call
+    :param args: Positional arguments of the function
+    :param kwargs: Keyword arguments of the function
+    :return future: Future of the function's result
+    """
+
+    if not _STATE["enabled"]:
+        return executor.submit(function, *args, **kwargs)
+
+    future = Future()
+    worker_future = executor.submit(_call_recorded, function, _STATE["memory"], _STATE["origin"], args, kwargs)
+
+    def merge(worker_future):
+        try:
+            result, events = worker_future.result()
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        _EVENTS.extend(events)
+        future.set_result(result)
+
+    worker_future.add_done_callback(merge)
+    return future
+
+
+def _call_recorded(function, memory: bool, origin: float, args: tuple, kwargs: dict):
+    """Call a function in a worker process with profiling enabled, returning its result and the spans recorded"""
+    # Forked workers start with a copy of the parent's spans, which are discarded
+    reset()
+    enable(memory)
+    _STATE["origin"] = origin
+    try:
+        result = function(*args, **kwargs)
+        return result, spans()
+    finally:
+        disable()
+        reset()
+
+
+def write_trace(file_path: str):
+    """
+    Write the recorded spans as a Chrome trace (viewable in chrome://tracing or Perfetto)
+    :param file_path: Location of the JSON trace file
+    :return file_path:
+    """
+
+    with open(file_path, "w") as f:
+        json.dump({"traceEvents": _EVENTS, "displayTimeUnit": "ms"}, f, default=str)
+    return file_path
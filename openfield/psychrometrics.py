@@ -0,0 +1,145 @@
+import numpy as np
+
+from . import profiling
+
+
+def saturated_vapor_pressure(t_kelvin):
+    """
+    Calculate the saturated vapour pressure over water (above freezing) or ice (below freezing)
+    :param t_kelvin: Dry-bulb temperature [K]
+    :return saturated_vapor_pressure: Saturated vapour pressure [Pa]
+    """
+
+    t = np.asarray(t_kelvin, dtype=float)
+    ln_p_ws = np.where(
+        t <= 273.15,
+        -5.6745359E+03 / t + 6.3925247 - 9.677843E-03 * t + 6.2215701E-07 * t ** 2 + 2.0747825E-09 * t ** 3 - 9.484024E-13 * t ** 4 + 4.1635019 * np.log(t),
+        -5.8002206E+03 / t + 1.3914993 - 4.8640239E-02 * t + 4.1764768E-05 * t ** 2 - 1.4452093E-08 * t ** 3 + 6.5459673 * np.log(t),
+    )
+    return np.exp(ln_p_ws)
+
+
+def humid_ratio_from_db_rh(dry_bulb_temperature, relative_humidity, pressure=101325):
+    """
+    Calculate humidity ratio from dry-bulb temperature and relative humidity
+    :param dry_bulb_temperature: Dry-bulb temperature [C]
+    :param relative_humidity: Relative humidity [%]
+    :param pressure: Atmospheric pressure [Pa]
+    :return humidity_ratio: Humidity ratio [kg water/kg air]
+    """
+
+    p_w = saturated_vapor_pressure(np.asarray(dry_bulb_temperature, dtype=float) + 273.15) * (np.asarray(relative_humidity, dtype=float) / 100)
+    return (p_w * 0.621945) / (pressure - p_w)
+
+
+def humid_ratio_from_db_wb(dry_bulb_temperature, wet_bulb_temperature, pressure=101325):
+    """
+    Calculate humidity ratio from dry-bulb and wet-bulb temperature
+    :param dry_bulb_temperature: Dry-bulb temperature [C]
+    :param wet_bulb_temperature: Wet-bulb temperature [C]
+    :param pressure: Atmospheric pressure [Pa]
+    :return humidity_ratio: Humidity ratio [kg water/kg air]
+    """
+
+    db = np.asarray(dry_bulb_temperature, dtype=float)
+    wb = np.asarray(wet_bulb_temperature, dtype=float)
+    p_ws = saturated_vapor_pressure(wb + 273.15)
+    w_s = 0.621945 * p_ws / (pressure - p_ws)
+    return np.where(
+        wb >= 0,
+        ((2501. - 2.326 * wb) * w_s - 1.006 * (db - wb)) / (2501. + 1.86 * db - 4.186 * wb),
+        ((2830. - 0.24 * wb) * w_s - 1.006 * (db - wb)) / (2830. + 1.86 * db - 2.1 * wb),
+    )
+
+
+def rel_humid_from_db_hr(dry_bulb_temperature, humidity_ratio, pressure=101325):
+    """
+    Calculate relative humidity from dry-bulb temperature and humidity ratio
+    :param dry_bulb_temperature: Dry-bulb temperature [C]
+    :param humidity_ratio: Humidity ratio [kg water/kg air]
+    :param pressure: Atmospheric pressure [Pa]
+    :return relative_humidity: Relative humidity [%]
+    """
+
+    p_w = pressure * humidity_ratio / (0.621945 + humidity_ratio)
+    return 100 * p_w / saturated_vapor_pressure(np.asarray(dry_bulb_temperature, dtype=float) + 273.15)
+
+
+def dew_point_from_db_rh(dry_bulb_temperature, relative_humidity, max_iterations: int = 100):
+    """
+    Calculate dew-point temperature from dry-bulb temperature and relative humidity, by Newton-Raphson iteration on the
+    logarithm of the saturated vapour pressure. As in ladybug.psychrometrics.dew_point_from_db_rh, each value stops
+    changing once a step is within 0.1C.
+    :param dry_bulb_temperature: Dry-bulb temperature [C]
+    :param relative_humidity: Relative humidity [%]
+    :param max_iterations: Maximum number of iterations
+    :return dew_point_temperature: Dew-point temperature [C]
+    """
+
+    db, rh = np.broadcast_arrays(np.asarray(dry_bulb_temperature, dtype=float), np.asarray(relative_humidity, dtype=float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ln_p_w = np.log(saturated_vapor_pressure(db + 273.15) * (rh / 100))
+        dry = ~np.isfinite(ln_p_w)  # No water vapour, so the dew point is absolute zero
+
+        td = db.copy()
+        converged = dry.copy()
+        for _ in range(max_iterations):
+            if converged.all():
+                break
+            t = td + 273.15
+            d_ln_p_ws = np.where(
+                td <= 0,
+                5.6745359E+03 / t ** 2 - 9.677843E-03 + 2 * 6.2215701E-07 * t + 3 * 2.0747825E-09 * t ** 2 - 4 * 9.484024E-13 * t ** 3 + 4.1635019 / t,
+                5.8002206E+03 / t ** 2 - 4.8640239E-02 + 2 * 4.1764768E-05 * t - 3 * 1.4452093E-08 * t ** 2 + 6.5459673 / t,
+            )
+            step = (np.log(saturated_vapor_pressure(t)) - ln_p_w) / d_ln_p_ws
+            td_next = np.where(converged, td, td - step)
+            converged |= np.abs(td_next - td) <= 0.1
+            td = td_next
+
+    return np.where(dry, -273.15, np.minimum(td, db))
+
+
+def wet_bulb_from_db_rh(dry_bulb_temperature, relative_humidity, pressure=101325, iterations: int = 25):
+    """
+    Calculate wet-bulb temperature from dry-bulb temperature and relative humidity, solving for all values at once by
+    bisection with a fixed number of iterations. The default of 25 iterations resolves the wet-bulb temperature to
+    better than 0.00001C, tighter than the 0.1C tolerance of ladybug.psychrometrics.wet_bulb_from_db_rh. The
+    bisection starts from the same bounds as ladybug's (the dew-point and dry-bulb temperatures), so near 0C, where
+    the switch between the ice and water equations can give a second solution, it finds the same one.
+    :param dry_bulb_temperature: Dry-bulb temperature [C]
+    :param relative_humidity: Relative humidity [%]
+    :param pressure: Atmospheric pressure [Pa]
+    :param iterations: Number of bisection iterations
+    :return wet_bulb_temperature: Wet-bulb temperature [C]
+    """
+
+    db, rh, pressure = np.broadcast_arrays(np.asarray(dry_bulb_temperature, dtype=float), np.asarray(relative_humidity, dtype=float), np.asarray(pressure, dtype=float))
+    humidity_ratio = humid_ratio_from_db_rh(db, rh, pressure)
+
+    # The wet-bulb temperature lies between the dew-point and dry-bulb temperatures
+    upper = db.copy()
+    lower = dew_point_from_db_rh(db, rh)
+    for _ in range(iterations):
+        wb = (upper + lower) / 2
+        too_high = humid_ratio_from_db_wb(db, wb, pressure) > humidity_ratio
+        upper = np.where(too_high, wb, upper)
+        lower = np.where(too_high, lower, wb)
+
+    return (upper + lower) / 2
+
+
+@profiling.profiled("psychrometrics.evaporative_cooling")
+def evaporative_cooling(dry_bulb_temperature, relative_humidity, pressure=101325, effectiveness=0.7):
+    """
+    Calculate the air temperature following direct evaporative cooling
+    :param dry_bulb_temperature: Dry-bulb temperature [C]
+    :param relative_humidity: Relative humidity [%]
+    :param pressure: Atmospheric pressure [Pa]
+    :param effectiveness: Fraction of the wet-bulb depression removed by evaporation (broadcast against the weather, so an array of shape (n, 1) gives n cooled series)
+    :return dry_bulb_temperature: Cooled dry-bulb temperature [C]
+    """
+
+    db = np.asarray(dry_bulb_temperature, dtype=float)
+    wb = wet_bulb_from_db_rh(db, relative_humidity, pressure)
+    return db - ((db - wb) * np.asarray(effectiveness, dtype=float))
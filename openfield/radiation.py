@@ -1,53 +1,176 @@
+import logging
 import pathlib
 import tempfile
-import pandas as pd
+from typing import Union
 
-from ladybug.datacollection import HourlyContinuousCollection
+import numpy as np
+from numpy.lib.format import open_memmap
 from ladybug.analysisperiod import AnalysisPeriod
-from ladybug.header import Header
 from ladybug.datatype.energyflux import DirectHorizontalIrradiance, DiffuseHorizontalIrradiance
-from honeybee.radiance.sky.skymatrix import SkyMatrix
-from honeybee.radiance.analysisgrid import AnalysisGrid
-from honeybee.radiance.recipe.annual.gridbased import GridBased
 
+from . import period, profiling
+from .daylight import DaylightCoefficients, coefficients_file
+from .weather import Weather, load_weather
 
-def run(epw_file: str, case_name: str=None, output_directory: str = None):
+logger = logging.getLogger(__name__)
+
+
+@profiling.profiled("radiation.run")
+def run(epw_file: Union[str, Weather], case_name: str=None, output_directory: str = None, analysis_period: AnalysisPeriod = None):
     """
     Calculate the open-field irradiation from the sky, split into direct-from-sun, and diffuse-from-sky-dome components
-    :param epw_file: Weather-file with location and climatic conditions for simulation
+    :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
     :param case_name: Name of case being simulated
     :param output_directory: Location of generated outputs
+    :param analysis_period: Ladybug AnalysisPeriod of the hours to simulate. If None, the whole year
     :return DirectHorizontalIrradiance, DiffuseHorizontalIrradiance:
     """
 
+    # Simulate the single open-field test-point
+    sun, diffuse = run_grid(epw_file, [[0, 0, 1.2]], case_name=case_name, output_directory=output_directory, analysis_period=analysis_period)
+
+    sun = period.hourly_collection(DirectHorizontalIrradiance(), "W/m2", sun[0], analysis_period)
+    diffuse = period.hourly_collection(DiffuseHorizontalIrradiance(), "W/m2", diffuse[0], analysis_period)
+
+    logger.info("Direct and diffuse solar radiation simulation completed")
+
+    return sun, diffuse
+
+
+def load_test_point(result_directory: str, analysis_period: AnalysisPeriod = None):
+    """
+    Load the direct and diffuse radiation of the open-field test-point from an earlier simulation (see run)
+    :param result_directory: Location of Radiance result files, for the whole year or for the hours of the analysis period
+    :param analysis_period: Ladybug AnalysisPeriod of the hours to load. If None, the whole year
+    :return DirectHorizontalIrradiance, DiffuseHorizontalIrradiance:
+    """
+
+    sun, diffuse = load_results(result_directory)
+    if sun.shape[-1] == 8760:
+        hours = period.analysis_hours(analysis_period)
+        sun, diffuse = sun[:, hours], diffuse[:, hours]
+
+    sun = period.hourly_collection(DirectHorizontalIrradiance(), "W/m2", sun[0], analysis_period)
+    diffuse = period.hourly_collection(DiffuseHorizontalIrradiance(), "W/m2", diffuse[0], analysis_period)
+    return sun, diffuse
+
+
+@profiling.profiled("radiation.run_grid")
+def run_grid(epw_file: Union[str, Weather], points: list, vectors: list = None, case_name: str = None, output_directory: str = None, reuse_daylight_coefficients: bool = True, analysis_period: AnalysisPeriod = None):
+    """
+    Calculate the irradiation from the sky at a grid of points, split into direct-from-sun, and diffuse-from-sky-dome components
+    :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+    :param points: List of [x, y, z] sensor point locations
+    :param vectors: List of [x, y, z] sensor directions (defaults to facing up)
+    :param case_name: Name of case being simulated
+    :param output_directory: Location of generated outputs
+    :param reuse_daylight_coefficients: Reuse the daylight-coefficient matrices from a previous simulation of this grid and location, so that only the sky matrices are generated for this weather
+    :param analysis_period: Ladybug AnalysisPeriod of the hours to simulate (only these hours are put in the sky matrix). If None, the whole year
+    :return sun, diffuse: Float32 arrays of direct and diffuse horizontal irradiance [W/m2], of shape (points, hours)
+    """
+
     case_name = "openfield" if case_name is None else case_name
     output_directory = pathlib.Path(tempfile.gettempdir()) if output_directory is None else output_directory
 
     # Preparation
-    epw_file = pathlib.Path(epw_file)
+    weather = load_weather(epw_file)
+    epw_file = pathlib.Path(weather.path)
     output_directory = pathlib.Path(output_directory)
 
-    # Prepare Radiance case for radiation incident on exposed test-point
-    smx = SkyMatrix.from_epw_file(epw_file)
-    ag = AnalysisGrid.from_points_and_vectors([[0, 0, 1.2]], name="OpenField")
+    hoys = period.sky_hours(analysis_period)
+
+    # Apply the stored daylight coefficients for this grid and location to this weather, if they exist. Sun positions
+    # are at the middle of each hour, so coefficients for the whole year cover those of any analysis period.
+    dc_file = coefficients_file(weather.location, points, vectors, hoys=hoys)
+    if reuse_daylight_coefficients:
+        for stored_file in dict.fromkeys([coefficients_file(weather.location, points, vectors), dc_file]):
+            if stored_file.exists():
+                return DaylightCoefficients.load(stored_file).irradiance(weather, working_directory=output_directory / case_name / "sky", analysis_period=analysis_period)
+
+    # Prepare Radiance case for radiation incident on exposed test-points, for the hours of the analysis period
+    from honeybee.radiance.sky.skymatrix import SkyMatrix
+    from honeybee.radiance.analysisgrid import AnalysisGrid
+    from honeybee.radiance.recipe.annual.gridbased import GridBased
+
+    smx = SkyMatrix.from_epw_file(epw_file, hoys=hoys)
+    ag = AnalysisGrid.from_points_and_vectors(points, vectors, name="OpenField")
     recipe = GridBased(sky_mtx=smx, analysis_grids=[ag], simulation_type=1)
 
     # Run annual irradiance simulation
-    command_file = recipe.write(target_folder=output_directory, project_name=case_name)
-    recipe.run(command_file=command_file)
+    with profiling.span("radiation.recipe"):
+        command_file = recipe.write(target_folder=output_directory, project_name=case_name)
+        recipe.run(command_file=command_file)
+
+    # Store the daylight coefficients for reuse with other weather-files for the same location
+    DaylightCoefficients.from_project(output_directory / case_name / "gridbased_annual", sky_density=smx.sky_density, north=smx.north).save(dc_file)
 
     # Read Radiance results
-    total = pd.read_csv(output_directory / case_name / "gridbased_annual" / "result" / "total..scene..default.ill",
-                        skiprows=6, sep="\t", header=None, ).T.dropna() / 179
-    direct = pd.read_csv(output_directory / case_name / "gridbased_annual" / "result" / "direct..scene..default.ill",
-                         skiprows=6, sep="\t", header=None, ).T.dropna() / 179
-    diffuse = (total - direct)[0].values
-    sun = (pd.read_csv(output_directory / case_name / "gridbased_annual" / "result" / "sun..scene..default.ill",
-                       skiprows=6, sep="\t", header=None, ).T.dropna() / 179)[0].values
+    return load_results(output_directory / case_name / "gridbased_annual" / "result")
 
-    sun = HourlyContinuousCollection(header=Header(DirectHorizontalIrradiance(), unit="W/m2", analysis_period=AnalysisPeriod()), values=sun)
-    diffuse = HourlyContinuousCollection(header=Header(DiffuseHorizontalIrradiance(), unit="W/m2", analysis_period=AnalysisPeriod()), values=diffuse)
 
-    print("Direct and diffuse solar radiation simulation completed")
+@profiling.profiled("radiation.load_results")
+def load_results(result_directory: str, chunk_size: int = 1000):
+    """
+    Load the results of an annual irradiance simulation, processing them in chunks of points to limit memory use
+    :param result_directory: Location of Radiance result files
+    :param chunk_size: Number of points processed at a time
+    :return sun, diffuse: Memory-mapped float32 arrays of direct and diffuse horizontal irradiance [W/m2], of shape (points, hours)
+    """
 
-    return sun, diffuse
+    result_directory = pathlib.Path(result_directory)
+    total = read_ill(result_directory / "total..scene..default.ill")
+    direct = read_ill(result_directory / "direct..scene..default.ill")
+    sun_total = read_ill(result_directory / "sun..scene..default.ill")
+
+    sun = open_memmap(result_directory / "sun.npy", mode="w+", dtype=np.float32, shape=total.shape)
+    diffuse = open_memmap(result_directory / "diffuse.npy", mode="w+", dtype=np.float32, shape=total.shape)
+    for i in range(0, total.shape[0], chunk_size):
+        sun[i:i + chunk_size] = sun_total[i:i + chunk_size] / 179
+        diffuse[i:i + chunk_size] = (total[i:i + chunk_size] - direct[i:i + chunk_size]) / 179
+    sun.flush()
+    diffuse.flush()
+    del sun, diffuse
+
+    return np.load(result_directory / "sun.npy", mmap_mode="r"), np.load(result_directory / "diffuse.npy", mmap_mode="r")
+
+
+@profiling.profiled("radiation.read_ill")
+def read_ill(ill_file: str):
+    """
+    Read a Radiance result matrix into a float32 array of shape (points, hours). The text file is converted once to a
+    binary .npy file alongside it, which is memory-mapped on subsequent reads.
+    :param ill_file: Radiance result file
+    :return values:
+    """
+
+    ill_file = pathlib.Path(ill_file)
+    npy_file = ill_file.with_suffix(".npy")
+    if npy_file.exists() and npy_file.stat().st_mtime >= ill_file.stat().st_mtime:
+        return np.load(npy_file, mmap_mode="r")
+
+    with open(ill_file, "r") as f:
+        # Read the header (terminated by a blank line) for the matrix dimensions
+        header = {}
+        if f.readline().startswith("#?RADIANCE"):
+            for line in f:
+                line = line.strip()
+                if not line:
+                    break
+                k, _, v = line.partition("=")
+                header[k] = v
+        else:
+            f.seek(0)
+
+        # Write each row of the matrix straight to disk when its size is known
+        if "NROWS" in header and "NCOLS" in header:
+            values = open_memmap(npy_file, mode="w+", dtype=np.float32, shape=(int(header["NROWS"]), int(header["NCOLS"])))
+            for n, line in enumerate(f):
+                if n >= values.shape[0]:
+                    break
+                values[n] = np.array(line.split(), dtype=np.float32)
+            values.flush()
+            del values
+        else:
+            np.save(npy_file, np.array([line.split() for line in f if line.strip()], dtype=np.float32))
+
+    return np.load(npy_file, mmap_mode="r")
@@ -0,0 +1,188 @@
+import json
+import os
+import pathlib
+
+import numpy as np
+
+# UTCI values bounding each stress category, from extreme cold stress to extreme heat stress
+UTCI_CATEGORY_BOUNDS = [-40, -27, -13, 0, 9, 26, 32, 38, 46]
+UTCI_CATEGORIES = ["Extreme cold stress", "Very strong cold stress", "Strong cold stress", "Moderate cold stress",
+                   "Slight cold stress", "No thermal stress", "Moderate heat stress", "Strong heat stress",
+                   "Very strong heat stress", "Extreme heat stress"]
+
+# Month and hour of the day of each hour of a non-leap year
+_MONTH = np.repeat(np.arange(12), np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]) * 24)
+_HOUR = np.tile(np.arange(24), 365)
+
+
+class ResultsStore(object):
+    def __init__(self, directory: str):
+        """
+        Store of hourly results (e.g. MRT or UTCI) on disk, with a float32 array of shape (scenarios, points, hours) for
+        each variable and site. Arrays are memory-mapped when read, and aggregations work through them in chunks, so
+        results for a whole portfolio never need to be in memory at once.
+        :param directory: Location of the store
+        """
+
+        self.directory = pathlib.Path(directory)
+
+    def __repr__(self):
+        return "ResultsStore: {}".format(self.directory)
+
+    def variables(self):
+        """Variables in the store"""
+        return sorted(i.name for i in self.directory.iterdir() if i.is_dir()) if self.directory.exists() else []
+
+    def sites(self, variable: str = "utci"):
+        """Sites with results for a variable"""
+        return sorted(i.stem for i in (self.directory / variable).glob("*.json"))
+
+    def metadata(self, site: str, variable: str = "utci"):
+        """Scenario labels and any other metadata stored with the results of a site"""
+        with open(self.directory / variable / "{}.json".format(site), "r") as f:
+            return json.load(f)
+
+    def scenarios(self, site: str, variable: str = "utci"):
+        """Labels of the scenarios of a site"""
+        return self.metadata(site, variable)["scenarios"]
+
+    def write(self, site: str, scenarios: list, values, variable: str = "utci", **metadata):
+        """
+        Write the hourly results of a site
+        :param site: Name of the site
+        :param scenarios: Label of each scenario
+        :param values: Array of values of shape (scenarios, hours) or (scenarios, points, hours)
+        :param variable: Name of the variable
+        :param metadata: Further JSON-serialisable metadata to store with the results, e.g. "hours" - the hour of the year of each value, if not the whole year from the 1st of January
+        :return:
+        """
+
+        values = np.asarray(values, dtype=np.float32)
+        values = values[:, None, :] if values.ndim == 2 else values
+        if len(scenarios) != values.shape[0]:
+            raise ValueError("{} scenario labels given for {} scenarios".format(len(scenarios), values.shape[0]))
+
+        directory = self.directory / variable
+        directory.mkdir(parents=True, exist_ok=True)
+
+        # Values are written first and the metadata last, so a site only appears in the store once complete
+        values_file = directory / "{}.npy".format(site)
+        temporary_path = values_file.with_name(values_file.name + ".tmp")
+        with open(temporary_path, "wb") as f:
+            np.save(f, values)
+        os.replace(temporary_path, values_file)
+
+        metadata_file = directory / "{}.json".format(site)
+        temporary_path = metadata_file.with_name(metadata_file.name + ".tmp")
+        with open(temporary_path, "w") as f:
+            json.dump(dict(metadata, scenarios=list(scenarios), shape=values.shape), f, default=float)
+        os.replace(temporary_path, metadata_file)
+
+    def write_sweep(self, site: str, result, variable: str = "utci", **metadata):
+        """
+        Write an openfield.sweep.SweepResult, with a scenario for each combination of the swept parameters
+        :param site: Name of the site
+        :param result: SweepResult, with the hour of the year as its last dimension
+        :param variable: Name of the variable
+        :param metadata: Further JSON-serialisable metadata to store with the results
+        :return:
+        """
+
+        metadata.setdefault("hours", list(result.coords["hour"]))
+        parameter_dims = [dim for dim in result.dims if dim != "hour"]
+        labels = [",".join("{}={}".format(k, v) for k, v in case.items()) for case, _ in result.cases()]
+        values = np.asarray(result.values).reshape(-1, result.values.shape[-1])
+        self.write(site, labels, values, variable, dims=parameter_dims, coords={dim: result.coords[dim] for dim in parameter_dims}, **metadata)
+
+    def read(self, site: str, scenario: str = None, variable: str = "utci", mmap_mode: str = "r"):
+        """
+        Read the hourly results of a site
+        :param site: Name of the site
+        :param scenario: Label of a scenario to read. If None, all scenarios are read
+        :param variable: Name of the variable
+        :param mmap_mode: Memory-map mode used to open the values, or None to load them into memory
+        :return values: Array of shape (scenarios, points, hours), or (points, hours) for a single scenario
+        """
+
+        values = np.load(self.directory / variable / "{}.npy".format(site), mmap_mode=mmap_mode)
+        return values if scenario is None else values[self._scenario_index(site, scenario, variable)]
+
+    def stress_hours(self, site: str, variable: str = "utci", chunk_size: int = 256):
+        """
+        Count the hours in each UTCI stress category, by month and hour of the day
+        :param site: Name of the site
+        :param variable: Name of the (UTCI) variable
+        :param chunk_size: Number of points read at a time
+        :return hours: Array of hours of shape (scenarios, points, categories, months, hours of the day) - see UTCI_CATEGORIES
+        """
+
+        values = self.read(site, variable=variable)
+        hours_of_year = np.asarray(self.metadata(site, variable).get("hours", np.arange(values.shape[-1])), dtype=int)
+        n_categories = len(UTCI_CATEGORIES)
+        bins = n_categories * 12 * 24
+        period = _MONTH[hours_of_year] * 24 + _HOUR[hours_of_year]
+        hours = np.zeros((values.shape[0], values.shape[1], bins), dtype=np.int32)
+        for scenario, start, chunk in _chunks(values, chunk_size):
+            category = np.digitize(chunk, UTCI_CATEGORY_BOUNDS, right=True)
+            index = (np.arange(len(chunk))[:, None] * bins) + (category * 12 * 24) + period
+            hours[scenario, start:start + len(chunk)] = np.bincount(index.ravel(), minlength=len(chunk) * bins).reshape(len(chunk), bins)
+        return hours.reshape(values.shape[0], values.shape[1], n_categories, 12, 24)
+
+    def percent_comfortable(self, site: str, variable: str = "utci", low: float = 9, high: float = 26, chunk_size: int = 256):
+        """
+        Calculate the percentage of hours with no thermal stress (UTCI above 9C, up to 26C)
+        :param site: Name of the site
+        :param variable: Name of the (UTCI) variable
+        :param low: Value above which hours are comfortable
+        :param high: Highest comfortable value
+        :param chunk_size: Number of points read at a time
+        :return percent: Array of percentage of comfortable hours of shape (scenarios, points)
+        """
+
+        values = self.read(site, variable=variable)
+        percent = np.zeros(values.shape[:2])
+        for scenario, start, chunk in _chunks(values, chunk_size):
+            percent[scenario, start:start + len(chunk)] = ((chunk > low) & (chunk <= high)).mean(axis=-1) * 100
+        return percent
+
+    def delta(self, site: str, scenario: str, baseline: str, variable: str = "utci"):
+        """
+        Calculate the hourly difference between a scenario and a baseline scenario
+        :param site: Name of the site
+        :param scenario: Label of the scenario
+        :param baseline: Label of the baseline scenario
+        :param variable: Name of the variable
+        :return delta: Array of differences of shape (points, hours)
+        """
+
+        return np.subtract(self.read(site, scenario, variable), self.read(site, baseline, variable))
+
+    def mean_delta(self, site: str, baseline: str, variable: str = "utci", chunk_size: int = 256):
+        """
+        Calculate the mean hourly difference between each scenario and a baseline scenario
+        :param site: Name of the site
+        :param baseline: Label of the baseline scenario
+        :param variable: Name of the variable
+        :param chunk_size: Number of points read at a time
+        :return delta: Array of mean differences of shape (scenarios, points)
+        """
+
+        values = self.read(site, variable=variable)
+        baseline = self._scenario_index(site, baseline, variable)
+        delta = np.zeros(values.shape[:2])
+        for scenario, start, chunk in _chunks(values, chunk_size):
+            delta[scenario, start:start + len(chunk)] = (chunk - values[baseline, start:start + len(chunk)]).mean(axis=-1)
+        return delta
+
+    def _scenario_index(self, site: str, scenario: str, variable: str):
+        scenarios = self.scenarios(site, variable)
+        if scenario not in scenarios:
+            raise KeyError("Scenario \"{}\" isn't stored for {} - scenarios are {}".format(scenario, site, scenarios))
+        return scenarios.index(scenario)
+
+
+def _chunks(values, chunk_size: int):
+    """Iterate over a (scenarios, points, hours) array in blocks of points, loading each block into memory as float64"""
+    for scenario in range(values.shape[0]):
+        for start in range(0, values.shape[1], chunk_size):
+            yield scenario, start, np.asarray(values[scenario, start:start + chunk_size], dtype=float)
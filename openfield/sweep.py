@@ -0,0 +1,205 @@
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Union
+
+import numpy as np
+from ladybug.analysisperiod import AnalysisPeriod
+from ladybug.datacollection import HourlyContinuousCollection
+
+from .ground import Ground, calculate_surface_temperatures
+from . import period, profiling, utci, mrt, radiation
+from .weather import Weather, load_weather
+
+logger = logging.getLogger(__name__)
+
+# Parameters that can be swept, and their default values when not given as an axis
+GROUND_PARAMETERS = {"thickness": 0.2, "reflectivity": 0.35, "emissivity": 0.9, "conductivity": 1.1, "density": 2250, "specific_heat": 1000}
+SHADE_PARAMETERS = {"is_shaded": False, "shade_height": 4, "shade_transmittance": 0}
+COMFORT_PARAMETERS = {"evaporative_cooling_effectiveness": 0, "wind": 1}
+
+
+class SweepResult(object):
+    def __init__(self, dims: tuple, coords: dict, values):
+        """
+        Labelled N-dimensional array of sweep results, with an axis for each swept parameter followed by the hour of the year
+        :param dims: Names of each dimension of the values
+        :param coords: Dictionary of dimension name and the parameter value at each position along it
+        :param values: Array of values
+        """
+
+        self.dims = tuple(dims)
+        self.coords = {k: list(coords[k]) for k in self.dims}
+        self.values = values
+
+    def __repr__(self):
+        return "SweepResult: {}".format(", ".join("{} ({})".format(k, len(v)) for k, v in self.coords.items()))
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def sel(self, **kwargs):
+        """
+        Select values by parameter value, e.g. result.sel(reflectivity=0.4, is_shaded=True). Selected dimensions are dropped
+        :return result: SweepResult of the remaining dimensions
+        """
+
+        index = []
+        for dim in self.dims:
+            if dim in kwargs:
+                if kwargs[dim] not in self.coords[dim]:
+                    raise KeyError("{}={} isn't in this sweep - values are {}".format(dim, kwargs[dim], self.coords[dim]))
+                index.append(self.coords[dim].index(kwargs[dim]))
+            else:
+                index.append(slice(None))
+        unknown = set(kwargs) - set(self.dims)
+        if unknown:
+            raise KeyError("{} aren't dimensions of this sweep - dimensions are {}".format(sorted(unknown), self.dims))
+
+        dims = [dim for dim in self.dims if dim not in kwargs]
+        return SweepResult(dims, {dim: self.coords[dim] for dim in dims}, self.values[tuple(index)])
+
+    def cases(self):
+        """
+        Iterate over every combination of the swept parameters
+        :return: Generator of (dictionary of parameter values, hourly values)
+        """
+
+        parameter_dims = [dim for dim in self.dims if dim != "hour"]
+        for index in itertools.product(*[range(len(self.coords[dim])) for dim in parameter_dims]):
+            yield {dim: self.coords[dim][i] for dim, i in zip(parameter_dims, index)}, self.values[index]
+
+
+def _simulate_ground(ground: Ground, epw_file: Union[str, Weather], idd_file: str, shade: tuple, timeout: float = None, analysis_period: AnalysisPeriod = None):
+    """Calculate the surface temperature of a ground, returning the ground so that results come back from worker processes"""
+    is_shaded, shade_height, shade_transmittance = shade
+    ground.calculate_surface_temperature(epw_file, idd_file, is_shaded=is_shaded, shade_height=shade_height, shade_transmittance=shade_transmittance, timeout=timeout, analysis_period=analysis_period)
+    return ground
+
+
+@profiling.profiled("sweep.sweep")
+def sweep(epw_file: Union[str, Weather], axes: dict, idd_file: str = None, direct_horizontal_solar: HourlyContinuousCollection = None, diffuse_horizontal_solar: HourlyContinuousCollection = None, engine: str = "energyplus", workers: int = None, timeout: float = None, analysis_period: AnalysisPeriod = None):
+    """
+    Calculate UTCI for every combination of the given parameter values, simulating each stage once for each unique set
+    of the parameters it depends on: ground surface temperature once per ground material and shade, MRT once per ground
+    surface temperature, and UTCI in a single batch over the evaporative cooling and wind settings.
+    :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+    :param axes: Dictionary of parameter name and list of values to sweep. Parameters are the Ground material fields
+        (thickness, reflectivity, emissivity, conductivity, density, specific_heat), the shade (is_shaded, shade_height,
+        shade_transmittance) and comfort settings (evaporative_cooling_effectiveness, wind - as for openfield.utci)
+    :param idd_file: Location of EnergyPlus IDD file (to enable reference of IDF objects and simulation). Not needed by the "conduction" engine
+    :param direct_horizontal_solar: Radiation from the sun. If not given, this is simulated alongside the ground cases
+    :param diffuse_horizontal_solar: Radiation from the sky. If not given, this is simulated alongside the ground cases
+    :param engine: Ground surface temperature engine - "energyplus", or "conduction" to solve all grounds at once in-process
+    :param workers: Number of processes running simulations concurrently. Defaults to one per simulation (limited to the number of CPUs); 1 runs them sequentially
+    :param timeout: Maximum time in seconds to allow each EnergyPlus simulation to run
+    :param analysis_period: Ladybug AnalysisPeriod of the hours to calculate (radiation given must be for these hours). If None, the whole year
+    :return utci: SweepResult of UTCI values, with a dimension for each axis and the hour of the year
+    """
+
+    weather = load_weather(epw_file)
+    cases, ground_keys, comfort_keys = plan(axes)
+    logger.info("Sweep of {} cases: {} ground surface temperature, {} MRT and {} UTCI calculations".format(len(cases), len(ground_keys), len(ground_keys), len(ground_keys) * len(comfort_keys)))
+
+    # Calculate ground surface temperatures (and the solar radiation, if needed, alongside them)
+    run_radiation = (direct_horizontal_solar is None) or (diffuse_horizontal_solar is None)
+    grounds = [Ground(*material) for material, _ in ground_keys]
+    if engine == "conduction":
+        if run_radiation:
+            direct_horizontal_solar, diffuse_horizontal_solar = radiation.run(weather, analysis_period=analysis_period)
+        calculate_surface_temperatures(grounds, weather, is_shaded=[shade[0] for _, shade in ground_keys], shade_transmittance=[shade[2] or 0 for _, shade in ground_keys], direct_horizontal_solar=direct_horizontal_solar, diffuse_horizontal_solar=diffuse_horizontal_solar, analysis_period=analysis_period)
+    else:
+        workers = min(len(grounds) + int(run_radiation), os.cpu_count() or 1) if workers is None else workers
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                radiation_future = profiling.submit(executor, radiation.run, weather, analysis_period=analysis_period) if run_radiation else None
+                futures = [profiling.submit(executor, _simulate_ground, ground, weather, idd_file, shade, timeout, analysis_period) for ground, (_, shade) in zip(grounds, ground_keys)]
+                grounds = [future.result() for future in futures]
+                if run_radiation:
+                    direct_horizontal_solar, diffuse_horizontal_solar = radiation_future.result()
+        else:
+            if run_radiation:
+                direct_horizontal_solar, diffuse_horizontal_solar = radiation.run(weather, analysis_period=analysis_period)
+            grounds = [_simulate_ground(ground, weather, idd_file, shade, timeout, analysis_period) for ground, (_, shade) in zip(grounds, ground_keys)]
+
+    result = combine(weather, axes, [ground.surface_temperature.values for ground in grounds], direct_horizontal_solar, diffuse_horizontal_solar, analysis_period=analysis_period)
+
+    logger.info("Sweep completed")
+
+    return result
+
+
+def plan(axes: dict):
+    """
+    Expand sweep axes into cases, and find the unique ground and comfort settings they depend on
+    :param axes: Dictionary of parameter name and list of values to sweep (see sweep)
+    :return cases, ground_keys, comfort_keys: List of parameter dictionaries for each case, unique ((ground material), (is_shaded, shade_height, shade_transmittance)) and unique (evaporative_cooling_effectiveness, wind)
+    """
+
+    parameters = dict(GROUND_PARAMETERS, **SHADE_PARAMETERS, **COMFORT_PARAMETERS)
+    unknown = set(axes) - set(parameters)
+    if unknown:
+        raise ValueError("{} can't be swept - parameters are {}".format(sorted(unknown), sorted(parameters)))
+
+    dims = list(axes)
+    cases = [dict(parameters, **dict(zip(dims, values))) for values in itertools.product(*axes.values())]
+    ground_keys = list(dict.fromkeys(_ground_key(case) for case in cases))
+    comfort_keys = list(dict.fromkeys(_comfort_key(case) for case in cases))
+    return cases, ground_keys, comfort_keys
+
+
+@profiling.profiled("sweep.combine")
+def combine(epw_file: Union[str, Weather], axes: dict, surface_temperatures: list, direct_horizontal_solar, diffuse_horizontal_solar, analysis_period: AnalysisPeriod = None):
+    """
+    Calculate MRT and UTCI for every case of a sweep from already calculated ground surface temperatures
+    :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+    :param axes: Dictionary of parameter name and list of values to sweep (see sweep)
+    :param surface_temperatures: Hourly ground surface temperature for each of the ground keys given by plan(axes)
+    :param direct_horizontal_solar: Radiation from the sun (a collection or array)
+    :param diffuse_horizontal_solar: Radiation from the sky (a collection or array)
+    :param analysis_period: Ladybug AnalysisPeriod of the hours of the surface temperatures and radiation. If None, the whole year
+    :return utci: SweepResult of UTCI values, with a dimension for each axis and the hour of the year
+    """
+
+    weather = load_weather(epw_file)
+    cases, ground_keys, comfort_keys = plan(axes)
+
+    # Calculate MRT for every ground in one batch, with the exposed fraction of the body set by the shade
+    mean_radiant_temperature = mrt.mean_radiant_temperature_batch(
+        weather, direct_horizontal_solar, diffuse_horizontal_solar,
+        floor_reflectance=[material[1] for material, _ in ground_keys],
+        fraction_body_exposed=[shade[2] if shade[0] else 1 for _, shade in ground_keys],
+        longwave_mrt=[np.array(surface_temperature) * mrt.GROUND_VIEW_FACTOR for surface_temperature in surface_temperatures],
+        analysis_period=analysis_period,
+    )
+
+    # Calculate UTCI for every comfort setting against every MRT, of shape (comfort settings, grounds, hours)
+    universal_thermal_climate_index = np.stack([
+        utci.universal_thermal_climate_index_array(weather, mean_radiant_temperature, wind=wind, evaporative_cooling=effectiveness > 0, evaporative_cooling_effectiveness=effectiveness, analysis_period=analysis_period)
+        for effectiveness, wind in comfort_keys
+    ])
+
+    # Arrange the results along the swept axes
+    ground_index = {key: n for n, key in enumerate(ground_keys)}
+    comfort_index = {key: n for n, key in enumerate(comfort_keys)}
+    values = universal_thermal_climate_index[
+        [comfort_index[_comfort_key(case)] for case in cases],
+        [ground_index[_ground_key(case)] for case in cases],
+    ]
+    shape = [len(v) for v in axes.values()] + [values.shape[-1]]
+    coords = dict(axes, hour=period.analysis_hours(analysis_period).tolist())
+
+    return SweepResult(list(axes) + ["hour"], coords, values.reshape(shape))
+
+
+def _ground_key(case: dict):
+    """Ground material and shade of a case. Shade height and transmittance don't matter when unshaded"""
+    shade = (True, case["shade_height"], case["shade_transmittance"]) if case["is_shaded"] else (False, None, None)
+    return tuple(case[k] for k in GROUND_PARAMETERS), shade
+
+
+def _comfort_key(case: dict):
+    """Comfort settings of a case"""
+    return tuple(case[k] for k in COMFORT_PARAMETERS)
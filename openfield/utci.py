@@ -1,35 +1,161 @@
+import logging
+from typing import Union
+
 import numpy as np
-from ladybug.epw import EPW
-from ladybug_comfort.collection.utci import UTCI
+from ladybug.analysisperiod import AnalysisPeriod
 from ladybug.datacollection import HourlyContinuousCollection
-from ladybug.psychrometrics import wet_bulb_from_db_rh
-_wbt = np.vectorize(wet_bulb_from_db_rh)
+from ladybug.datatype.temperature import UniversalThermalClimateIndex
+
+from . import period, profiling, psychrometrics
+from .weather import Weather, load_weather
+
+logger = logging.getLogger(__name__)
+
+# Coefficients of the sixth-order UTCI polynomial (UTCI_approx, Version a 0.002, October 2009 - www.utci.org), ordered by
+# increasing power of vapour pressure, then radiant-air temperature difference, then wind speed, then air temperature
+_UTCI_COEFFICIENTS = np.array([
+    0.607562052, -0.0227712343, 0.000806470249, -0.000154271372, -3.24651735e-06, 7.32602852e-08,
+    1.35959073e-09, -2.2583652, 0.0880326035, 0.00216844454, -1.53347087e-05, -5.72983704e-07,
+    -2.55090145e-09, -0.751269505, -0.00408350271, -5.21670675e-05, 1.94544667e-06, 1.14099531e-08,
+    0.158137256, -6.57263143e-05, 2.22697524e-07, -4.16117031e-08, -0.0127762753, 9.66891875e-06,
+    2.52785852e-09, 0.000456306672, -1.74202546e-07, -5.91491269e-06, 0.398374029, 0.000183945314,
+    -0.00017375451, -7.60781159e-07, 3.77830287e-08, 5.43079673e-10, -0.0200518269, 0.000892859837,
+    3.45433048e-06, -3.77925774e-07, -1.69699377e-09, 0.000169992415, -4.99204314e-05, 2.47417178e-07,
+    1.07596466e-08, 8.49242932e-05, 1.35191328e-06, -6.21531254e-09, -4.99410301e-06, -1.89489258e-08,
+    8.15300114e-08, 0.00075504309, -5.65095215e-05, -4.52166564e-07, 2.46688878e-08, 2.42674348e-10,
+    0.00015454725, 5.2411097e-06, -8.75874982e-08, -1.50743064e-09, -1.56236307e-05, -1.33895614e-07,
+    2.49709824e-09, 6.51711721e-07, 1.94960053e-09, -1.00361113e-08, -1.21206673e-05, -2.1820366e-07,
+    7.51269482e-09, 9.79063848e-11, 1.25006734e-06, -1.81584736e-09, -3.52197671e-10, -3.3651463e-08,
+    1.35908359e-10, 4.1703262e-10, -1.30369025e-09, 4.13908461e-10, 9.22652254e-12, -5.08220384e-09,
+    -2.24730961e-11, 1.17139133e-10, 6.62154879e-10, 4.0386326e-13, 1.95087203e-12, -4.73602469e-12,
+    5.12733497, -0.312788561, -0.0196701861, 0.00099969087, 9.51738512e-06, -4.66426341e-07,
+    0.548050612, -0.00330552823, -0.0016411944, -5.16670694e-06, 9.52692432e-07, -0.0429223622,
+    0.00500845667, 1.00601257e-06, -1.81748644e-06, -0.00125813502, -0.000179330391, 2.34994441e-06,
+    0.000129735808, 1.2906487e-06, -2.28558686e-06, -0.0369476348, 0.00162325322, -3.1427968e-05,
+    2.59835559e-06, -4.77136523e-08, 0.0086420339, -0.000687405181, -9.13863872e-06, 5.15916806e-07,
+    -3.59217476e-05, 3.28696511e-05, -7.10542454e-07, -1.243823e-05, -7.385844e-09, 2.20609296e-07,
+    -0.00073246918, -1.87381964e-05, 4.80925239e-06, -8.7549204e-08, 2.7786293e-05, -5.06004592e-06,
+    1.14325367e-07, 2.53016723e-06, -1.72857035e-08, -3.95079398e-08, -3.59413173e-07, 7.04388046e-07,
+    -1.89309167e-08, -4.79768731e-07, 7.96079978e-09, 1.62897058e-09, 3.94367674e-08, -1.18566247e-09,
+    3.34678041e-10, -1.15606447e-10, -2.80626406, 0.548712484, -0.0039942841, -0.000954009191,
+    1.93090978e-05, -0.308806365, 0.0116952364, 0.000495271903, -1.90710882e-05, 0.00210787756,
+    -0.000698445738, 2.30109073e-05, 0.00041785659, -1.27043871e-05, -3.04620472e-06, 0.0514507424,
+    -0.00432510997, 8.99281156e-05, -7.14663943e-07, -0.000266016305, 0.000263789586, -7.01199003e-06,
+    -0.000106823306, 3.61341136e-06, 2.29748967e-07, 0.000304788893, -6.42070836e-05, 1.16257971e-06,
+    7.68023384e-06, -5.47446896e-07, -3.5993791e-08, -4.36497725e-06, 1.68737969e-07, 2.67489271e-08,
+    3.23926897e-09, -0.0353874123, -0.22120119, 0.0155126038, -0.000263917279, 0.0453433455,
+    -0.00432943862, 0.000145389826, 0.00021750861, -6.66724702e-05, 3.3321714e-05, -0.00226921615,
+    0.000380261982, -5.45314314e-09, -0.000796355448, 2.53458034e-05, -6.31223658e-06, 0.000302122035,
+    -4.77403547e-06, 1.73825715e-06, -4.09087898e-07, 0.614155345, -0.0616755931, 0.00133374846,
+    0.00355375387, -0.000513027851, 0.000102449757, -0.00148526421, -4.11469183e-05, -6.80434415e-06,
+    -9.77675906e-06, 0.0882773108, -0.00301859306, 0.00104452989, 0.000247090539, 0.00148348065,
+])
 
 
-def universal_thermal_climate_index(epw_file: str, mean_radiant_temperature: HourlyContinuousCollection, wind: int = 1, evaporative_cooling: bool = False):
+@profiling.profiled("utci.utci_array")
+def utci_array(air_temperature, mean_radiant_temperature, wind_speed, relative_humidity):
+    """
+    Calculate the Universal Thermal Climate Index for arrays of conditions in a single vectorised pass. Inputs are
+    broadcast against each other, so a batch of scenarios of shape (scenarios, 8760) can be combined with hourly weather
+    of shape (8760,). Results match ladybug_comfort.utci.universal_thermal_climate_index to within 1e-9 C.
+    :param air_temperature: Air temperature [C]
+    :param mean_radiant_temperature: Mean radiant temperature [C]
+    :param wind_speed: Wind speed 10m above ground level [m/s]
+    :param relative_humidity: Relative humidity [%]
+    :return universal_thermal_climate_index: Array of UTCI values [C]
+    """
+
+    ta = np.asarray(air_temperature, dtype=float)
+    tr = np.asarray(mean_radiant_temperature, dtype=float)
+    rh = np.asarray(relative_humidity, dtype=float)
+
+    # Limit wind speed to the range of the Fiala model scenarios
+    vel = np.clip(np.asarray(wind_speed, dtype=float), 0.5, 17)
+
+    # Derived metrics used in the polynomial
+    pa_pr = _saturated_vapor_pressure_hpa(ta) * (rh / 100) / 10  # Vapour pressure [kPa]
+    d_tr = tr - ta  # Difference between radiant and air temperature
+
+    ta, d_tr, vel, pa_pr = np.broadcast_arrays(ta, d_tr, vel, pa_pr)
+
+    # Evaluate the polynomial, using Horner's method for the air temperature terms of each combination of the other powers
+    utci = ta.copy()
+    n = 0
+    pa_pr_power = np.ones_like(ta)
+    for p in range(7):
+        d_tr_power = pa_pr_power.copy()
+        for d in range(7 - p):
+            vel_power = d_tr_power.copy()
+            for v in range(7 - p - d):
+                coefficients = _UTCI_COEFFICIENTS[n:n + 7 - p - d - v]
+                n += len(coefficients)
+                ta_polynomial = np.full_like(ta, coefficients[-1])
+                for c in coefficients[-2::-1]:
+                    ta_polynomial *= ta
+                    ta_polynomial += c
+                utci += ta_polynomial * vel_power
+                vel_power = vel_power * vel
+            d_tr_power = d_tr_power * d_tr
+        pa_pr_power = pa_pr_power * pa_pr
+
+    return utci
+
+
+def _saturated_vapor_pressure_hpa(air_temperature):
+    """Saturated vapour pressure [hPa] at air temperature [C], using the equation specific to the UTCI model"""
+    g = (-2836.5744, -6028.076559, 19.54263612, -0.02737830188, 0.000016261698, 7.0229056e-10, -1.8680009e-13)
+    tk = air_temperature + 273.15
+    es = 2.7150305 * np.log(tk)
+    for i, x in enumerate(g):
+        es = es + (x * (tk ** (i - 2.0)))
+    return np.exp(es) * 0.01
+
+
+@profiling.profiled("utci.universal_thermal_climate_index")
+def universal_thermal_climate_index(epw_file: Union[str, Weather], mean_radiant_temperature: HourlyContinuousCollection, wind: int = 1, evaporative_cooling: bool = False, evaporative_cooling_effectiveness: float = 0.7):
     """
     Calculate the Universal Thermal Climate Index
-    :param epw_file: Weather-file with location and climatic conditions for simulation
-    :param mean_radiant_temperature: Mean radiant temperature hourly collection
+    :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+    :param mean_radiant_temperature: Mean radiant temperature hourly collection, for the hours (analysis period) to calculate
     :param wind: 0 if no wind to be included (0.01m/s), 1 if wind speed should use the values in the EPW file, or 2+ is wind is fixed at a speed of 2m/s+
+    :param evaporative_cooling: Reduce the air temperature by direct evaporative cooling
+    :param evaporative_cooling_effectiveness: Fraction of the wet-bulb depression removed by evaporative cooling
     :return universal_thermal_climate_index:
     """
 
-    # Read weather-file
-    epw = EPW(epw_file)
+    analysis_period = mean_radiant_temperature.header.analysis_period
+    values = universal_thermal_climate_index_array(epw_file, mean_radiant_temperature.values, wind=wind, evaporative_cooling=evaporative_cooling, evaporative_cooling_effectiveness=evaporative_cooling_effectiveness, analysis_period=analysis_period)
+    utci = period.hourly_collection(UniversalThermalClimateIndex(), "C", values, analysis_period)
+
+    logger.info("Universal Thermal Climate Index calculation completed")
+
+    return utci
+
+
+def universal_thermal_climate_index_array(epw_file: Union[str, Weather], mean_radiant_temperature, wind: int = 1, evaporative_cooling: bool = False, evaporative_cooling_effectiveness: float = 0.7, analysis_period: AnalysisPeriod = None):
+    """
+    Calculate the Universal Thermal Climate Index for an array of mean radiant temperatures, such as a grid of points
+    :param epw_file: Weather-file (or openfield.weather.Weather) with location and climatic conditions for simulation
+    :param mean_radiant_temperature: Array of mean radiant temperatures, of shape (hours,) or (points, hours)
+    :param wind: 0 if no wind to be included (0.01m/s), 1 if wind speed should use the values in the EPW file, or 2+ is wind is fixed at a speed of 2m/s+
+    :param evaporative_cooling: Reduce the air temperature by direct evaporative cooling
+    :param evaporative_cooling_effectiveness: Fraction of the wet-bulb depression removed by evaporative cooling
+    :param analysis_period: Ladybug AnalysisPeriod of the hours of the mean radiant temperatures. If None, the whole year
+    :return universal_thermal_climate_index: Array of UTCI values, of the same shape as the mean radiant temperatures
+    """
+
+    # Read weather-file, for the hours of the analysis period
+    weather = load_weather(epw_file)
+    hours = period.analysis_hours(analysis_period) if analysis_period is not None else slice(None)
+    relative_humidity = weather.relative_humidity[hours]
 
     # Get wind-speed values based on user choice
-    wind_speed = 0.01 if wind == 0 else epw.wind_speed if wind == 1 else wind
+    wind_speed = 0.01 if wind == 0 else weather.wind_speed[hours] if wind == 1 else wind
 
     # Recalculate dry-bulb temperature if evaporative cooling is to be introduced
+    dbt = weather.dry_bulb_temperature[hours]
     if evaporative_cooling:
-        wbt = np.array(_wbt(epw.dry_bulb_temperature.values, epw.relative_humidity, epw.atmospheric_station_pressure.values))
-        dbt_ec = np.array(epw.dry_bulb_temperature.values) - ((np.array(epw.dry_bulb_temperature.values) - wbt) * 0.7)
-        epw.dry_bulb_temperature.values = dbt_ec
+        dbt = psychrometrics.evaporative_cooling(dbt, relative_humidity, weather.atmospheric_station_pressure[hours], evaporative_cooling_effectiveness)
 
     # Calculate UTCI values
-    utci = UTCI(epw.dry_bulb_temperature, epw.relative_humidity, mean_radiant_temperature, wind_speed).universal_thermal_climate_index
-
-    print("Universal Thermal Climate Index calculation completed")
-
-    return utci
+    return utci_array(dbt, mean_radiant_temperature, wind_speed, relative_humidity)
@@ -0,0 +1,102 @@
+import pathlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .cache import file_hash
+
+# Most recently used parsed weather-files, by path and file hash, and the number kept
+_WEATHER = OrderedDict()
+_WEATHER_SIZE = 16
+_WEATHER_LOCK = threading.Lock()
+
+
+class Weather(object):
+    """
+    Read-only weather-file data, parsed once and shared between pipeline stages, threads and processes
+    """
+
+    __slots__ = ("path", "file_hash", "_location", "dry_bulb_temperature", "relative_humidity",
+                 "atmospheric_station_pressure", "wind_speed", "global_horizontal_radiation",
+                 "horizontal_infrared_radiation_intensity", "_monthly_ground_temperature")
+
+    def __init__(self, epw_file: str):
+        """
+        :param epw_file: Weather-file with location and climatic conditions for simulation
+        """
+
+        from ladybug.epw import EPW  # Deferred, as it imports setuptools
+
+        epw = EPW(str(epw_file))
+        self._set("path", str(pathlib.Path(epw_file).absolute()))
+        self._set("file_hash", file_hash(epw_file))
+        self._set("_location", epw.location)
+        self._set("dry_bulb_temperature", _read_only(epw.dry_bulb_temperature.values))
+        self._set("relative_humidity", _read_only(epw.relative_humidity.values))
+        self._set("atmospheric_station_pressure", _read_only(epw.atmospheric_station_pressure.values))
+        self._set("wind_speed", _read_only(epw.wind_speed.values))
+        self._set("global_horizontal_radiation", _read_only(epw.global_horizontal_radiation.values))
+        self._set("horizontal_infrared_radiation_intensity", _read_only(epw.horizontal_infrared_radiation_intensity.values))
+        self._set("_monthly_ground_temperature", tuple((float(depth), _read_only(collection.values)) for depth, collection in epw.monthly_ground_temperature.items()))
+
+    def __repr__(self):
+        return "Weather: {} ({})".format(self._location.city, self.path)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Weather is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("Weather is read-only")
+
+    def __getstate__(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __setstate__(self, state):
+        for k, v in state.items():
+            self._set(k, _read_only(v) if isinstance(v, np.ndarray) else v)
+
+    def _set(self, name, value):
+        object.__setattr__(self, name, value)
+
+    @property
+    def location(self):
+        """Location of the weather-file (a copy, so that changes don't affect other users of this weather)"""
+        return self._location.duplicate()
+
+    @property
+    def monthly_ground_temperature(self):
+        """Dictionary of depth [m] and monthly ground temperatures [C]"""
+        return dict(self._monthly_ground_temperature)
+
+
+def load_weather(epw_file):
+    """
+    Load weather-file data, reusing the data already parsed if the file was recently loaded and is unchanged
+    :param epw_file: Weather-file with location and climatic conditions for simulation, or an already loaded Weather
+    :return weather:
+    """
+
+    if isinstance(epw_file, Weather):
+        return epw_file
+
+    key = (str(pathlib.Path(epw_file).absolute()), file_hash(epw_file))
+    with _WEATHER_LOCK:
+        if key in _WEATHER:
+            _WEATHER.move_to_end(key)
+            return _WEATHER[key]
+
+    # Parsed outside the lock, so that other files can be loaded meanwhile
+    weather = Weather(epw_file)
+    with _WEATHER_LOCK:
+        weather = _WEATHER.setdefault(key, weather)
+        _WEATHER.move_to_end(key)
+        while len(_WEATHER) > _WEATHER_SIZE:
+            _WEATHER.popitem(last=False)
+    return weather
+
+
+def _read_only(values):
+    values = np.array(values, dtype=float)
+    values.flags.writeable = False
+    return values
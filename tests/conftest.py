@@ -0,0 +1,9 @@
+import pytest
+
+from benchmarks import synthetic
+
+
+@pytest.fixture(scope="session")
+def epw_file(tmp_path_factory):
+    """Synthetic weather-file, with a full year of hourly values"""
+    return synthetic.synthetic_epw(tmp_path_factory.mktemp("weather") / "synthetic.epw")
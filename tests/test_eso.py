@@ -0,0 +1,31 @@
+import pathlib
+
+import numpy as np
+
+from openfield import eso
+
+ESO_FILE = pathlib.Path(__file__).parent / "data" / "two_environments.eso"
+
+
+def test_read_data_dictionary():
+    variables = eso.read_data_dictionary(ESO_FILE)
+
+    assert variables["7"] == ("GROUND_SURFACE_0", "Surface Outside Face Temperature", "C", "Hourly")
+    assert variables["10"] == ("GROUND_SURFACE_0", "Surface Outside Face Temperature", "C", "Daily")
+    assert "1" not in variables and "3" not in variables
+
+
+def test_read_eso_keeps_only_the_last_environment():
+    values = eso.read_eso(ESO_FILE, frequency="Hourly")
+
+    assert set(values) == {("GROUND_SURFACE_0", "Surface Outside Face Temperature"), ("GROUND_SURFACE_0", "Surface Inside Face Temperature"), ("Environment", "Site Outdoor Air Drybulb Temperature")}
+    np.testing.assert_array_equal(values[("GROUND_SURFACE_0", "Surface Outside Face Temperature")], [10.25, 11.5, 12.75])
+    np.testing.assert_array_equal(values[("GROUND_SURFACE_0", "Surface Inside Face Temperature")], [12.0, 12.5, 13.0])
+    np.testing.assert_array_equal(values[("Environment", "Site Outdoor Air Drybulb Temperature")], [9.5, 10.0, 11.0])
+
+
+def test_read_eso_selects_variables_keys_and_frequency():
+    values = eso.read_eso(ESO_FILE, variables=["surface outside face temperature"], keys=["ground_surface_0"], frequency="daily")
+
+    assert list(values) == [("GROUND_SURFACE_0", "Surface Outside Face Temperature")]
+    np.testing.assert_array_equal(values[("GROUND_SURFACE_0", "Surface Outside Face Temperature")], [11.5])
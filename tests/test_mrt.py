@@ -0,0 +1,29 @@
+import numpy as np
+from ladybug.epw import EPW
+from ladybug_comfort.collection.solarcal import HorizontalSolarCal
+
+from openfield import mrt
+
+
+def test_solarcal_matches_horizontal_solarcal(epw_file):
+    epw = EPW(str(epw_file))
+    diffuse = epw.diffuse_horizontal_radiation
+    direct = epw.global_horizontal_radiation - diffuse
+    longwave_mrt = epw.dry_bulb_temperature
+
+    expected = HorizontalSolarCal(epw.location, direct, diffuse, longwave_mrt, fraction_body_exposed=0.8, floor_reflectance=0.35).mean_radiant_temperature.values
+    values = mrt.solarcal(epw.location, direct.values, diffuse.values, longwave_mrt.values, fraction_body_exposed=0.8, floor_reflectance=0.35)
+
+    np.testing.assert_allclose(values, expected, atol=1E-6)
+
+
+def test_mean_radiant_temperature_batch_matches_single_configurations(epw_file):
+    epw = EPW(str(epw_file))
+    diffuse = np.array(epw.diffuse_horizontal_radiation.values)
+    direct = np.array(epw.global_horizontal_radiation.values) - diffuse
+    longwave_mrt = np.array(epw.dry_bulb_temperature.values)
+
+    batch = mrt.mean_radiant_temperature_batch(epw_file, direct, diffuse, floor_reflectance=[0.2, 0.5], fraction_body_exposed=[1, 0.3], longwave_mrt=[longwave_mrt, longwave_mrt + 2])
+
+    np.testing.assert_allclose(batch[0], mrt.solarcal(epw.location, direct, diffuse, longwave_mrt, fraction_body_exposed=1, floor_reflectance=0.2))
+    np.testing.assert_allclose(batch[1], mrt.solarcal(epw.location, direct, diffuse, longwave_mrt + 2, fraction_body_exposed=0.3, floor_reflectance=0.5))
@@ -0,0 +1,27 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from openfield import profiling
+
+
+@profiling.profiled("tests.square")
+def _square(value):
+    return value ** 2, os.getpid()
+
+
+def test_submit_merges_worker_spans():
+    profiling.reset()
+    profiling.enable()
+    try:
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = [profiling.submit(executor, _square, value).result() for value in range(3)]
+    finally:
+        profiling.disable()
+
+    spans = [span for span in profiling.spans() if span["name"] == "tests.square"]
+    profiling.reset()
+
+    assert [value for value, _ in results] == [0, 1, 4]
+    assert len(spans) == 3
+    assert {span["pid"] for span in spans} == {pid for _, pid in results}
+    assert os.getpid() not in {span["pid"] for span in spans}
@@ -0,0 +1,48 @@
+import numpy as np
+from ladybug import psychrometrics as ladybug_psychrometrics
+
+from openfield import psychrometrics
+
+
+def test_wet_bulb_matches_ladybug():
+    rng = np.random.default_rng(0)
+    dry_bulb_temperature = rng.uniform(-20, 45, 500)
+    relative_humidity = rng.uniform(5, 100, 500)
+    pressure = rng.uniform(90000, 103000, 500)
+
+    expected = [ladybug_psychrometrics.wet_bulb_from_db_rh(*conditions) for conditions in zip(dry_bulb_temperature, relative_humidity, pressure)]
+
+    np.testing.assert_allclose(psychrometrics.wet_bulb_from_db_rh(dry_bulb_temperature, relative_humidity, pressure), expected, rtol=0, atol=0.1)
+
+
+def test_dew_point_matches_ladybug():
+    rng = np.random.default_rng(1)
+    dry_bulb_temperature = rng.uniform(-20, 45, 500)
+    relative_humidity = np.append(rng.uniform(5, 100, 499), 0)
+
+    expected = [ladybug_psychrometrics.dew_point_from_db_rh(*conditions) for conditions in zip(dry_bulb_temperature, relative_humidity)]
+
+    np.testing.assert_allclose(psychrometrics.dew_point_from_db_rh(dry_bulb_temperature, relative_humidity), expected, rtol=0, atol=1E-6)
+
+
+def test_humidity_ratio_round_trip():
+    dry_bulb_temperature = np.array([-10.0, 5.0, 20.0, 35.0])
+    relative_humidity = np.array([30.0, 60.0, 80.0, 45.0])
+
+    humidity_ratio = psychrometrics.humid_ratio_from_db_rh(dry_bulb_temperature, relative_humidity)
+
+    np.testing.assert_allclose(humidity_ratio, [ladybug_psychrometrics.humid_ratio_from_db_rh(*conditions) for conditions in zip(dry_bulb_temperature, relative_humidity)], rtol=1E-9)
+    np.testing.assert_allclose(psychrometrics.rel_humid_from_db_hr(dry_bulb_temperature, humidity_ratio), relative_humidity)
+
+
+def test_evaporative_cooling_broadcasts_effectiveness():
+    dry_bulb_temperature = np.array([25.0, 35.0])
+    relative_humidity = np.array([40.0, 20.0])
+    wet_bulb_temperature = psychrometrics.wet_bulb_from_db_rh(dry_bulb_temperature, relative_humidity)
+
+    cooled = psychrometrics.evaporative_cooling(dry_bulb_temperature, relative_humidity, effectiveness=np.array([[0.0], [0.5], [1.0]]))
+
+    assert cooled.shape == (3, 2)
+    np.testing.assert_allclose(cooled[0], dry_bulb_temperature)
+    np.testing.assert_allclose(cooled[1], (dry_bulb_temperature + wet_bulb_temperature) / 2)
+    np.testing.assert_allclose(cooled[2], wet_bulb_temperature)
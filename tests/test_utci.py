@@ -0,0 +1,39 @@
+import numpy as np
+from ladybug.epw import EPW
+from ladybug_comfort.utci import universal_thermal_climate_index
+
+from openfield import utci
+
+
+def test_utci_array_matches_ladybug(epw_file):
+    epw = EPW(str(epw_file))
+    air_temperature = np.array(epw.dry_bulb_temperature.values)
+    mean_radiant_temperature = air_temperature + np.linspace(-10, 30, 8760)
+    wind_speed = np.array(epw.wind_speed.values)
+    relative_humidity = np.array(epw.relative_humidity.values)
+
+    expected = [universal_thermal_climate_index(*conditions) for conditions in zip(air_temperature, mean_radiant_temperature, wind_speed, relative_humidity)]
+
+    np.testing.assert_allclose(utci.utci_array(air_temperature, mean_radiant_temperature, wind_speed, relative_humidity), expected, rtol=0, atol=1E-9)
+
+
+def test_utci_array_matches_ladybug_across_its_range():
+    rng = np.random.default_rng(0)
+    air_temperature = rng.uniform(-50, 50, 2000)
+    mean_radiant_temperature = air_temperature + rng.uniform(-30, 70, 2000)
+    wind_speed = rng.uniform(0, 20, 2000)
+    relative_humidity = rng.uniform(5, 100, 2000)
+
+    expected = [universal_thermal_climate_index(*conditions) for conditions in zip(air_temperature, mean_radiant_temperature, wind_speed, relative_humidity)]
+
+    np.testing.assert_allclose(utci.utci_array(air_temperature, mean_radiant_temperature, wind_speed, relative_humidity), expected, rtol=0, atol=1E-9)
+
+
+def test_utci_array_broadcasts_scenarios_against_weather():
+    air_temperature = np.array([5.0, 20.0, 35.0])
+    mean_radiant_temperature = air_temperature + np.array([[0.0], [15.0]])
+
+    values = utci.utci_array(air_temperature, mean_radiant_temperature, 2, 50)
+
+    assert values.shape == (2, 3)
+    np.testing.assert_allclose(values[1], [universal_thermal_climate_index(t, t + 15, 2, 50) for t in air_temperature], rtol=0, atol=1E-9)